@@ -0,0 +1,102 @@
+"""
+Incrementally maintained sales summaries.
+
+Revenue per artist, sales per artwork and daily volume live in small
+summary tables (ArtistSales, ArtworkSales, DailySales) that every write to
+`purchases` adjusts in the same transaction, so the /analytics endpoints
+read a handful of indexed rows however long the purchase history is.
+Each summary covers the purchases that currently exist, which is exactly
+what REBUILD recomputes.
+
+A sale is an (artist_id, artwork_id, price, when) tuple; `record_sales` adds
+sales with sign 1 and removes them with sign -1.
+"""
+from collections import defaultdict
+
+from sqlalchemy import delete, func, insert, select
+
+from models import db, Artwork, ArtistSales, ArtworkSales, DailySales, Purchase
+from sqlutil import dialect_insert
+
+SUMMARIES = (ArtistSales.__table__, ArtworkSales.__table__, DailySales.__table__)
+
+_purchases, _artworks = Purchase.__table__, Artwork.__table__
+_day = func.date(_purchases.c.date)
+REBUILD = [delete(t) for t in SUMMARIES] + [
+    insert(ArtistSales.__table__).from_select(
+        ["artist_id", "sales", "revenue"],
+        select(_artworks.c.artist_id, func.count(), func.sum(_purchases.c.price_paid))
+        .join(_artworks, _artworks.c.id == _purchases.c.artwork_id)
+        .group_by(_artworks.c.artist_id)),
+    insert(ArtworkSales.__table__).from_select(
+        ["artwork_id", "sales", "revenue"],
+        select(_purchases.c.artwork_id, func.count(), func.sum(_purchases.c.price_paid))
+        .group_by(_purchases.c.artwork_id)),
+    insert(DailySales.__table__).from_select(
+        ["day", "sales", "revenue"],
+        select(_day, func.count(), func.sum(_purchases.c.price_paid))
+        .where(_purchases.c.date.is_not(None))
+        .group_by(_day)),
+]
+
+
+def sale_of(purchase, artwork):
+    """The sale tuple of `purchase`, of `artwork`."""
+    return artwork.artist_id, artwork.id, purchase.price_paid, purchase.date
+
+
+def purchase_sales(purchase_ids):
+    return db.session.execute(
+        select(_artworks.c.artist_id, _purchases.c.artwork_id, _purchases.c.price_paid, _purchases.c.date)
+        .join(_artworks, _artworks.c.id == _purchases.c.artwork_id)
+        .where(_purchases.c.id.in_(purchase_ids))
+    ).all()
+
+
+def _adjust(table, key, totals):
+    """Add {key value: [sales, revenue]} to `table` in one upsert, then drop rows that reached zero."""
+    if not totals:
+        return
+    rows = [{key: k, "sales": sales, "revenue": revenue} for k, (sales, revenue) in totals.items()]
+    stmt = dialect_insert(table).values(rows)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c[key]],
+        set_={"sales": table.c.sales + stmt.excluded.sales, "revenue": table.c.revenue + stmt.excluded.revenue},
+    ))
+    if any(sales < 0 for sales, _ in totals.values()):
+        db.session.execute(delete(table).where(table.c[key].in_(totals)).where(table.c.sales <= 0))
+
+
+def record_sales(sales, sign=1):
+    """Add (sign=1) or remove (sign=-1) sales from every summary. The caller commits."""
+    by_artist, by_artwork, by_day = defaultdict(lambda: [0, 0]), defaultdict(lambda: [0, 0]), defaultdict(lambda: [0, 0])
+    for artist_id, artwork_id, price, when in sales:
+        targets = [by_artist[artist_id], by_artwork[artwork_id]]
+        if when is not None:
+            targets.append(by_day[when.date()])
+        for totals in targets:
+            totals[0] += sign
+            totals[1] += sign * price
+    _adjust(ArtistSales.__table__, "artist_id", by_artist)
+    _adjust(ArtworkSales.__table__, "artwork_id", by_artwork)
+    _adjust(DailySales.__table__, "day", by_day)
+
+
+def reassign_sales(artwork_id, old_artist_id, new_artist_id):
+    """Move an artwork's sales between artists after its artist_id changed."""
+    if old_artist_id == new_artist_id:
+        return
+    row = db.session.execute(
+        select(ArtworkSales.sales, ArtworkSales.revenue).where(ArtworkSales.artwork_id == artwork_id)
+    ).first()
+    if row is None:
+        return
+    sales, revenue = row
+    _adjust(ArtistSales.__table__, "artist_id",
+            {old_artist_id: [-sales, -revenue], new_artist_id: [sales, revenue]})
+
+
+def rebuild_summaries():
+    """Recompute every summary from `purchases`. The caller commits."""
+    for stmt in REBUILD:
+        db.session.execute(stmt)
@@ -1,78 +1,301 @@
-from flask import Flask, request, jsonify, make_response, session
-from models import db, Artist, Artwork, User, Purchase, Sell, Cart
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from flask import Flask, Response, request, jsonify, make_response, redirect, send_file, session, stream_with_context, url_for
+from models import db, Artist, Artwork, User, Purchase, Sell, Cart, ArtistSales, ArtworkSales, DailySales, ArtworkCatalogue
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 from flask_migrate import Migrate
 import os
+import re
+import click
 from werkzeug.utils import secure_filename
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_cors import CORS
+from database import engine_options, replica_url, sqlite_pragmas
+from pagination import keyset_page, keyset_query, parse_int
+from views import View, query_budget
+from cache import response_cache
+from metrics import metrics
+from passwords import hasher
+from usercache import user_cache
+from analytics import purchase_sales, reassign_sales, rebuild_summaries, record_sales, sale_of
+from rowcounts import approximate_counts, recount, row_counts
+from ratelimit import by_account, by_ip, by_user_or_ip, limiter
+from versioning import bump_counters, conditional, read_counters, touch
+from checkout import CheckoutConflict, checkout, claim, remember, replay
+from carts import add_items, find_targets
+from catalogue import CATALOGUE_SORTS, catalogue_changed, check_catalogue, rebuild_catalogue
+from listings import LISTING_SORTS, STATUSES, ListingUnavailable, buy
+from bulk import export_rows, import_rows
+from streaming import streamed, wants_stream
+from search import include_object, search_artworks
+from uploads import UploadTooLarge, collect_garbage, store
+from derivatives import WIDTHS, derivative_path, image_urls, original_path, render, submit
+from jobs import jobs
 
 app = Flask(__name__)
-CORS(app,supports_credentials=True)
+CORS(app,supports_credentials=True, expose_headers=["Link", "X-Next-Cursor"])
 app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///art.db")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.secret_key = os.environ.get("SECRET_KEY", "supersecretkey")
 
+# Proxies in front of the app (Render's load balancer is one) whose
+# X-Forwarded-For/-Proto are trusted, so request.remote_addr, and with it
+# the per-IP rate limits, is the client's address rather than the proxy's.
+app.config["TRUSTED_PROXIES"] = int(os.environ.get("TRUSTED_PROXIES", 0))
+if app.config["TRUSTED_PROXIES"]:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config["TRUSTED_PROXIES"], x_proto=app.config["TRUSTED_PROXIES"])
+
+# Engine and pool; see database.py.
+app.config["DB_POOL_SIZE"] = int(os.environ.get("DB_POOL_SIZE", 5))
+app.config["DB_MAX_OVERFLOW"] = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+app.config["DB_POOL_TIMEOUT"] = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+app.config["DB_POOL_RECYCLE"] = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+app.config["DB_POOL_PRE_PING"] = os.environ.get("DB_POOL_PRE_PING", "1") == "1"
+app.config["SQLITE_JOURNAL_MODE"] = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+app.config["SQLITE_SYNCHRONOUS"] = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+app.config["SQLITE_BUSY_TIMEOUT"] = int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000))
+app.config["SQLITE_MMAP_SIZE"] = int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
+if os.environ.get("DATABASE_REPLICA_URL"):
+    app.config["SQLALCHEMY_BINDS"] = {
+        "replica": replica_url(app.config["SQLALCHEMY_DATABASE_URI"], os.environ["DATABASE_REPLICA_URL"])
+    }
+
 db.init_app(app)
-migrate = Migrate(app, db)
+with app.app_context():
+    for bind_key, engine in db.engines.items():
+        sqlite_pragmas(engine, app.config, readonly=bind_key == "replica")
+migrate = Migrate(app, db, include_object=include_object)
+response_cache.init_app(app)
+metrics.init_app(app)
+hasher.init_app(app)
+limiter.init_app(app)
+user_cache.init_app(app)
+jobs.init_app(app)
 
 UPLOAD_FOLDER = "static/uploads"
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
+app.config["UPLOAD_MAX_SIZE"] = int(os.environ.get("UPLOAD_MAX_SIZE", 10 * 1024 * 1024))
+app.config["IMAGE_WORKERS"] = int(os.environ.get("IMAGE_WORKERS", 2))
+app.config["ARTWORKS_PAGE_SIZE"] = int(os.environ.get("ARTWORKS_PAGE_SIZE", 100))
+app.config["ARTWORKS_MAX_PAGE_SIZE"] = int(os.environ.get("ARTWORKS_MAX_PAGE_SIZE", 500))
+app.config["STREAM_BATCH_SIZE"] = int(os.environ.get("STREAM_BATCH_SIZE", 1000))
+app.config["CART_BATCH_MAX_ITEMS"] = int(os.environ.get("CART_BATCH_MAX_ITEMS", 100))
+
+ARTWORK_SORTS = {
+    "id": ((Artwork.id,), False),
+    "-id": ((Artwork.id,), True),
+    "price": ((Artwork.price, Artwork.id), False),
+    "-price": ((Artwork.price, Artwork.id), True),
+}
+
+# Read shapes per endpoint; see views.View.
+ARTIST_VIEW = View(Artist, ("-artworks.artist",))
+ARTIST_WRITE_VIEW = View(Artist, ("-artworks",))
+ARTIST_DELETE_VIEW = View(Artist, ("-artworks",), load=("artworks.purchases", "artworks.sells", "artworks.cart"))
+ARTWORK_VIEW = View(Artwork, ("-artist.artworks",))
+USER_LIST_VIEW = View(User, ("-purchases", "-password"))
+USER_VIEW = View(User, ("-purchases.user",))
+USER_UPDATE_VIEW = View(User, ("-purchases",))
+USER_DELETE_VIEW = View(User, ("-purchases", "-sells", "-cart_items"),
+                        load=("purchases.artwork", "sells", "cart_items"))
+PURCHASE_VIEW = View(Purchase, ("-user.purchases", "-artwork.purchases"))
+CART_VIEW = View(Cart)
+LISTING_VIEW = View(Sell)
+CATALOGUE_VIEW = View(ArtworkCatalogue)
+
+
+def artists_changed(*artist_ids, nested=False):
+    """
+    Record, before commit, that artists changed: bumps the collection
+    counter and queues cache invalidation. `nested` means only their
+    artworks changed, so the artist row versions are bumped explicitly.
+    """
+    if nested:
+        touch(Artist, artist_ids)
+    bump_counters("artists")
+    response_cache.invalidate_on_commit(db.session, "artists", *(f"artist:{i}" for i in artist_ids))
+
+
+def artworks_changed(*artwork_ids, nested=False):
+    """Same as artists_changed; `nested` covers cart, purchase and sell writes."""
+    if nested:
+        touch(Artwork, artwork_ids)
+    bump_counters("artworks")
+    response_cache.invalidate_on_commit(db.session, "artworks", *(f"artwork:{i}" for i in artwork_ids))
+
+
+def artist_etag(artist_id):
+    version = db.session.query(Artist.version).filter_by(id=artist_id).scalar()
+    return None if version is None else f"artist-{artist_id}-{version}"
+
+
+def artwork_etag(artwork_id):
+    row = (db.session.query(Artwork.version, Artist.version)
+           .join(Artwork.artist).filter(Artwork.id == artwork_id).first())
+    return None if row is None else f"artwork-{artwork_id}-{row[0]}-{row[1]}"
+
+
+def artists_etag():
+    return "artists-%d" % read_counters("artists")
+
+
+def artworks_etag():
+    return "artworks-%d-%d" % read_counters("artworks", "artists")
+
+
+def catalogue_etag():
+    return "catalogue-%d" % read_counters("catalogue")
+
+def paginated(response, next_cursor):
+    """Add the next page's cursor to a list response as X-Next-Cursor and a Link header."""
+    if next_cursor:
+        args = request.args.to_dict()
+        args["after"] = next_cursor
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{url_for(request.endpoint, _external=True, **request.view_args, **args)}>; rel="next"'
+    return response
+
+def is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+@app.errorhandler(StaleDataError)
+def handle_stale_data(e):
+    db.session.rollback()
+    return jsonify({"error": "Resource was modified concurrently, retry the request"}), 409
 
 @app.route("/")
+@query_budget(0)
 def home():
     return "Welcome to the Art Gallery Marketplace!"
 
 # --- ARTISTS ---
 @app.route("/artists", methods=["GET"])
+@conditional(artists_etag)
+@response_cache.cached("artists")
+@query_budget(ARTIST_VIEW.queries)
 def get_artists():
-    artists = Artist.query.all()
-    return jsonify([a.to_dict(rules=("-artworks.artist",)) for a in artists])
+    artists = ARTIST_VIEW.query().all()
+    return jsonify(ARTIST_VIEW.dump_many(artists))
 
 @app.route("/artists/<int:artist_id>", methods=["GET"])
+@conditional(artist_etag)
+@response_cache.cached("artist:{artist_id}")
+@query_budget(ARTIST_VIEW.queries)
 def get_artist(artist_id):
-    artist = Artist.query.get_or_404(artist_id)
-    return jsonify(artist.to_dict(rules=("-artworks.artist",)))
+    artist = ARTIST_VIEW.query().get_or_404(artist_id)
+    return jsonify(ARTIST_VIEW.dump(artist))
 
 @app.route("/artists", methods=["POST"])
+@query_budget(3)
 def create_artist():
     data = request.get_json() or {}
     if not data.get("name"):
         return jsonify({"error": "Missing 'name'"}), 400
     artist = Artist(name=data["name"], bio=data.get("bio"), profile_pic=data.get("profile_pic"))
     db.session.add(artist)
+    artists_changed()
     db.session.commit()
     return jsonify(artist.to_dict(rules=("-artworks",))), 201
 
 @app.route("/artists/<int:artist_id>", methods=["PATCH"])
+@query_budget(7)
 def update_artist(artist_id):
-    artist = Artist.query.get_or_404(artist_id)
+    artist = ARTIST_WRITE_VIEW.query().get_or_404(artist_id)
     data = request.get_json() or {}
     if "name" in data: artist.name = data["name"]
     if "bio" in data: artist.bio = data["bio"]
     if "profile_pic" in data: artist.profile_pic = data["profile_pic"]
+    artwork_ids = [i for (i,) in db.session.query(Artwork.id).filter_by(artist_id=artist_id)]
+    artists_changed(artist_id)
+    artworks_changed(*artwork_ids)
+    catalogue_changed(db.session, artist_ids=[artist_id])
     db.session.commit()
-    return jsonify(artist.to_dict(rules=("-artworks",)))
+    return jsonify(ARTIST_WRITE_VIEW.dump(artist))
 
 @app.route("/artists/<int:artist_id>", methods=["DELETE"])
+@query_budget(ARTIST_DELETE_VIEW.queries + 14)
 def delete_artist(artist_id):
-    artist = Artist.query.get_or_404(artist_id)
+    artist = ARTIST_DELETE_VIEW.query().get_or_404(artist_id)
+    artwork_ids = [a.id for a in artist.artworks]
+    record_sales([sale_of(p, a) for a in artist.artworks for p in a.purchases], sign=-1)
     db.session.delete(artist)
+    artists_changed(artist_id)
+    artworks_changed(*artwork_ids)
+    catalogue_changed(db.session, artist_ids=[artist_id])
     db.session.commit()
     return jsonify({"message": "Artist deleted"}), 200
 
 # --- ARTWORKS ---
 @app.route("/artworks", methods=["GET"])
+@conditional(artworks_etag)
+@response_cache.cached("artworks")
+@query_budget(ARTWORK_VIEW.queries)
 def get_artworks():
-    arts = Artwork.query.all()
-    return jsonify([a.to_dict(rules=("-artist.artworks",)) for a in arts])
+    """
+    Keyset-paginated artwork listing.
+    Query params: limit, after (cursor), sort (id, -id, price, -price),
+    artist_id, min_price, max_price. The next page cursor is returned
+    in the X-Next-Cursor and Link headers. With stream=1, every matching
+    artwork after the cursor is streamed as one array and limit is ignored.
+    """
+    sort = request.args.get("sort", "id")
+    if sort not in ARTWORK_SORTS:
+        return jsonify({"error": f"Invalid sort, expected one of {sorted(ARTWORK_SORTS)}"}), 400
+    stream = wants_stream()
+    try:
+        limit = parse_int(request.args, "limit", app.config["ARTWORKS_PAGE_SIZE"],
+                          minimum=1, maximum=app.config["ARTWORKS_MAX_PAGE_SIZE"])
+        artist_id = parse_int(request.args, "artist_id")
+        min_price = parse_int(request.args, "min_price")
+        max_price = parse_int(request.args, "max_price")
+        query = ARTWORK_VIEW.select() if stream else ARTWORK_VIEW.query()
+        if artist_id is not None: query = query.filter(Artwork.artist_id == artist_id)
+        if min_price is not None: query = query.filter(Artwork.price >= min_price)
+        if max_price is not None: query = query.filter(Artwork.price <= max_price)
+        columns, descending = ARTWORK_SORTS[sort]
+        if stream:
+            return streamed(ARTWORK_VIEW, keyset_query(query, columns, None, request.args.get("after"), descending))
+        arts, next_cursor = keyset_page(query, columns, limit, request.args.get("after"), descending)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return paginated(jsonify(ARTWORK_VIEW.dump_many(arts)), next_cursor)
+
+@app.route("/artworks/search", methods=["GET"])
+@conditional(artworks_etag)
+@response_cache.cached("artworks")
+@query_budget(1 + ARTWORK_VIEW.queries)
+def search_artworks_view():
+    """
+    Ranked full-text search over artwork title, description and artist
+    name. Query params: q, limit, after (cursor). Each result is the
+    artwork plus a "highlight" object with the title and a snippet, HTML
+    escaped with matches wrapped in <mark>.
+    """
+    try:
+        limit = parse_int(request.args, "limit", app.config["ARTWORKS_PAGE_SIZE"],
+                          minimum=1, maximum=app.config["ARTWORKS_MAX_PAGE_SIZE"])
+        hits, next_cursor = search_artworks(request.args.get("q"), limit, request.args.get("after"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    arts = {a.id: a for a in ARTWORK_VIEW.query().filter(Artwork.id.in_([h[0] for h in hits]))} if hits else {}
+    results = []
+    for artwork_id, title, snippet in hits:
+        if artwork_id in arts:
+            results.append(dict(ARTWORK_VIEW.dump(arts[artwork_id]), highlight={"title": title, "snippet": snippet}))
+    return paginated(jsonify(results), next_cursor)
 
 @app.route("/artworks/<int:artwork_id>", methods=["GET"])
+@conditional(artwork_etag)
+@response_cache.cached("artwork:{artwork_id}")
+@query_budget(ARTWORK_VIEW.queries)
 def get_artwork(artwork_id):
-    art = Artwork.query.get_or_404(artwork_id)
-    return jsonify(art.to_dict(rules=("-artist.artworks",)))
+    art = ARTWORK_VIEW.query().get_or_404(artwork_id)
+    return jsonify(ARTWORK_VIEW.dump(art))
 
 @app.route("/artworks", methods=["POST"])
+@query_budget(10)
 def create_artwork():
     data = request.get_json() or {}
     if not data.get("title") or data.get("price") is None or data.get("artist_id") is None:
@@ -87,34 +310,52 @@ def create_artwork():
         description=data.get("description")
     )
     db.session.add(art)
+    artists_changed(art.artist_id, nested=True)
+    artworks_changed()
+    catalogue_changed(db.session, artist_ids=[art.artist_id])
     db.session.commit()
     return jsonify(art.to_dict(rules=("-artist.artworks",))), 201
 
 @app.route("/artworks/<int:artwork_id>", methods=["PATCH"])
+@query_budget(ARTWORK_VIEW.queries + 13)
 def update_artwork(artwork_id):
-    art = Artwork.query.get_or_404(artwork_id)
+    art = ARTWORK_VIEW.query().get_or_404(artwork_id)
+    old_artist_id = art.artist_id
     data = request.get_json() or {}
+    # Before any change to `art`, so the lookup doesn't autoflush a separate UPDATE.
+    if "artist_id" in data and not Artist.query.get(data["artist_id"]):
+        return jsonify({"error": "Artist not found"}), 404
     if "title" in data: art.title = data["title"]
     if "price" in data: art.price = data["price"]
     if "image_url" in data: art.image_url = data["image_url"]
     if "description" in data: art.description = data["description"]
     if "artist_id" in data:
-        new_artist = Artist.query.get(data["artist_id"])
-        if not new_artist: return jsonify({"error": "Artist not found"}), 404
         art.artist_id = data["artist_id"]
+        reassign_sales(artwork_id, old_artist_id, art.artist_id)
+    artists_changed(old_artist_id, art.artist_id, nested=True)
+    artworks_changed(artwork_id)
+    catalogue_changed(db.session, [artwork_id])
     db.session.commit()
-    return jsonify(art.to_dict(rules=("-artist.artworks",)))
+    return jsonify(ARTWORK_VIEW.dump(art))
 
 @app.route("/artworks/<int:artwork_id>", methods=["DELETE"])
+@query_budget(ARTWORK_VIEW.queries + 14)
 def delete_artwork(artwork_id):
-    art = Artwork.query.get_or_404(artwork_id)
+    art = ARTWORK_VIEW.query().get_or_404(artwork_id)
+    artist_id = art.artist_id
+    record_sales([sale_of(p, art) for p in art.purchases], sign=-1)
     db.session.delete(art)
+    artists_changed(artist_id, nested=True)
+    artworks_changed(artwork_id)
+    catalogue_changed(db.session, [artwork_id])
     db.session.commit()
     return jsonify({"message": "Artwork deleted"}), 200
 
 # --- USERS ---
 # --- USERS ---
 @app.route("/signup", methods=["POST"])
+@limiter.limit("RATELIMIT_SIGNUP_IP", by_ip)
+@query_budget(3)
 def signup_user():
     data = request.get_json() or {}
     if not data.get("userName") or not data.get("email") or not data.get("password"):
@@ -123,7 +364,7 @@ def signup_user():
     if User.query.filter_by(email=data["email"]).first():
         return jsonify({"error": "Email already registered"}), 400
 
-    hashed_password = generate_password_hash(data["password"])
+    hashed_password = hasher.hash(data["password"])
     user = User(
         userName=data["userName"],
         email=data["email"],
@@ -136,11 +377,20 @@ def signup_user():
 
 
 @app.route("/login", methods=["POST"])
+@limiter.limit("RATELIMIT_LOGIN_IP", by_ip)
+@limiter.limit("RATELIMIT_LOGIN_ACCOUNT", by_account)
+@query_budget(3)
 def login_user():
     data = request.get_json() or {}
     user = User.query.filter_by(email=data.get("email")).first()
-    if not user or not check_password_hash(user.password, data.get("password", "")):
+    if not user:
         return jsonify({"error": "Invalid credentials"}), 401
+    valid, upgraded = hasher.verify(user.password, data.get("password", ""))
+    if not valid:
+        return jsonify({"error": "Invalid credentials"}), 401
+    if upgraded:
+        user.password = upgraded
+        db.session.commit()
 
     session['user_id'] = user.id
     return jsonify({
@@ -150,38 +400,53 @@ def login_user():
 
 
 @app.route("/logout", methods=["POST"])
+@query_budget(0)
 def logout_user():
     session.pop('user_id', None)
     return jsonify({"message": "Logged out"})
 
 @app.route("/users", methods=["GET"])
+@query_budget(USER_LIST_VIEW.queries)
 def get_users():
-    users = User.query.all()
-    return jsonify([u.to_dict(rules=("-purchases", "-password")) for u in users])
+    """All users; ?stream=1 streams them."""
+    if wants_stream():
+        return streamed(USER_LIST_VIEW, USER_LIST_VIEW.select().order_by(User.id))
+    users = USER_LIST_VIEW.query().all()
+    return jsonify(USER_LIST_VIEW.dump_many(users))
 
 @app.route("/users/<int:user_id>", methods=["GET"])
+@query_budget(USER_VIEW.queries)
 def get_user(user_id):
-    user = User.query.get_or_404(user_id)
-    return jsonify(user.to_dict(rules=("-purchases.user",)))
+    user = USER_VIEW.query().get_or_404(user_id)
+    return jsonify(USER_VIEW.dump(user))
 
 @app.route("/users/<int:user_id>", methods=["PATCH"])
+@query_budget(USER_UPDATE_VIEW.queries + 4)
 def update_user(user_id):
-    user = User.query.get_or_404(user_id)
+    user = USER_UPDATE_VIEW.query().get_or_404(user_id)
     data = request.get_json() or {}
     if "userName" in data: user.userName = data["userName"]
     if "email" in data: user.email = data["email"]
+    user_cache.invalidate_on_commit(db.session, user_id)
     db.session.commit()
-    return jsonify(user.to_dict(rules=("-purchases",)))
+    return jsonify(USER_UPDATE_VIEW.dump(user))
 
 @app.route("/users/<int:user_id>", methods=["DELETE"])
+@query_budget(USER_DELETE_VIEW.queries + 13)
 def delete_user(user_id):
-    user = User.query.get_or_404(user_id)
+    user = USER_DELETE_VIEW.query().get_or_404(user_id)
+    artwork_ids = {r.artwork_id for r in user.purchases + user.sells + user.cart_items}
+    record_sales([sale_of(p, p.artwork) for p in user.purchases], sign=-1)
     db.session.delete(user)
+    user_cache.invalidate_on_commit(db.session, user_id)
+    artworks_changed(*artwork_ids, nested=True)
+    catalogue_changed(db.session, {p.artwork_id for p in user.purchases})
     db.session.commit()
     return jsonify({"message": "User deleted"}), 200
 
 # --- PURCHASES ---
 @app.route("/purchases", methods=["POST"])
+@query_budget(10)
 def create_purchase():
     if not session.get('user_id'):
         return jsonify({"error": "Authentication required"}), 401
@@ -192,30 +457,44 @@ def create_purchase():
     date = data.get("date")
     if not user_id or not artwork_id or price_paid is None or not date:
         return jsonify({"error": "Missing fields"}), 400
-    user = User.query.get(user_id)
+    try:
+        date = datetime.fromisoformat(date)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid 'date', expected ISO 8601"}), 400
+    user = user_cache.get(user_id)
     artwork = Artwork.query.get(artwork_id)
     if not user or not artwork:
         return jsonify({"error": "User or Artwork not found"}), 404
+    try:
+        claim({(artwork.id, artwork.version)})
+    except CheckoutConflict as e:
+        db.session.rollback()
+        return jsonify({"error": str(e), "artwork_ids": e.artwork_ids}), 409
     purchase = Purchase(user_id=user_id, artwork_id=artwork_id, price_paid=price_paid, date=date)
     db.session.add(purchase)
+    record_sales([(artwork.artist_id, artwork.id, price_paid, date)])
+    artworks_changed(artwork_id)
+    catalogue_changed(db.session, [artwork.id])
     db.session.commit()
     return jsonify(purchase.to_dict(rules=("-user.purchases", "-artwork.purchases"))), 201
 
 @app.route("/purchases/<int:purchase_id>", methods=["GET"])
+@query_budget(PURCHASE_VIEW.queries)
 def get_purchase(purchase_id):
-    purchase = Purchase.query.get_or_404(purchase_id)
-    return jsonify(purchase.to_dict(rules=("-user.purchases", "-artwork.purchases")))
+    purchase = PURCHASE_VIEW.query().get_or_404(purchase_id)
+    return jsonify(PURCHASE_VIEW.dump(purchase))
 
 @app.route("/purchases/user/<int:user_id>", methods=["GET"])
+@query_budget(PURCHASE_VIEW.queries)
 def get_user_purchases(user_id):
-    """Get all purchases for a given user"""
-    purchases = Purchase.query.filter_by(user_id=user_id).all()
-    return jsonify([
-        p.to_dict(rules=("-user.purchases", "-artwork.purchases"))
-        for p in purchases
-    ]), 200
+    """Get all purchases for a given user; ?stream=1 streams them."""
+    if wants_stream():
+        return streamed(PURCHASE_VIEW, PURCHASE_VIEW.select().filter_by(user_id=user_id).order_by(Purchase.id))
+    purchases = PURCHASE_VIEW.query().filter_by(user_id=user_id).all()
+    return jsonify(PURCHASE_VIEW.dump_many(purchases)), 200
 
 @app.route("/purchases/<int:purchase_id>", methods=["DELETE"])
+@query_budget(13)
 def sell_artwork(purchase_id):
     """
     Simulate selling artwork:
@@ -230,85 +509,477 @@ def sell_artwork(purchase_id):
         status="listed"
     )
     db.session.add(sell)
+    record_sales([sale_of(purchase, purchase.artwork)], sign=-1)
     db.session.delete(purchase)
+    artworks_changed(sell.artwork_id, nested=True)
+    catalogue_changed(db.session, [sell.artwork_id])
     db.session.commit()
     return jsonify({"message": "Artwork listed for sale", "sell": sell.to_dict()}), 200
 
+# --- CATALOGUE ---
+@app.route("/catalogue", methods=["GET"])
+@conditional(catalogue_etag)
+@response_cache.cached("catalogue")
+@query_budget(CATALOGUE_VIEW.queries)
+def get_catalogue():
+    """
+    Artworks with their artist's name, sales count, last sale and
+    availability, read from the artwork_catalogue table alone.
+    Query params: limit, after (cursor), sort (id, -id, price, -price),
+    artist_id, min_price, max_price, available (1 or 0).
+    """
+    sort = request.args.get("sort", "id")
+    if sort not in CATALOGUE_SORTS:
+        return jsonify({"error": f"Invalid sort, expected one of {sorted(CATALOGUE_SORTS)}"}), 400
+    try:
+        limit = parse_int(request.args, "limit", app.config["ARTWORKS_PAGE_SIZE"],
+                          minimum=1, maximum=app.config["ARTWORKS_MAX_PAGE_SIZE"])
+        artist_id = parse_int(request.args, "artist_id")
+        min_price = parse_int(request.args, "min_price")
+        max_price = parse_int(request.args, "max_price")
+        available = parse_int(request.args, "available", minimum=0, maximum=1)
+        query = CATALOGUE_VIEW.query()
+        if artist_id is not None: query = query.filter(ArtworkCatalogue.artist_id == artist_id)
+        if min_price is not None: query = query.filter(ArtworkCatalogue.price >= min_price)
+        if max_price is not None: query = query.filter(ArtworkCatalogue.price <= max_price)
+        if available is not None: query = query.filter(ArtworkCatalogue.available == bool(available))
+        columns, descending = CATALOGUE_SORTS[sort]
+        rows, next_cursor = keyset_page(query, columns, limit, request.args.get("after"), descending)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return paginated(jsonify(CATALOGUE_VIEW.dump_many(rows)), next_cursor)
+
+# --- LISTINGS ---
+@app.route("/listings", methods=["GET"])
+@query_budget(LISTING_VIEW.queries)
+def get_listings():
+    """
+    Keyset-paginated secondary-market listings.
+    Query params: status (listed, sold; default listed), sort (created_at,
+    -created_at, price, -price; default -created_at), min_price, max_price,
+    limit, after (cursor).
+    """
+    status = request.args.get("status", "listed")
+    if status not in STATUSES:
+        return jsonify({"error": f"Invalid status, expected one of {list(STATUSES)}"}), 400
+    sort = request.args.get("sort", "-created_at")
+    if sort not in LISTING_SORTS:
+        return jsonify({"error": f"Invalid sort, expected one of {sorted(LISTING_SORTS)}"}), 400
+    try:
+        limit = parse_int(request.args, "limit", app.config["ARTWORKS_PAGE_SIZE"],
+                          minimum=1, maximum=app.config["ARTWORKS_MAX_PAGE_SIZE"])
+        min_price = parse_int(request.args, "min_price")
+        max_price = parse_int(request.args, "max_price")
+        query = LISTING_VIEW.query().filter(Sell.status == status)
+        if min_price is not None: query = query.filter(Sell.price >= min_price)
+        if max_price is not None: query = query.filter(Sell.price <= max_price)
+        columns, descending = LISTING_SORTS[sort]
+        listings, next_cursor = keyset_page(query, columns, limit, request.args.get("after"), descending)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return paginated(jsonify(LISTING_VIEW.dump_many(listings)), next_cursor)
+
+@app.route("/listings/<int:listing_id>/buy", methods=["POST"])
+@query_budget(PURCHASE_VIEW.queries + 10)
+def buy_listing(listing_id):
+    """
+    Buy a listed artwork as the logged-in user. A listing that another
+    buyer got first, or whose artwork was sold elsewhere, gives a 409.
+    """
+    user = user_cache.current()
+    if user is None:
+        return jsonify({"error": "Authentication required"}), 401
+    now = datetime.utcnow()
+    try:
+        bought = buy(listing_id, user.id, now)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except ListingUnavailable as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 409
+    if bought is None:
+        return jsonify({"error": "Listing not found"}), 404
+    purchase_id, artist_id, artwork_id, price = bought
+    record_sales([(artist_id, artwork_id, price, now)])
+    artworks_changed(artwork_id)
+    catalogue_changed(db.session, [artwork_id])
+    db.session.commit()
+    purchase = PURCHASE_VIEW.query().get(purchase_id)
+    return jsonify(PURCHASE_VIEW.dump(purchase)), 201
+
 # --- UPLOAD ---
+def upload_root():
+    return os.path.join(app.root_path, app.config["UPLOAD_FOLDER"])
+
+@jobs.task("images")
+def render_derivatives(sha256):
+    """Render every missing derivative of an upload, on the worker."""
+    source = original_path(upload_root(), sha256)
+    if source is not None:
+        render(source, upload_root(), sha256)
+
 @app.route("/upload", methods=["POST"])
+@limiter.limit("RATELIMIT_UPLOAD", by_user_or_ip)
+@query_budget(1)
 def upload_file():
-    if "file" not in request.files:
-        return jsonify({"error": "No file part"}), 400
-    file = request.files["file"]
-    if file.filename == "":
-        return jsonify({"error": "No selected file"}), 400
-    filename = secure_filename(file.filename)
-    filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-    os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
-    file.save(filepath)
-    return jsonify({"image_url": f"/{filepath}"}), 201
+    """
+    Store an image as multipart form field "file" or as the raw request
+    body, and return its content-addressed URL. Identical uploads share
+    one file and one URL.
+    """
+    max_size = app.config["UPLOAD_MAX_SIZE"]
+    if request.content_length is not None and request.content_length > max_size + 64 * 1024:
+        return jsonify({"error": f"Upload exceeds {max_size} bytes"}), 413
+    if request.mimetype == "multipart/form-data":
+        if "file" not in request.files:
+            return jsonify({"error": "No file part"}), 400
+        file = request.files["file"]
+        if file.filename == "":
+            return jsonify({"error": "No selected file"}), 400
+        stream, filename = file.stream, secure_filename(file.filename)
+    else:
+        stream, filename = request.stream, None
+    try:
+        stored = store(stream, upload_root(), max_size, filename)
+    except UploadTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    url = "/" + "/".join([app.config["UPLOAD_FOLDER"], *stored.relpath.split(os.sep)])
+    images = None
+    if os.path.splitext(stored.relpath)[1] in (".jpg", ".png", ".gif", ".webp"):
+        render_derivatives.enqueue(sha256=stored.sha256)
+        db.session.commit()
+        images = image_urls(url)
+    return jsonify({"image_url": url, "sha256": stored.sha256, "size": stored.size, "images": images}), 201
+
+@app.route("/images/<sha256>/<int:width>.<any(jpg, webp):fmt>", methods=["GET"])
+@query_budget(0)
+def get_image(sha256, width, fmt):
+    """
+    Serve a derivative of an upload. Until it has been rendered, queue it
+    and redirect to the original, so derivative URLs are always usable.
+    """
+    if width not in WIDTHS or not re.fullmatch(r"[0-9a-f]{64}", sha256):
+        return jsonify({"error": "Image not found"}), 404
+    path = derivative_path(upload_root(), sha256, width, fmt)
+    if os.path.exists(path):
+        return send_file(path, mimetype=f"image/{'jpeg' if fmt == 'jpg' else fmt}", max_age=365 * 24 * 3600)
+    source = original_path(upload_root(), sha256)
+    if source is None:
+        return jsonify({"error": "Image not found"}), 404
+    submit(upload_root(), sha256, app.config["IMAGE_WORKERS"])
+    response = redirect("/" + "/".join([app.config["UPLOAD_FOLDER"], *os.path.relpath(source, upload_root()).split(os.sep)]))
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+@app.cli.command("gc-uploads")
+@click.option("--min-age", default=24 * 3600, show_default=True, help="Only delete files older than this many seconds.")
+@click.option("--dry-run", is_flag=True, help="List the files that would be deleted.")
+def gc_uploads(min_age, dry_run):
+    """Delete uploaded files that no artwork or artist references."""
+    for path in collect_garbage(upload_root(), min_age, dry_run):
+        click.echo(path)
 
 # --- CART ---
 @app.route("/cart", methods=["POST"])
+@query_budget(7)
 def add_to_cart():
     data = request.get_json() or {}
     user_id = data.get("user_id")
     artwork_id = data.get("artwork_id")
     if not user_id or not artwork_id:
         return jsonify({"error": "Missing fields"}), 400
-    user = User.query.get(user_id)
+    user = user_cache.get(user_id)
     art = Artwork.query.get(artwork_id)
     if not user or not art:
         return jsonify({"error": "User or Artwork not found"}), 404
-    existing = Cart.query.filter_by(user_id=user_id, artwork_id=artwork_id).first()
-    if existing:
+    added = add_items(user.id, [art.id], datetime.utcnow())
+    if not added:
+        existing = Cart.query.filter_by(user_id=user.id, artwork_id=art.id).first()
         return jsonify({"message": "Item already in cart", "cart_item": existing.to_dict()}), 200
-    item = Cart(user_id=user_id, artwork_id=artwork_id)
-    db.session.add(item)
+    artworks_changed(art.id, nested=True)
     db.session.commit()
-    return jsonify(item.to_dict()), 201
+    return jsonify(db.session.get(Cart, added[art.id]).to_dict()), 201
+
+@app.route("/cart/batch", methods=["POST"])
+@query_budget(5)
+def add_to_cart_batch():
+    """
+    Add several artworks to a cart: {"user_id": 1, "artwork_ids": [2, 3]}.
+    The user and every artwork are checked in one query and nothing is
+    added if any is missing. Artworks already in the cart are skipped.
+    """
+    data = request.get_json() or {}
+    user_id = data.get("user_id")
+    artwork_ids = data.get("artwork_ids")
+    if not is_int(user_id) or not isinstance(artwork_ids, list) or not artwork_ids \
+            or not all(is_int(a) for a in artwork_ids):
+        return jsonify({"error": "Expected 'user_id' and a non-empty 'artwork_ids' list of integers"}), 400
+    if len(artwork_ids) > app.config["CART_BATCH_MAX_ITEMS"]:
+        return jsonify({"error": f"At most {app.config['CART_BATCH_MAX_ITEMS']} artworks per request"}), 400
+    user_exists, found = find_targets(user_id, artwork_ids)
+    if not user_exists:
+        return jsonify({"error": "User not found"}), 404
+    missing = sorted(set(artwork_ids) - found)
+    if missing:
+        return jsonify({"error": "Artworks not found", "artwork_ids": missing}), 404
+    added = add_items(user_id, artwork_ids, datetime.utcnow())
+    if added:
+        artworks_changed(*added, nested=True)
+    db.session.commit()
+    return jsonify({
+        "added": [{"artwork_id": a, "cart_id": c} for a, c in sorted(added.items())],
+        "already_in_cart": sorted(set(artwork_ids) - set(added)),
+    }), 201 if added else 200
 
 @app.route("/cart/<int:user_id>", methods=["GET"])
+@query_budget(CART_VIEW.queries + 1)
 def view_cart(user_id):
-    user = User.query.get_or_404(user_id)
-    items = Cart.query.filter_by(user_id=user.id).all()
-    return jsonify([i.to_dict() for i in items]), 200
+    user = user_cache.get_or_404(user_id)
+    items = CART_VIEW.query().filter_by(user_id=user.id).all()
+    return jsonify(CART_VIEW.dump_many(items)), 200
 
 @app.route("/cart/<int:cart_id>", methods=["DELETE"])
+@query_budget(4)
 def remove_cart_item(cart_id):
     item = Cart.query.get_or_404(cart_id)
+    artwork_id = item.artwork_id
     db.session.delete(item)
+    artworks_changed(artwork_id, nested=True)
     db.session.commit()
     return jsonify({"message": "Cart item removed"}), 200
 
 @app.route("/cart/checkout/<int:user_id>", methods=["POST"])
+@query_budget(PURCHASE_VIEW.queries + 13)
 def checkout_cart(user_id):
-    user = User.query.get_or_404(user_id)
-    items = Cart.query.filter_by(user_id=user.id).all()
-    if not items:
+    """
+    Buy the whole cart in one transaction. Artworks that were sold or
+    changed since they were added give a 409 and nothing is bought. With an
+    Idempotency-Key header, a retried request returns the original response.
+    """
+    user = user_cache.get_or_404(user_id)
+    key = request.headers.get("Idempotency-Key")
+    stored = key and replay(user.id, key)
+    if stored:
+        return jsonify(stored[0]), stored[1]
+    try:
+        purchase_ids, artwork_ids = checkout(user.id, datetime.utcnow())
+    except CheckoutConflict as e:
+        db.session.rollback()
+        # A concurrent retry with the same key may have bought the cart.
+        stored = key and replay(user.id, key)
+        if stored:
+            return jsonify(stored[0]), stored[1]
+        return jsonify({"error": str(e), "artwork_ids": e.artwork_ids}), 409
+    if not purchase_ids:
         return jsonify({"error": "Cart is empty"}), 400
-    purchases = []
-    for it in items:
-        art = it.artwork
-        purchase = Purchase(user_id=user.id, artwork_id=art.id, price_paid=art.price, date=datetime.utcnow())
-        db.session.add(purchase)
-        purchases.append(purchase)
-        db.session.delete(it)
+    record_sales(purchase_sales(purchase_ids))
+    artworks_changed(*artwork_ids)
+    catalogue_changed(db.session, artwork_ids)
+    purchases = PURCHASE_VIEW.query().filter(Purchase.id.in_(purchase_ids)).all()
+    body = {"message": "Checkout complete", "purchases": PURCHASE_VIEW.dump_many(purchases)}
+    if key:
+        remember(user.id, key, body, 201)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        stored = replay(user.id, key)
+        if not stored:
+            raise
+        return jsonify(stored[0]), stored[1]
+    return jsonify(body), 201
+
+# --- BULK IMPORT / EXPORT ---
+def run_import(kind, lines):
+    """Import NDJSON lines and queue the matching invalidation. The caller commits."""
+    result = import_rows(kind, lines)
+    if result.inserted:
+        if kind == "artworks":
+            artists_changed(*result.artist_ids, nested=True)
+            artworks_changed()
+            catalogue_changed(db.session, artist_ids=result.artist_ids)
+        else:
+            artists_changed()
+    return result
+
+@app.route("/bulk/<any(artists, artworks):kind>", methods=["POST"])
+@query_budget(None)
+def bulk_import(kind):
+    try:
+        result = run_import(kind, request.stream)
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        return jsonify({"error": "Import conflicts with existing rows", "detail": str(e.orig)}), 409
+    return jsonify(result.to_dict()), 201 if result.inserted else 400
+
+@app.route("/export/<any(artists, artworks):kind>", methods=["GET"])
+@query_budget(None)
+def bulk_export(kind):
+    return Response(stream_with_context(export_rows(kind)), mimetype="application/x-ndjson")
+
+@app.cli.command("import-ndjson")
+@click.argument("kind", type=click.Choice(["artists", "artworks"]))
+@click.argument("source", type=click.File("rb"), default="-")
+def import_ndjson(kind, source):
+    """Import artists or artworks from an NDJSON file (default stdin)."""
+    try:
+        result = run_import(kind, source)
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        raise click.ClickException(f"Import conflicts with existing rows: {e.orig}")
+    click.echo(f"inserted {result.inserted}, skipped {result.error_count}", err=True)
+    for error in result.errors:
+        click.echo(f"line {error['line']}: {error['error']}", err=True)
+
+@app.cli.command("export-ndjson")
+@click.argument("kind", type=click.Choice(["artists", "artworks"]))
+@click.argument("target", type=click.File("w"), default="-")
+def export_ndjson(kind, target):
+    """Export artists or artworks as NDJSON to a file (default stdout)."""
+    for line in export_rows(kind):
+        target.write(line)
+
+# --- ANALYTICS ---
+@app.route("/analytics/artists", methods=["GET"])
+@query_budget(1)
+def analytics_artists():
+    """Artists by revenue, highest first. Query params: limit, after (cursor)."""
+    try:
+        limit = parse_int(request.args, "limit", 20, minimum=1, maximum=app.config["ARTWORKS_MAX_PAGE_SIZE"])
+        query = (db.session.query(ArtistSales.artist_id, Artist.name, ArtistSales.sales, ArtistSales.revenue)
+                 .join(Artist, Artist.id == ArtistSales.artist_id))
+        rows, next_cursor = keyset_page(query, (ArtistSales.revenue, ArtistSales.artist_id), limit,
+                                        request.args.get("after"), descending=True)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return paginated(jsonify([row._asdict() for row in rows]), next_cursor)
+
+@app.route("/analytics/artworks", methods=["GET"])
+@query_budget(1)
+def analytics_artworks():
+    """Best-selling artworks, most sales first. Query params: limit, after (cursor)."""
+    try:
+        limit = parse_int(request.args, "limit", 20, minimum=1, maximum=app.config["ARTWORKS_MAX_PAGE_SIZE"])
+        query = (db.session.query(ArtworkSales.artwork_id, Artwork.title, ArtworkSales.sales, ArtworkSales.revenue)
+                 .join(Artwork, Artwork.id == ArtworkSales.artwork_id))
+        rows, next_cursor = keyset_page(query, (ArtworkSales.sales, ArtworkSales.artwork_id), limit,
+                                        request.args.get("after"), descending=True)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return paginated(jsonify([row._asdict() for row in rows]), next_cursor)
+
+@app.route("/analytics/daily", methods=["GET"])
+@query_budget(1)
+def analytics_daily():
+    """
+    Purchases and revenue per day, oldest first, with empty days as zero.
+    Query params: from, to (YYYY-MM-DD, inclusive); defaults to the last 30 days.
+    """
+    try:
+        end = date.fromisoformat(request.args["to"]) if request.args.get("to") else datetime.utcnow().date()
+        start = date.fromisoformat(request.args["from"]) if request.args.get("from") else end - timedelta(days=29)
+    except ValueError:
+        return jsonify({"error": "Invalid 'from' or 'to', expected YYYY-MM-DD"}), 400
+    if not 0 <= (end - start).days < 366:
+        return jsonify({"error": "'from' must be on or before 'to', at most 366 days apart"}), 400
+    totals = {row.day: row for row in DailySales.query.filter(DailySales.day.between(start, end))}
+    days = []
+    for offset in range((end - start).days + 1):
+        day = start + timedelta(days=offset)
+        row = totals.get(day)
+        days.append({"day": day.isoformat(), "sales": row.sales if row else 0, "revenue": row.revenue if row else 0})
+    return jsonify(days), 200
+
+@app.cli.command("rebuild-analytics")
+def rebuild_analytics():
+    """Recompute the sales summaries from the purchases table."""
+    rebuild_summaries()
+    db.session.commit()
+    click.echo("Sales summaries rebuilt.", err=True)
+
+@app.cli.command("rebuild-catalogue")
+def rebuild_catalogue_command():
+    """Recompute the artwork catalogue from the artworks, artists and purchases tables."""
+    rebuild_catalogue()
     db.session.commit()
-    return jsonify({"message": "Checkout complete", "purchases": [p.to_dict(rules=("-user.purchases","-artwork.purchases")) for p in purchases]}), 201
+    click.echo("Artwork catalogue rebuilt.", err=True)
+
+@app.cli.command("check-catalogue")
+@click.option("--fix", is_flag=True, help="Rebuild the catalogue if any row is out of date.")
+def check_catalogue_command(fix):
+    """Compare the artwork catalogue with the base tables; exits 1 if any row differs."""
+    stale = check_catalogue()
+    if not stale:
+        click.echo("Artwork catalogue is consistent.", err=True)
+        return
+    click.echo(f"{len(stale)} catalogue rows differ, e.g. artworks {stale[:20]}", err=True)
+    if fix:
+        rebuild_catalogue()
+        db.session.commit()
+        click.echo("Artwork catalogue rebuilt.", err=True)
+    else:
+        raise SystemExit(1)
 
 # --- SEED CHECK ---
 @app.route("/seed-check", methods=["GET"])
+@query_budget(3)
 def seed_check():
+    """Row counts from the maintained counters; ?approximate=1 reads planner statistics instead."""
+    tables = ("artists", "artworks", "users", "purchases", "carts")
+    rows = approximate_counts(tables) if request.args.get("approximate") else row_counts(tables)
     counts = {
-        "artists": Artist.query.count(),
-        "artworks": Artwork.query.count(),
-        "users": User.query.count(),
-        "purchases": Purchase.query.count(),
-        "cart": Cart.query.count()
+        "artists": rows["artists"],
+        "artworks": rows["artworks"],
+        "users": rows["users"],
+        "purchases": rows["purchases"],
+        "cart": rows["carts"]
     }
     return jsonify(counts), 200
 
+@app.route("/healthz", methods=["GET"])
+@query_budget(2)
+def healthz():
+    """Liveness and connectivity of the database and any replica, without reading any table."""
+    for bind_key, engine in db.engines.items():
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        except DBAPIError as e:
+            return jsonify({"status": "unavailable", "database": bind_key or "primary", "error": str(e.orig)}), 503
+    return jsonify({"status": "ok"}), 200
+
+@app.cli.command("recount")
+def recount_rows():
+    """Recount the rows behind /seed-check, e.g. after a TRUNCATE."""
+    recount()
+    db.session.commit()
+    click.echo("Row counts rebuilt.", err=True)
+
+@app.route("/internal/metrics", methods=["GET"])
+@query_budget(0)
+def metrics_view():
+    cache_stats = response_cache.stats()
+    extra = [
+        ("response_cache_hits_total", "counter", "Response cache hits.",
+         [({"view": v}, s["hits"]) for v, s in cache_stats.items()]),
+        ("response_cache_misses_total", "counter", "Response cache misses.",
+         [({"view": v}, s["misses"]) for v, s in cache_stats.items()]),
+        ("ratelimit_rejected_total", "counter", "Requests refused by a rate limit.",
+         [({"limit": k}, v) for k, v in sorted(limiter.rejected.items())]),
+        ("user_cache_lookups_total", "counter", "User lookups by where they were answered.",
+         [({"source": k}, v) for k, v in sorted(user_cache.lookups.items())]),
+    ]
+    return Response(metrics.render(extra), mimetype="text/plain; version=0.0.4")
+
+@app.route("/internal/cache-stats", methods=["GET"])
+@query_budget(0)
+def cache_stats():
+    return jsonify(response_cache.stats()), 200
+
 if __name__ == "__main__":
     with app.app_context():
         db.create_all()
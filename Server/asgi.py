@@ -0,0 +1,229 @@
+"""
+ASGI serving mode.
+
+    gunicorn -k uvicorn_worker.UvicornWorker -w 4 asgi:app
+    uvicorn asgi:app  # single process, for development
+
+The read-heavy GET routes (artists, artworks, purchases, cart) run as
+coroutines on an async SQLAlchemy engine (aiosqlite or asyncpg, derived
+from DATABASE_URL, or from the replica when DATABASE_REPLICA_URL is set),
+so a worker keeps serving other connections while one waits on the
+database or a slow client. They load through the same Views, serializers,
+ETags and pagination as app.py, so the JSON is byte-for-byte the same.
+Every other request, and any read that would not answer 200 or 304 (a
+missing row, a bad query parameter), is passed to the Flask app unchanged
+through a WSGI adapter, so error responses match too.
+"""
+from contextlib import asynccontextmanager
+from urllib.parse import urlencode
+
+from a2wsgi import WSGIMiddleware
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from werkzeug.http import parse_etags
+
+from app import app as flask_app, ARTIST_VIEW, ARTWORK_SORTS, ARTWORK_VIEW, CART_VIEW, PURCHASE_VIEW
+from database import engine_options, sqlite_pragmas
+from models import db, Artist, Artwork, Cart, ChangeCounter, Purchase, User
+from pagination import keyset_query, keyset_rows, parse_int
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+EXPOSE_HEADERS = "Link, X-Next-Cursor"
+
+
+class Fallback(Exception):
+    """Raised by a handler to let the Flask app answer the request instead."""
+
+
+def async_engine():
+    with flask_app.app_context():
+        bind_key = "replica" if "replica" in db.engines else None
+        url = db.engines[bind_key].url
+    options = engine_options(flask_app.config)
+    if "pool_size" in options:
+        # aiosqlite defaults to NullPool, which takes no sizing.
+        options["poolclass"] = AsyncAdaptedQueuePool
+    engine = create_async_engine(url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()]), **options)
+    sqlite_pragmas(engine.sync_engine, flask_app.config, readonly=bind_key == "replica")
+    return engine
+
+
+engine = async_engine()
+Session = async_sessionmaker(engine, expire_on_commit=False)
+wsgi = WSGIMiddleware(flask_app)
+
+
+class ReadRoute:
+    """
+    ASGI endpoint for a GET handler `handler(request, session, **path_params)`,
+    which returns (etag or None, build) where `await build()` returns
+    (data, extra headers). Anything else goes to the Flask app.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+
+    async def __call__(self, scope, receive, send):
+        request = Request(scope, receive)
+        if scope["method"] != "GET" or request.query_params.get("stream") not in (None, "", "0", "false"):
+            # Writes, and ?stream=1 (streaming.py), are served by Flask.
+            return await wsgi(scope, receive, send)
+        try:
+            async with Session() as session:
+                response = await self.respond(request, session)
+        except Fallback:
+            return await wsgi(scope, receive, send)
+        await response(scope, receive, send)
+
+    async def respond(self, request, session):
+        etag, build = await self.handler(request, session, **request.path_params)
+        if etag is not None:
+            if_none_match = parse_etags(request.headers.get("if-none-match"))
+            if if_none_match.contains(etag) or if_none_match.star_tag:
+                return self.finish(request, Response(status_code=304), etag)
+        data, headers = await build()
+        body = flask_app.json.dumps(data, separators=(",", ":")) + "\n"
+        return self.finish(request, Response(body, media_type="application/json", headers=headers), etag)
+
+    def finish(self, request, response, etag):
+        if etag is not None:
+            response.headers["ETag"] = f'"{etag}"'
+        # What flask-cors adds to the Flask responses.
+        origin = request.headers.get("origin")
+        if origin:
+            response.headers["Access-Control-Allow-Origin"] = origin
+            response.headers["Access-Control-Expose-Headers"] = EXPOSE_HEADERS
+            response.headers["Access-Control-Allow-Credentials"] = "true"
+            response.headers["Vary"] = "Origin"
+        return response
+
+
+def next_page_headers(request, next_cursor):
+    """The headers app.paginated adds."""
+    if not next_cursor:
+        return {}
+    args = dict(request.query_params)
+    args["after"] = next_cursor
+    url = f"{request.url.scheme}://{request.url.netloc}{request.url.path}?{urlencode(args)}"
+    return {"X-Next-Cursor": next_cursor, "Link": f'<{url}>; rel="next"'}
+
+
+async def read_counters(session, *names):
+    values = dict((await session.execute(
+        select(ChangeCounter.name, ChangeCounter.value).where(ChangeCounter.name.in_(names))
+    )).all())
+    return tuple(values.get(n, 0) for n in names)
+
+
+async def get_or_fallback(session, view, ident):
+    obj = await session.get(view.model, ident, options=view.options)
+    if obj is None:
+        raise Fallback()
+    return obj
+
+
+# --- ARTISTS ---
+async def get_artists(request, session):
+    async def build():
+        artists = (await session.scalars(ARTIST_VIEW.select())).unique().all()
+        return ARTIST_VIEW.dump_many(artists), {}
+    return "artists-%d" % await read_counters(session, "artists"), build
+
+
+async def get_artist(request, session, artist_id):
+    version = await session.scalar(select(Artist.version).where(Artist.id == artist_id))
+    if version is None:
+        raise Fallback()
+
+    async def build():
+        return ARTIST_VIEW.dump(await get_or_fallback(session, ARTIST_VIEW, artist_id)), {}
+    return f"artist-{artist_id}-{version}", build
+
+
+# --- ARTWORKS ---
+async def get_artworks(request, session):
+    args = request.query_params
+    sort = args.get("sort", "id")
+    if sort not in ARTWORK_SORTS:
+        raise Fallback()
+    try:
+        limit = parse_int(args, "limit", flask_app.config["ARTWORKS_PAGE_SIZE"],
+                          minimum=1, maximum=flask_app.config["ARTWORKS_MAX_PAGE_SIZE"])
+        artist_id = parse_int(args, "artist_id")
+        min_price = parse_int(args, "min_price")
+        max_price = parse_int(args, "max_price")
+        stmt = ARTWORK_VIEW.select()
+        if artist_id is not None: stmt = stmt.filter(Artwork.artist_id == artist_id)
+        if min_price is not None: stmt = stmt.filter(Artwork.price >= min_price)
+        if max_price is not None: stmt = stmt.filter(Artwork.price <= max_price)
+        columns, descending = ARTWORK_SORTS[sort]
+        stmt = keyset_query(stmt, columns, limit, args.get("after"), descending)
+    except ValueError:
+        raise Fallback()
+
+    async def build():
+        arts, next_cursor = keyset_rows((await session.scalars(stmt)).unique().all(), columns, limit)
+        return ARTWORK_VIEW.dump_many(arts), next_page_headers(request, next_cursor)
+    return "artworks-%d-%d" % await read_counters(session, "artworks", "artists"), build
+
+
+async def get_artwork(request, session, artwork_id):
+    row = (await session.execute(
+        select(Artwork.version, Artist.version).join(Artwork.artist).where(Artwork.id == artwork_id)
+    )).first()
+    if row is None:
+        raise Fallback()
+
+    async def build():
+        return ARTWORK_VIEW.dump(await get_or_fallback(session, ARTWORK_VIEW, artwork_id)), {}
+    return f"artwork-{artwork_id}-{row[0]}-{row[1]}", build
+
+
+# --- PURCHASES ---
+async def get_purchase(request, session, purchase_id):
+    async def build():
+        return PURCHASE_VIEW.dump(await get_or_fallback(session, PURCHASE_VIEW, purchase_id)), {}
+    return None, build
+
+
+async def get_user_purchases(request, session, user_id):
+    async def build():
+        purchases = (await session.scalars(PURCHASE_VIEW.select().filter(Purchase.user_id == user_id))).unique().all()
+        return PURCHASE_VIEW.dump_many(purchases), {}
+    return None, build
+
+
+# --- CART ---
+async def view_cart(request, session, user_id):
+    async def build():
+        if await session.scalar(select(User.id).where(User.id == user_id)) is None:
+            raise Fallback()
+        items = (await session.scalars(CART_VIEW.select().filter(Cart.user_id == user_id))).unique().all()
+        return CART_VIEW.dump_many(items), {}
+    return None, build
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await engine.dispose()
+
+
+app = Starlette(
+    routes=[
+        Route("/artists", ReadRoute(get_artists)),
+        Route("/artists/{artist_id:int}", ReadRoute(get_artist)),
+        Route("/artworks", ReadRoute(get_artworks)),
+        Route("/artworks/{artwork_id:int}", ReadRoute(get_artwork)),
+        Route("/purchases/{purchase_id:int}", ReadRoute(get_purchase)),
+        Route("/purchases/user/{user_id:int}", ReadRoute(get_user_purchases)),
+        Route("/cart/{user_id:int}", ReadRoute(view_cart)),
+        Mount("/", wsgi),
+    ],
+    lifespan=lifespan,
+)
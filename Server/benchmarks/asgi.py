@@ -0,0 +1,96 @@
+"""
+Sync (app:app) vs async (asgi:app) serving of the read routes.
+
+    cd Server
+    python -m benchmarks.asgi --scale 100k --workers 2 --connections 1,8,32,64
+
+Builds one synthetic SQLite database, starts gunicorn against it once
+with sync workers and once with uvicorn workers, the same number of
+each, and drives the async read routes from an increasing number of
+concurrent keep-alive connections. Before timing,
+every route's body is fetched from both servers and compared, and the
+run fails if they differ. Prints throughput and p50/p95 per route,
+server and connection count, and writes the JSON report to --output.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+from benchmarks.routes import HTTPTransport, SERVER_DIR, State, run_scenario, start_gunicorn
+
+ROUTES = [
+    ("GET /artworks", lambda s: "/artworks?limit=20"),
+    ("GET /artworks/<id>", lambda s: f"/artworks/{s.random_id('artworks')}"),
+    ("GET /artists/<id>", lambda s: f"/artists/{s.random_id('artists')}"),
+    ("GET /purchases/user/<id>", lambda s: f"/purchases/user/{s.random_id('users')}"),
+    ("GET /cart/<id>", lambda s: f"/cart/{s.random_id('users')}"),
+]
+
+
+def check_parity(ports, state):
+    """Fetch one URL per route from every server; return the routes whose bodies differ."""
+    mismatched = []
+    for name, path_for in ROUTES:
+        path = path_for(state)
+        bodies = {HTTPTransport("127.0.0.1", port).request("GET", path) for port in ports}
+        if len(bodies) != 1:
+            mismatched.append(f"{name} ({path})")
+    return mismatched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", default="1k", help="synthetic dataset size: 1k, 100k, 1m or a number of artworks")
+    parser.add_argument("--workers", type=int, default=2, help="worker processes per server")
+    parser.add_argument("--connections", default="1,8,32,64", help="comma-separated concurrent connection counts")
+    parser.add_argument("--requests", type=int, default=500, help="timed requests per route and connection count")
+    parser.add_argument("--warmup", type=int, default=2, help="untimed requests per connection")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="asgi-bench-")
+    sys.path.insert(0, SERVER_DIR)
+    import seeding
+
+    path = os.path.join(workdir, "bench.db")
+    seeding.build_sqlite(path, seeding.Dataset.from_scale(args.scale), args.seed)
+    env = dict(os.environ, DATABASE_URL="sqlite:///" + path, RATELIMIT_STORAGE="null",
+               RESPONSE_CACHE_DIR=os.path.join(workdir, "cache"))
+    state = State(env["DATABASE_URL"], args.seed)
+    connections = [int(c) for c in args.connections.split(",")]
+
+    servers, report = {}, {}
+    try:
+        servers["sync"] = start_gunicorn(args.workers, env)
+        servers["async"] = start_gunicorn(args.workers, env, "asgi:app", "uvicorn_worker.UvicornWorker")
+        mismatched = check_parity([port for _, port in servers.values()], state)
+        if mismatched:
+            sys.exit(f"sync and async responses differ: {', '.join(mismatched)}")
+        for name, path_for in ROUTES:
+            build = lambda transport: ("GET", path_for(state), None, None, None)
+            for count in connections:
+                for kind, (_, port) in servers.items():
+                    transports = [HTTPTransport("127.0.0.1", port) for _ in range(count)]
+                    result = run_scenario(build, transports, args.requests, args.warmup)
+                    report.setdefault(name, {}).setdefault(kind, {})[count] = result
+                    print(f"{name:26} {kind:5} x{count:<3} {result['throughput_rps']:>8} req/s  "
+                          f"p50 {result['p50_ms']}ms  p95 {result['p95_ms']}ms  errors {result['errors']}",
+                          file=sys.stderr)
+    finally:
+        for process, _ in servers.values():
+            process.terminate()
+            process.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"scale": args.scale, "workers": args.workers, "routes": report}, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Concurrent checkout load test.
+
+    cd Server && python -m benchmarks.checkout --users 50 --artworks 200 --threads 16
+
+Every user fills a cart with random artworks drawn from a shared pool, so
+carts overlap heavily, then all users check out at once. Reports
+throughput and outcome counts and fails if any artwork was sold twice.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+from sqlalchemy import func
+
+from app import app, db
+from models import Artist, Artwork, Cart, Purchase, User
+
+
+def seed(users, artworks, cart_size, rng):
+    db.drop_all()
+    db.create_all()
+    db.session.execute(Artist.__table__.insert(), [{"id": 1, "name": "Artist"}])
+    db.session.execute(Artwork.__table__.insert(), [
+        {"id": i + 1, "title": f"Artwork {i}", "price": 100 + i, "artist_id": 1} for i in range(artworks)
+    ])
+    db.session.execute(User.__table__.insert(), [
+        {"id": i + 1, "userName": f"user{i}", "email": f"user{i}@example.com", "password": "x"}
+        for i in range(users)
+    ])
+    db.session.execute(Cart.__table__.insert(), [
+        {"user_id": u + 1, "artwork_id": a}
+        for u in range(users) for a in rng.sample(range(1, artworks + 1), cart_size)
+    ])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--artworks", type=int, default=200)
+    parser.add_argument("--cart-size", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with app.app_context():
+        seed(args.users, args.artworks, args.cart_size, random.Random(args.seed))
+
+    def run(user_id):
+        with app.test_client() as client:
+            return client.post(f"/cart/checkout/{user_id}", headers={"Idempotency-Key": f"bench-{user_id}"}).status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        statuses = Counter(pool.map(run, range(1, args.users + 1)))
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        duplicates = db.session.query(Purchase.artwork_id).group_by(Purchase.artwork_id) \
+            .having(func.count() > 1).count()
+        sold = db.session.query(func.count(Purchase.id)).scalar()
+
+    print(f"checkouts:       {args.users} in {elapsed:.2f}s ({args.users / elapsed:,.1f}/s)")
+    print(f"statuses:        {dict(sorted(statuses.items()))}")
+    print(f"artworks sold:   {sold}")
+    print(f"duplicate sales: {duplicates}")
+    sys.exit(1 if duplicates else 0)
+
+
+if __name__ == "__main__":
+    main()
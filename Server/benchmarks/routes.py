@@ -0,0 +1,516 @@
+"""
+Benchmark and load test for every API route.
+
+    cd Server
+    python -m benchmarks.routes --scale 100k --requests 200
+    python -m benchmarks.routes --mode gunicorn --workers 4 --concurrency 16
+    python -m benchmarks.routes --baseline before.json --output after.json
+
+By default a synthetic dataset is built into a temporary SQLite database
+(seeding.build_sqlite); --database runs against an existing one
+instead, which the write scenarios will modify. `client` mode drives the
+app in-process through the Flask test client; `gunicorn` mode starts a
+real gunicorn server and drives it over HTTP from --concurrency threads.
+
+The JSON report has p50/p95/p99 latency, throughput and status counts per
+scenario, plus peak RSS (of this process, or of the gunicorn master and
+workers combined). With --baseline, the run exits non-zero when a gated
+scenario's p95 regresses by more than --tolerance.
+"""
+import argparse
+import base64
+import http.client
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from hashlib import sha256
+from http.cookies import SimpleCookie
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A 1x1 PNG, so the image routes have a real derivative to serve.
+PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=="
+)
+UPLOAD = b"route benchmark upload\n"
+
+# Scenarios whose p95 is compared against --baseline.
+GATED = ("GET /artworks", "GET /artworks sorted", "GET /artworks/search", "GET /artists",
+         "GET /users", "POST /login", "POST /cart/checkout")
+
+
+class Transport:
+    """Issues one request and returns (status, body bytes)."""
+
+    def request(self, method, path, json_body=None, data=None, headers=None):
+        raise NotImplementedError
+
+
+class ClientTransport(Transport):
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, json_body=None, data=None, headers=None):
+        response = self.client.open(path, method=method, json=json_body, data=data, headers=headers)
+        return response.status_code, response.get_data()
+
+
+class HTTPTransport(Transport):
+    def __init__(self, host, port):
+        self.connection = http.client.HTTPConnection(host, port, timeout=60)
+        self.cookies = SimpleCookie()
+
+    def request(self, method, path, json_body=None, data=None, headers=None):
+        headers = dict(headers or {})
+        if json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers["Content-Type"] = "application/json"
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={m.value}" for k, m in self.cookies.items())
+        for attempt in range(2):
+            try:
+                self.connection.request(method, path, body=data, headers=headers)
+                response = self.connection.getresponse()
+                body = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # gunicorn's sync workers close the connection after each response.
+                self.connection.close()
+                if attempt:
+                    raise
+        for value in response.headers.get_all("Set-Cookie") or ():
+            self.cookies.load(value)
+        return response.status, body
+
+
+class State:
+    """Id ranges of the seeded rows, and a source of unique names."""
+
+    def __init__(self, database, seed):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counter = itertools.count(1)
+        self.max_ids = {}
+        if database.startswith("sqlite:///"):
+            with sqlite3.connect(database[len("sqlite:///"):]) as conn:
+                for table in ("artists", "artworks", "users", "purchases"):
+                    self.max_ids[table] = conn.execute(f"SELECT coalesce(max(id), 1) FROM {table}").fetchone()[0]
+        else:
+            from sqlalchemy import create_engine, text
+            with create_engine(database).connect() as conn:
+                for table in ("artists", "artworks", "users", "purchases"):
+                    self.max_ids[table] = conn.execute(text(f"SELECT coalesce(max(id), 1) FROM {table}")).scalar()
+        self.image_sha = None
+
+    def random_id(self, table):
+        with self.lock:
+            return self.rng.randint(1, self.max_ids[table])
+
+    def unique(self):
+        return f"{os.getpid()}-{next(self.counter)}"
+
+
+def _created_id(transport, method, path, json_body, key=None):
+    status, body = transport.request(method, path, json_body)
+    if status >= 300:
+        return None
+    data = json.loads(body)
+    return (data[key] if key else data)["id"]
+
+
+def _new_artist(state):
+    return lambda t: _created_id(t, "POST", "/artists", {"name": f"Bench artist {state.unique()}"})
+
+
+def _new_artwork(state):
+    return lambda t: _created_id(t, "POST", "/artworks", {
+        "title": f"Bench artwork {state.unique()}", "price": 1000, "artist_id": state.random_id("artists")})
+
+
+def _new_user(state):
+    def create(t):
+        name = f"bench{state.unique()}"
+        return _created_id(t, "POST", "/signup", {"userName": name, "email": f"{name}@example.com",
+                                                   "password": "benchpass"})
+    return create
+
+
+def _new_purchase(state):
+    return lambda t: _created_id(t, "POST", "/purchases", {
+        "user_id": state.random_id("users"), "artwork_id": state.random_id("artworks"),
+        "price_paid": 1000, "date": "2024-01-01T00:00:00"})
+
+
+def _new_cart(state):
+    def create(t):
+        status, body = t.request("POST", "/cart", {"user_id": state.random_id("users"),
+                                                   "artwork_id": state.random_id("artworks")})
+        if status >= 300:
+            return None
+        data = json.loads(body)
+        return data.get("cart_item", data)["id"]
+    return create
+
+
+def _new_listing(state):
+    """A listing of a fresh artwork by a user other than user1, who the transports log in as."""
+    def create(t):
+        purchase_id = _created_id(t, "POST", "/purchases", {
+            "user_id": max(2, state.random_id("users")), "artwork_id": _new_artwork(state)(t),
+            "price_paid": 1000, "date": "2024-01-01T00:00:00"})
+        return _created_id(t, "DELETE", f"/purchases/{purchase_id}", None, "sell")
+    return create
+
+
+def _checkout(state, t):
+    user_id = state.random_id("users")
+    for _ in range(2):
+        t.request("POST", "/cart", {"user_id": user_id, "artwork_id": state.random_id("artworks")})
+    return "POST", f"/cart/checkout/{user_id}", None, None, {"Idempotency-Key": state.unique()}
+
+
+def _bulk(state, t):
+    rows = "".join(json.dumps({"title": f"Bulk {state.unique()}", "price": 10, "artist_id": state.random_id("artists")})
+                   + "\n" for _ in range(100))
+    return "POST", "/bulk/artworks", None, rows.encode(), {"Content-Type": "application/x-ndjson"}
+
+
+def scenarios(state):
+    """
+    (name, url rule, method, build) for every route. `build(transport)` may
+    issue untimed setup requests, e.g. creating the row a DELETE removes,
+    and returns the timed request as (method, path, json, data, headers).
+    """
+    s = state
+    get = lambda path: lambda t: ("GET", path() if callable(path) else path, None, None, None)
+    return [
+        ("GET /", "/", "GET", get("/")),
+        ("GET /artists", "/artists", "GET", get("/artists")),
+        ("GET /artists/<id>", "/artists/<int:artist_id>", "GET", get(lambda: f"/artists/{s.random_id('artists')}")),
+        ("POST /artists", "/artists", "POST", lambda t: (
+            "POST", "/artists", {"name": f"Bench artist {s.unique()}"}, None, None)),
+        ("PATCH /artists/<id>", "/artists/<int:artist_id>", "PATCH", lambda t: (
+            "PATCH", f"/artists/{s.random_id('artists')}", {"bio": f"Updated {s.unique()}"}, None, None)),
+        ("DELETE /artists/<id>", "/artists/<int:artist_id>", "DELETE", lambda t: (
+            "DELETE", f"/artists/{_new_artist(s)(t)}", None, None, None)),
+        ("GET /artworks", "/artworks", "GET", get("/artworks")),
+        ("GET /artworks sorted", "/artworks", "GET", get(
+            lambda: f"/artworks?sort=-price&min_price=1000&artist_id={s.random_id('artists')}")),
+        ("GET /artworks/search", "/artworks/search", "GET", get(lambda: f"/artworks/search?q=number+{s.random_id('artworks')}")),
+        ("GET /artworks/<id>", "/artworks/<int:artwork_id>", "GET", get(lambda: f"/artworks/{s.random_id('artworks')}")),
+        ("POST /artworks", "/artworks", "POST", lambda t: ("POST", "/artworks", {
+            "title": f"Bench artwork {s.unique()}", "price": 1000, "artist_id": s.random_id("artists")}, None, None)),
+        ("PATCH /artworks/<id>", "/artworks/<int:artwork_id>", "PATCH", lambda t: (
+            "PATCH", f"/artworks/{s.random_id('artworks')}", {"price": s.rng.randint(100, 100000)}, None, None)),
+        ("DELETE /artworks/<id>", "/artworks/<int:artwork_id>", "DELETE", lambda t: (
+            "DELETE", f"/artworks/{_new_artwork(s)(t)}", None, None, None)),
+        ("POST /signup", "/signup", "POST", lambda t: ("POST", "/signup", {
+            "userName": f"bench{s.unique()}", "email": f"bench{s.unique()}@example.com", "password": "benchpass"},
+            None, None)),
+        ("POST /login", "/login", "POST", lambda t: ("POST", "/login", {
+            "email": f"user{s.random_id('users')}@example.com", "password": "password123"}, None, None)),
+        ("GET /users", "/users", "GET", get("/users")),
+        ("GET /users/<id>", "/users/<int:user_id>", "GET", get(lambda: f"/users/{s.random_id('users')}")),
+        ("PATCH /users/<id>", "/users/<int:user_id>", "PATCH", lambda t: (
+            "PATCH", f"/users/{s.random_id('users')}", {"role": "user"}, None, None)),
+        ("DELETE /users/<id>", "/users/<int:user_id>", "DELETE", lambda t: (
+            "DELETE", f"/users/{_new_user(s)(t)}", None, None, None)),
+        ("POST /purchases", "/purchases", "POST", lambda t: ("POST", "/purchases", {
+            "user_id": s.random_id("users"), "artwork_id": s.random_id("artworks"), "price_paid": 1000,
+            "date": "2024-01-01T00:00:00"}, None, None)),
+        ("GET /purchases/<id>", "/purchases/<int:purchase_id>", "GET", get(lambda: f"/purchases/{s.random_id('purchases')}")),
+        ("GET /purchases/user/<id>", "/purchases/user/<int:user_id>", "GET", get(
+            lambda: f"/purchases/user/{s.random_id('users')}")),
+        ("DELETE /purchases/<id>", "/purchases/<int:purchase_id>", "DELETE", lambda t: (
+            "DELETE", f"/purchases/{_new_purchase(s)(t)}", None, None, None)),
+        ("GET /catalogue", "/catalogue", "GET", get("/catalogue")),
+        ("GET /catalogue filtered", "/catalogue", "GET", get(
+            lambda: f"/catalogue?sort=-price&available=1&artist_id={s.random_id('artists')}")),
+        ("GET /listings", "/listings", "GET", get("/listings")),
+        ("GET /listings by price", "/listings", "GET", get("/listings?sort=price&min_price=1000")),
+        ("POST /listings/<id>/buy", "/listings/<int:listing_id>/buy", "POST", lambda t: (
+            "POST", f"/listings/{_new_listing(s)(t)}/buy", None, None, None)),
+        ("POST /upload", "/upload", "POST", lambda t: ("POST", "/upload", None, UPLOAD,
+                                                       {"Content-Type": "application/octet-stream"})),
+        ("GET /images/<sha>", "/images/<sha256>/<int:width>.<any(jpg, webp):fmt>", "GET", get(
+            lambda: f"/images/{s.image_sha}/320.webp")),
+        ("POST /cart", "/cart", "POST", lambda t: ("POST", "/cart", {
+            "user_id": s.random_id("users"), "artwork_id": s.random_id("artworks")}, None, None)),
+        ("POST /cart/batch", "/cart/batch", "POST", lambda t: ("POST", "/cart/batch", {
+            "user_id": s.random_id("users"), "artwork_ids": [s.random_id("artworks") for _ in range(10)]},
+            None, None)),
+        ("GET /cart/<user_id>", "/cart/<int:user_id>", "GET", get(lambda: f"/cart/{s.random_id('users')}")),
+        ("DELETE /cart/<id>", "/cart/<int:cart_id>", "DELETE", lambda t: (
+            "DELETE", f"/cart/{_new_cart(s)(t)}", None, None, None)),
+        ("POST /cart/checkout", "/cart/checkout/<int:user_id>", "POST", lambda t: _checkout(s, t)),
+        ("POST /bulk/artworks", "/bulk/<any(artists, artworks):kind>", "POST", lambda t: _bulk(s, t)),
+        ("GET /export/artists", "/export/<any(artists, artworks):kind>", "GET", get("/export/artists")),
+        ("GET /analytics/artists", "/analytics/artists", "GET", get("/analytics/artists")),
+        ("GET /analytics/artworks", "/analytics/artworks", "GET", get("/analytics/artworks")),
+        ("GET /analytics/daily", "/analytics/daily", "GET", get("/analytics/daily?from=2024-01-01&to=2024-03-31")),
+        ("GET /seed-check", "/seed-check", "GET", get("/seed-check")),
+        ("GET /seed-check approximate", "/seed-check", "GET", get("/seed-check?approximate=1")),
+        ("GET /healthz", "/healthz", "GET", get("/healthz")),
+        ("GET /internal/metrics", "/internal/metrics", "GET", get("/internal/metrics")),
+        ("GET /internal/cache-stats", "/internal/cache-stats", "GET", get("/internal/cache-stats")),
+        # Last: it ends the session POST /purchases needs.
+        ("POST /logout", "/logout", "POST", lambda t: ("POST", "/logout", None, None, None)),
+    ]
+
+
+def check_coverage(app, scenario_list):
+    covered = {(rule, method) for _, rule, method, _ in scenario_list}
+    missing = sorted(
+        f"{method} {rule.rule}" for rule in app.url_map.iter_rules() if rule.endpoint != "static"
+        for method in rule.methods - {"HEAD", "OPTIONS"} if (rule.rule, method) not in covered
+    )
+    if missing:
+        print(f"warning: no scenario for {', '.join(missing)}", file=sys.stderr)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(build, transports, requests, warmup):
+    """Run `requests` timed requests spread over `transports` (one thread each)."""
+    latencies, statuses = [], Counter()
+    lock = threading.Lock()
+    tickets = itertools.count()
+
+    def loop(transport):
+        while next(tickets) < requests:
+            method, path, json_body, data, headers = build(transport)
+            start = time.perf_counter()
+            try:
+                status, _ = transport.request(method, path, json_body, data, headers)
+            except (OSError, http.client.HTTPException):
+                status = "error"
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[str(status)] += 1
+
+    for transport in transports:
+        for _ in range(warmup):
+            transport.request(*build(transport))
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=loop, args=(t,)) for t in transports]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    ms = lambda v: None if v is None else round(v * 1000, 3)
+    errors = sum(n for s, n in statuses.items() if s == "error" or int(s) >= 500)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": dict(sorted(statuses.items())),
+        "throughput_rps": round(len(latencies) / wall, 1) if wall else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+        "max_ms": ms(latencies[-1] if latencies else None),
+    }
+
+
+def _rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except FileNotFoundError:
+        pass
+    return 0
+
+
+def _children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except FileNotFoundError:
+        return []
+
+
+class RSSMonitor(threading.Thread):
+    """Samples the combined RSS of a process tree and keeps the peak."""
+
+    def __init__(self, pid, interval=0.1):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_kb = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            total = _rss_kb(self.pid) + sum(_rss_kb(c) for c in _children(self.pid))
+            self.peak_kb = max(self.peak_kb, total)
+
+
+def start_server(command, env, name="server"):
+    """Start `command(port)` on a free port and wait until it accepts connections."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen(command(port), cwd=SERVER_DIR, env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"{name} did not start")
+
+
+def start_gunicorn(workers, env, app="app:app", worker_class="sync"):
+    return start_server(
+        lambda port: [sys.executable, "-m", "gunicorn", "-w", str(workers), "-k", worker_class,
+                      "-b", f"127.0.0.1:{port}", "--log-level", "warning", app], env, "gunicorn")
+
+
+def compare(report, baseline, tolerance):
+    regressions = []
+    for name in GATED:
+        new, old = report["routes"].get(name), baseline["routes"].get(name)
+        if new and old and new["p95_ms"] and old["p95_ms"] and new["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {old['p95_ms']}ms -> {new['p95_ms']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mode", choices=("client", "gunicorn"), default="client")
+    parser.add_argument("--scale", default="1k", help="synthetic dataset size: 1k, 100k, 1m or a number of artworks")
+    parser.add_argument("--database", help="existing DATABASE_URL to run against instead of seeding (it is modified)")
+    parser.add_argument("--requests", type=int, default=100, help="timed requests per scenario")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests per scenario and connection")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads (gunicorn mode)")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers")
+    parser.add_argument("--only", help="run only scenarios whose name contains this string")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="JSON report to compare gated scenarios against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 regression, as a fraction")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="route-bench-")
+    sys.path.insert(0, SERVER_DIR)
+    import seeding
+
+    database = args.database
+    if not database:
+        path = os.path.join(workdir, "bench.db")
+        seeding.build_sqlite(path, seeding.Dataset.from_scale(args.scale), args.seed)
+        database = "sqlite:///" + path
+    os.environ["DATABASE_URL"] = database
+    os.environ.setdefault("RESPONSE_CACHE_DIR", os.path.join(workdir, "cache"))
+    # The login, signup and upload scenarios would otherwise mostly measure 429s.
+    os.environ.setdefault("RATELIMIT_STORAGE", "null")
+
+    from app import app, upload_root
+
+    root = upload_root()
+    stored = [os.path.join(root, h[:2], h[2:4]) for h in (sha256(PNG).hexdigest(), sha256(UPLOAD).hexdigest())]
+    existing_uploads = {p for d in stored if os.path.isdir(d) for p in os.listdir(d)}
+    state = State(database, args.seed)
+    scenario_list = scenarios(state)
+    check_coverage(app, scenario_list)
+    if args.only:
+        scenario_list = [s for s in scenario_list if args.only in s[0]]
+
+    process = monitor = None
+    try:
+        if args.mode == "client":
+            app.config["TESTING"] = True
+            app.config["QUERY_BUDGET_ENFORCE"] = False
+            transports = [ClientTransport(app)]
+        else:
+            process, port = start_gunicorn(args.workers, dict(os.environ))
+            monitor = RSSMonitor(process.pid)
+            monitor.start()
+            transports = [HTTPTransport("127.0.0.1", port) for _ in range(args.concurrency)]
+
+        for transport in transports:
+            # POST /purchases needs a session; the image routes need an image.
+            transport.request("POST", "/login", {"email": "user1@example.com", "password": seeding.SYNTHETIC_PASSWORD})
+        status, body = transports[0].request("POST", "/upload", data=PNG, headers={"Content-Type": "image/png"})
+        state.image_sha = json.loads(body)["sha256"] if status == 201 else "0" * 64
+
+        routes = {}
+        for name, rule, method, build in scenario_list:
+            routes[name] = run_scenario(build, transports, args.requests, args.warmup)
+            print(f"{name:28} p50 {routes[name]['p50_ms']}ms  p95 {routes[name]['p95_ms']}ms  "
+                  f"{routes[name]['throughput_rps']} req/s  {routes[name]['statuses']}", file=sys.stderr)
+    finally:
+        if process is not None:
+            monitor.stopped.set()
+            process.terminate()
+            process.wait()
+        # Remove what the upload scenarios stored; everything else lives in workdir.
+        for folder in stored:
+            if os.path.isdir(folder):
+                for name in set(os.listdir(folder)) - existing_uploads:
+                    os.unlink(os.path.join(folder, name))
+                for directory in (folder, os.path.dirname(folder)):
+                    try:
+                        os.rmdir(directory)
+                    except OSError:
+                        break
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    peak_kb = monitor.peak_kb if monitor else resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    report = {
+        "meta": {
+            "mode": args.mode,
+            "scale": None if args.database else args.scale,
+            "requests": args.requests,
+            "concurrency": len(transports),
+            "workers": args.workers if args.mode == "gunicorn" else None,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+        "routes": routes,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"regression: {line}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
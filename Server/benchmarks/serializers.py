@@ -0,0 +1,79 @@
+"""
+Compare SerializerMixin.to_dict against the precompiled serializers.
+
+    cd Server && python -m benchmarks.serializers --rows 100000
+
+Rows are loaded (with their relationships) before timing, so only
+serialization and JSON encoding are measured.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+from sqlalchemy.orm import selectinload
+
+from app import app, db
+from models import Artist, Artwork
+from serializers import compile_serializer, serialize_many
+
+RULES = ("-artist.artworks",)
+
+
+def seed(rows):
+    db.drop_all()
+    db.create_all()
+    artists = max(rows // 100, 1)
+    db.session.execute(Artist.__table__.insert(), [
+        {"id": i + 1, "name": f"Artist {i}", "bio": "Bio"} for i in range(artists)
+    ])
+    db.session.execute(Artwork.__table__.insert(), [
+        {"title": f"Artwork {i}", "price": i * 7 % 100000, "artist_id": i % artists + 1,
+         "description": "An artwork", "image_url": f"/static/uploads/{i}.jpg"}
+        for i in range(rows)
+    ])
+    db.session.commit()
+
+
+def load():
+    db.session.expunge_all()
+    return Artwork.query.options(
+        selectinload(Artwork.cart), selectinload(Artwork.purchases), selectinload(Artwork.sells)
+    ).all()
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with app.app_context():
+        seed(args.rows)
+        arts = load()
+        compile_serializer(Artwork, RULES)
+
+        legacy_t, legacy = timed(lambda: app.json.dumps([a.to_dict(rules=RULES) for a in arts]), args.repeat)
+        fast_t, fast = timed(lambda: app.json.dumps(serialize_many(Artwork, arts, RULES)), args.repeat)
+
+    print(f"rows:            {args.rows}")
+    print(f"to_dict:         {legacy_t:.3f}s ({args.rows / legacy_t:,.0f} rows/s)")
+    print(f"compiled:        {fast_t:.3f}s ({args.rows / fast_t:,.0f} rows/s)")
+    print(f"speedup:         {legacy_t / fast_t:.1f}x")
+    print(f"identical JSON:  {legacy == fast}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Buffered vs streamed (?stream=1) collection responses.
+
+    cd Server && python -m benchmarks.streaming --scales 10000,100000
+
+For each dataset size, builds a synthetic SQLite database and fetches
+/users and /artworks?stream=1 (every artwork) in a fresh process, once
+buffered and once streamed, reporting time to first byte, total time and
+peak traced Python memory. Streamed peak memory should stay flat as the
+scale grows; buffered peak grows with the result.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.routes import SERVER_DIR
+
+PATHS = [
+    ("GET /users", "/users", "/users?stream=1"),
+    # The buffered listing is paginated; its largest page is the comparison.
+    ("GET /artworks", "/artworks?limit=500", "/artworks?stream=1"),
+]
+
+
+def measure(path):
+    """Fetch `path` through the test client without buffering; runs in the child process."""
+    from app import app
+
+    client = app.test_client()
+    client.get("/artworks?limit=1")  # warm up the engine and mappers outside the trace
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.get(path, buffered=False)
+    first_byte, size = None, 0
+    for chunk in response.response:
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        size += len(chunk)
+    response.close()
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    return {"bytes": size, "first_byte_ms": round(first_byte * 1000, 1), "total_ms": round(total * 1000, 1),
+            "peak_mb": round(peak / 1e6, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", default="10000,100000", help="comma-separated numbers of artworks")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        print(json.dumps(measure(args.measure)))
+        return
+
+    sys.path.insert(0, SERVER_DIR)
+    import seeding
+
+    workdir = tempfile.mkdtemp(prefix="stream-bench-")
+    report = {}
+    try:
+        for scale in args.scales.split(","):
+            path = os.path.join(workdir, f"{scale}.db")
+            seeding.build_sqlite(path, seeding.Dataset.from_scale(scale), args.seed)
+            env = dict(os.environ, DATABASE_URL="sqlite:///" + path, RATELIMIT_STORAGE="null",
+                       RESPONSE_CACHE_BACKEND="null")
+            for name, buffered, streamed in PATHS:
+                for mode, url in (("buffered", buffered), ("streamed", streamed)):
+                    output = subprocess.run([sys.executable, "-m", "benchmarks.streaming", "--measure", url],
+                                            cwd=SERVER_DIR, env=env, check=True, capture_output=True, text=True)
+                    result = json.loads(output.stdout.splitlines()[-1])
+                    report.setdefault(name, {}).setdefault(scale, {})[mode] = result
+                    print(f"{name:14} {scale:>8} {mode:8} {result['bytes']:>11} B  first byte {result['first_byte_ms']}ms  "
+                          f"total {result['total_ms']}ms  peak {result['peak_mb']}MB", file=sys.stderr)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+NDJSON bulk import and export for artists and artworks.
+
+Import reads one JSON object per line and inserts valid rows in batched
+executemany chunks; artwork artist ids are checked against the set of
+artist ids loaded once up front rather than with a query per row. Invalid
+lines are skipped and reported by line number. Export streams rows with a
+server-side cursor, so memory use does not grow with the table.
+"""
+import json
+
+from sqlalchemy import select
+
+from models import db, Artist, Artwork
+
+BATCH_SIZE = 1000
+MAX_ERRORS = 100
+
+
+class Kind:
+    def __init__(self, model, required, optional):
+        self.model = model
+        self.table = model.__table__
+        self.required = required
+        self.fields = ("id",) + required + optional
+
+
+KINDS = {
+    "artists": Kind(Artist, ("name",), ("bio", "profile_pic", "email")),
+    "artworks": Kind(Artwork, ("title", "price", "artist_id"), ("description", "image_url")),
+}
+
+
+class ImportResult:
+    def __init__(self):
+        self.inserted = 0
+        self.errors = []
+        self.error_count = 0
+        self.artist_ids = set()
+
+    def error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def to_dict(self):
+        return {"inserted": self.inserted, "skipped": self.error_count, "errors": self.errors}
+
+
+def _validate(kind, raw, known_artists):
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        return None, "Invalid JSON"
+    if not isinstance(data, dict):
+        return None, "Expected a JSON object"
+    missing = [f for f in kind.required if data.get(f) is None]
+    if missing:
+        return None, f"Missing {', '.join(missing)}"
+    unknown = set(data) - set(kind.fields)
+    if unknown:
+        return None, f"Unknown fields {', '.join(sorted(unknown))}"
+    for field in ("id", "price", "artist_id"):
+        value = data.get(field)
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+            return None, f"'{field}' must be an integer"
+    if kind.model is Artwork and data["artist_id"] not in known_artists:
+        return None, f"Artist {data['artist_id']} not found"
+    return data, None
+
+
+def import_rows(kind_name, lines, batch_size=BATCH_SIZE):
+    """
+    Insert NDJSON `lines` (bytes or str) as `kind_name` rows. The caller
+    commits; an IntegrityError (e.g. a duplicate id) aborts the import.
+    """
+    kind = KINDS[kind_name]
+    result = ImportResult()
+    known_artists = set(db.session.scalars(select(Artist.id))) if kind.model is Artwork else set()
+    # executemany needs the same keys in every row, so rows with and
+    # without an explicit id go to separate batches.
+    batches = {True: [], False: []}
+
+    def flush(batch):
+        if batch:
+            db.session.execute(kind.table.insert(), batch)
+            result.inserted += len(batch)
+            batch.clear()
+
+    for number, raw in enumerate(lines, 1):
+        if not raw.strip():
+            continue
+        data, error = _validate(kind, raw, known_artists)
+        if error:
+            result.error(number, error)
+            continue
+        has_id = data.get("id") is not None
+        fields = kind.fields if has_id else kind.fields[1:]
+        batch = batches[has_id]
+        batch.append({f: data.get(f) for f in fields})
+        if kind.model is Artwork:
+            result.artist_ids.add(data["artist_id"])
+        if len(batch) >= batch_size:
+            flush(batch)
+    for batch in batches.values():
+        flush(batch)
+    return result
+
+
+def export_rows(kind_name, yield_per=BATCH_SIZE):
+    """Yield `kind_name` rows as NDJSON lines, ordered by id."""
+    kind = KINDS[kind_name]
+    columns = [kind.table.c[f] for f in kind.fields]
+    rows = db.session.execute(
+        select(*columns).order_by(kind.table.c.id).execution_options(yield_per=yield_per)
+    )
+    for row in rows:
+        yield json.dumps(dict(zip(kind.fields, row)), separators=(",", ":")) + "\n"
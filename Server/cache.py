@@ -0,0 +1,243 @@
+"""
+Read-through response cache for catalogue GET routes.
+
+Entries are tagged (e.g. "artworks", "artwork:3"). Each tag has a
+generation that mutation handlers bump after they commit; an entry is only
+served while every tag still has the generation it was stored under. The
+generations are captured before the view runs, so a response computed from
+data that was changed mid-request is never served.
+
+Under `versioning.conditional` an entry also records the ETag it was
+stored under, and is only served to a request whose ETag is the same.
+The ETags come from the database, so a stale entry is never served under
+a newer ETag, even when the write happened in another process whose tag
+bumps this backend did not see: with the memory backend every gunicorn
+worker, and the job worker, has its own generations.
+
+Backends:
+    memory  in-process LRU with TTL (per gunicorn worker)
+    file    entries and generations on disk, shared by all workers on a host
+    null    caching disabled
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from functools import wraps
+
+from flask import current_app, g, make_response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class MemoryBackend:
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def generation(self, tag):
+        return self._generations.get(tag, 0)
+
+    def bump(self, tag):
+        with self._lock:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+
+class FileBackend:
+    """
+    One file per entry and per tag under `directory`. Writes go through a
+    temp file and os.replace, so readers in other workers never see partial
+    data. A tag's generation is a random token rewritten on every bump.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(os.path.join(directory, "entries"), exist_ok=True)
+        os.makedirs(os.path.join(directory, "tags"), exist_ok=True)
+
+    def _path(self, kind, key):
+        return os.path.join(self.directory, kind, hashlib.sha1(key.encode()).hexdigest())
+
+    def _write(self, path, data):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def get(self, key):
+        path = self._path("entries", key)
+        try:
+            with open(path, "rb") as f:
+                expires, value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        if expires < time.time():
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            return None
+        return value
+
+    def set(self, key, value, ttl):
+        self._write(self._path("entries", key), pickle.dumps((time.time() + ttl, value)))
+
+    def delete(self, key):
+        try:
+            os.unlink(self._path("entries", key))
+        except FileNotFoundError:
+            pass
+
+    def generation(self, tag):
+        try:
+            with open(self._path("tags", tag), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return b""
+
+    def bump(self, tag):
+        self._write(self._path("tags", tag), uuid.uuid4().bytes)
+
+    def clear(self):
+        for kind in ("entries", "tags"):
+            folder = os.path.join(self.directory, kind)
+            for name in os.listdir(folder):
+                os.unlink(os.path.join(folder, name))
+
+
+class NullBackend:
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def generation(self, tag):
+        return 0
+
+    def bump(self, tag):
+        pass
+
+    def clear(self):
+        pass
+
+
+class ResponseCache:
+    CACHED_HEADERS = ("Content-Type", "Link", "X-Next-Cursor")
+
+    def __init__(self, app=None):
+        self.backend = NullBackend()
+        self.ttl = 60
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("RESPONSE_CACHE_BACKEND", os.environ.get("RESPONSE_CACHE_BACKEND", "memory"))
+        app.config.setdefault("RESPONSE_CACHE_TTL", int(os.environ.get("RESPONSE_CACHE_TTL", 60)))
+        app.config.setdefault("RESPONSE_CACHE_SIZE", int(os.environ.get("RESPONSE_CACHE_SIZE", 1024)))
+        app.config.setdefault("RESPONSE_CACHE_DIR", os.environ.get(
+            "RESPONSE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "art-gallery-cache")))
+
+        kind = app.config["RESPONSE_CACHE_BACKEND"]
+        if kind == "memory":
+            self.backend = MemoryBackend(app.config["RESPONSE_CACHE_SIZE"])
+        elif kind == "file":
+            self.backend = FileBackend(app.config["RESPONSE_CACHE_DIR"])
+        elif kind == "null":
+            self.backend = NullBackend()
+        else:
+            raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND {kind!r}")
+        self.ttl = app.config["RESPONSE_CACHE_TTL"]
+        app.extensions["response_cache"] = self
+
+    def cached(self, *tags):
+        """
+        Cache a GET view's 200 responses, keyed on path and query string.
+        Tags may use the view's URL arguments, e.g. "artwork:{artwork_id}".
+        """
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                names = [t.format(**kwargs) for t in tags]
+                generations = [g.get("etag")] + [self.backend.generation(t) for t in names]
+                key = request.full_path
+                entry = self.backend.get(key)
+                if entry is not None and entry[0] == generations:
+                    self.hits[fn.__name__] += 1
+                    body, status, headers = entry[1]
+                    return current_app.response_class(body, status=status, headers=headers)
+
+                self.misses[fn.__name__] += 1
+                response = make_response(fn(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    headers = [(h, response.headers[h]) for h in self.CACHED_HEADERS if h in response.headers]
+                    self.backend.set(key, (generations, (response.get_data(), 200, headers)), self.ttl)
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            self.backend.bump(tag)
+
+    def invalidate_on_commit(self, session, *tags):
+        """Invalidate `tags` once `session` commits; dropped on rollback."""
+        session.info.setdefault("response_cache_tags", set()).update(tags)
+
+    def stats(self):
+        views = sorted(set(self.hits) | set(self.misses))
+        return {v: {"hits": self.hits[v], "misses": self.misses[v]} for v in views}
+
+
+response_cache = ResponseCache()
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    tags = session.info.pop("response_cache_tags", None)
+    if tags:
+        response_cache.invalidate(*tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop("response_cache_tags", None)
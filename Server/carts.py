@@ -0,0 +1,42 @@
+"""
+Set-based cart writes.
+
+`find_targets` checks a user and any number of artworks in one query, and
+`add_items` inserts cart rows with INSERT ... ON CONFLICT DO NOTHING
+against the unique (user_id, artwork_id) index. Adding an artwork that is
+already in the cart is a no-op inside the insert instead of a lookup
+before it, and two requests racing to add the same artwork cannot both
+create a row.
+"""
+from sqlalchemy import select
+
+from models import db, Artwork, Cart, User
+from sqlutil import dialect_insert
+
+
+def find_targets(user_id, artwork_ids):
+    """(user exists, set of the `artwork_ids` that exist), in one statement."""
+    users, artworks = User.__table__, Artwork.__table__
+    rows = db.session.execute(
+        select(artworks.c.id)
+        .select_from(users)
+        .outerjoin(artworks, artworks.c.id.in_(set(artwork_ids)))
+        .where(users.c.id == user_id)
+    ).scalars().all()
+    return bool(rows), {artwork_id for artwork_id in rows if artwork_id is not None}
+
+
+def add_items(user_id, artwork_ids, now):
+    """
+    Put `artwork_ids` in the user's cart. Returns {artwork_id: cart_id} for
+    the rows inserted; artworks already in the cart are left out. The
+    caller has checked the ids exist and commits.
+    """
+    carts = Cart.__table__
+    rows = db.session.execute(
+        dialect_insert(carts)
+        .values([{"user_id": user_id, "artwork_id": a, "added_at": now} for a in dict.fromkeys(artwork_ids)])
+        .on_conflict_do_nothing(index_elements=[carts.c.user_id, carts.c.artwork_id])
+        .returning(carts.c.artwork_id, carts.c.id)
+    ).all()
+    return dict(rows)
@@ -0,0 +1,119 @@
+"""
+Denormalized artwork catalogue.
+
+`artwork_catalogue` holds one row per artwork with everything a catalogue
+page shows: the artwork's columns, its artist's name, how many times it
+has sold, the last sale's price and date, and whether it is available (no
+one owns it). GET /catalogue reads it with one single-table index scan,
+without the artists join or any aggregate over purchases.
+
+Write handlers name the artworks, or whole artists, they touched with
+`catalogue_changed`. When the session commits, that queues one
+`refresh_rows` job in the same transaction (see jobs.py). The worker then
+deletes those rows and selects them again from the base tables. A refresh
+recomputes from whatever is committed when it runs, so jobs can run late,
+twice or out of order and the catalogue still converges; until they run
+it lags the write. Each refresh bumps the "catalogue" change counter and
+cache tag, which is what the /catalogue ETag and cached pages follow, so
+those move when the rows do rather than when the write commits. Like
+the sales summaries, each row covers the purchases that currently exist,
+which is what REBUILD recomputes and `check_catalogue` compares against.
+"""
+from sqlalchemy import delete, event, exists, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from cache import response_cache
+from jobs import jobs
+from models import db, Artist, Artwork, ArtworkCatalogue, Purchase
+from versioning import bump_counters
+
+CATALOGUE_SORTS = {
+    "id": ((ArtworkCatalogue.artwork_id,), False),
+    "-id": ((ArtworkCatalogue.artwork_id,), True),
+    "price": ((ArtworkCatalogue.price, ArtworkCatalogue.artwork_id), False),
+    "-price": ((ArtworkCatalogue.price, ArtworkCatalogue.artwork_id), True),
+}
+
+_catalogue = ArtworkCatalogue.__table__
+_artworks, _artists, _purchases = Artwork.__table__, Artist.__table__, Purchase.__table__
+_sales = _purchases.c.artwork_id == _artworks.c.id
+_last_sale = select(_purchases.c.price_paid, _purchases.c.date).where(_sales).order_by(
+    _purchases.c.date.desc().nulls_last(), _purchases.c.id.desc()).limit(1)
+
+COLUMNS = ["artwork_id", "artist_id", "title", "price", "image_url", "artist_name", "sales",
+           "last_sale_price", "last_sold_at", "available"]
+SOURCE = (
+    select(
+        _artworks.c.id, _artworks.c.artist_id, _artworks.c.title, _artworks.c.price, _artworks.c.image_url,
+        _artists.c.name,
+        select(func.count()).where(_sales).scalar_subquery(),
+        _last_sale.with_only_columns(_purchases.c.price_paid).scalar_subquery(),
+        _last_sale.with_only_columns(_purchases.c.date).scalar_subquery(),
+        ~exists().where(_sales),
+    )
+    .select_from(_artworks)
+    .outerjoin(_artists, _artists.c.id == _artworks.c.artist_id)
+)
+REBUILD = [delete(_catalogue), insert(_catalogue).from_select(COLUMNS, SOURCE)]
+
+
+def refresh(artwork_ids=(), artist_ids=()):
+    """Recompute the rows of `artwork_ids` and of every artwork by `artist_ids`. The caller commits."""
+    clauses = [(_catalogue.c.artwork_id, _artworks.c.id, artwork_ids),
+               (_catalogue.c.artist_id, _artworks.c.artist_id, artist_ids)]
+    clauses = [(stored, source, sorted(ids)) for stored, source, ids in clauses if ids]
+    if not clauses:
+        return
+    db.session.execute(delete(_catalogue).where(or_(*(stored.in_(ids) for stored, _, ids in clauses))))
+    db.session.execute(insert(_catalogue).from_select(
+        COLUMNS, SOURCE.where(or_(*(source.in_(ids) for _, source, ids in clauses)))))
+    _rows_changed()
+
+
+@jobs.task("catalogue")
+def refresh_rows(artwork_ids=(), artist_ids=()):
+    refresh(artwork_ids, artist_ids)
+
+
+def rebuild_catalogue():
+    """Recompute the whole catalogue. The caller commits."""
+    for stmt in REBUILD:
+        db.session.execute(stmt)
+    _rows_changed()
+
+
+def _rows_changed():
+    bump_counters("catalogue")
+    response_cache.invalidate_on_commit(db.session, "catalogue")
+
+
+def check_catalogue():
+    """Ids of artworks whose catalogue row is missing, stale or left over."""
+    stored = select(*(_catalogue.c[c] for c in COLUMNS))
+    ids = set()
+    for rows, other in ((SOURCE, stored), (stored, SOURCE)):
+        drift = rows.except_(other).subquery()
+        ids.update(db.session.scalars(select(drift.c[0])))
+    return sorted(ids)
+
+
+def catalogue_changed(db_session, artwork_ids=(), artist_ids=()):
+    """Refresh the catalogue rows of `artwork_ids` and `artist_ids` when `db_session` commits."""
+    pending = db_session.info.setdefault("catalogue", {"artworks": set(), "artists": set()})
+    pending["artworks"].update(artwork_ids)
+    pending["artists"].update(artist_ids)
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_pending(db_session):
+    pending = db_session.info.pop("catalogue", None)
+    if pending:
+        # Flush first so that with JOBS_EAGER the refresh sees the pending writes.
+        db_session.flush()
+        refresh_rows.enqueue(artwork_ids=sorted(pending["artworks"]), artist_ids=sorted(pending["artists"]),
+                             session=db_session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(db_session):
+    db_session.info.pop("catalogue", None)
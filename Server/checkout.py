@@ -0,0 +1,90 @@
+"""
+Set-based cart checkout.
+
+The whole cart is bought in one transaction with a fixed number of
+statements. Artworks are claimed optimistically: the UPDATE that bumps
+their version only matches rows whose version is unchanged since the cart
+was read, that have no purchase yet and that are not listed for resale
+(the seller of an open listing still owns the artwork, which only
+/listings/<id>/buy may sell). Every write that sells or lists an artwork
+bumps its version, so two checkouts racing for the same artwork cannot
+both match, and the loser gets a CheckoutConflict. POST /purchases claims
+its single artwork with the same `claim`.
+"""
+import json
+
+from sqlalchemy import exists, insert, literal, select, tuple_
+
+from models import db, Artwork, Cart, IdempotencyKey, Purchase, Sell
+
+
+class CheckoutConflict(Exception):
+    def __init__(self, artwork_ids):
+        super().__init__(f"Artworks no longer available: {sorted(artwork_ids)}")
+        self.artwork_ids = sorted(artwork_ids)
+
+
+def claim(versions):
+    """
+    Claim artworks given as {(artwork_id, version)} as they were read: bump
+    the version of each one that is unchanged, has no purchase and is not
+    listed for resale. Raises CheckoutConflict naming the others. The
+    caller rolls back on conflict.
+    """
+    artworks, purchases, sells = Artwork.__table__, Purchase.__table__, Sell.__table__
+    claimed = db.session.execute(
+        artworks.update()
+        .where(tuple_(artworks.c.id, artworks.c.version).in_(versions))
+        .where(~exists().where(purchases.c.artwork_id == artworks.c.id))
+        .where(~exists().where(sells.c.artwork_id == artworks.c.id, sells.c.status == "listed"))
+        .values(version=artworks.c.version + 1)
+        .returning(artworks.c.id)
+    ).scalars().all()
+    if len(claimed) != len(versions):
+        raise CheckoutConflict({artwork_id for artwork_id, _ in versions} - set(claimed))
+
+
+def checkout(user_id, now):
+    """
+    Buy everything in the user's cart. Returns (purchase_ids, artwork_ids);
+    both are empty if the cart is. The caller commits.
+    """
+    carts, artworks, purchases = Cart.__table__, Artwork.__table__, Purchase.__table__
+
+    lines = db.session.execute(
+        select(carts.c.id, artworks.c.id, artworks.c.version)
+        .join(artworks, artworks.c.id == carts.c.artwork_id)
+        .where(carts.c.user_id == user_id)
+    ).all()
+    if not lines:
+        return [], []
+    cart_ids = [cart_id for cart_id, _, _ in lines]
+    seen = {(artwork_id, version) for _, artwork_id, version in lines}
+    artwork_ids = sorted(artwork_id for artwork_id, _ in seen)
+
+    claim(seen)
+
+    purchase_ids = db.session.execute(
+        insert(purchases)
+        .from_select(
+            ["user_id", "artwork_id", "price_paid", "date"],
+            select(carts.c.user_id, artworks.c.id, artworks.c.price, literal(now, Purchase.date.type))
+            .join(artworks, artworks.c.id == carts.c.artwork_id)
+            .where(carts.c.id.in_(cart_ids))
+        )
+        .returning(purchases.c.id)
+    ).scalars().all()
+    db.session.execute(carts.delete().where(carts.c.id.in_(cart_ids)))
+    return purchase_ids, artwork_ids
+
+
+def replay(user_id, key):
+    """Stored (body, status) for an Idempotency-Key, or None."""
+    stored = db.session.get(IdempotencyKey, (user_id, key))
+    if stored is None:
+        return None
+    return json.loads(stored.response), stored.status_code
+
+
+def remember(user_id, key, body, status_code):
+    db.session.add(IdempotencyKey(user_id=user_id, key=key, status_code=status_code, response=json.dumps(body)))
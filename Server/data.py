@@ -1,12 +1,25 @@
+import argparse
+import time
+
 from app import app, db
 from models import Artist, Artwork, User
 from werkzeug.security import generate_password_hash
 
-with app.app_context():
-    # Reset DB
+import seeding
+from analytics import rebuild_summaries
+from catalogue import rebuild_catalogue
+from seeding import SCALES, SYNTHETIC_PASSWORD
+
+
+def reset():
     db.drop_all()
     db.create_all()
 
+
+def seed_sample():
+    """The hand-written sample catalogue."""
+    reset()
+
     
     artists = [
         Artist(profile_pic="https://cdn.pixabay.com/photo/2017/06/10/16/33/double-exposure-2390185_1280.jpg", name="Leonardo da Vinci", bio="Renaissance polymath, painter of the Mona Lisa."),
@@ -63,6 +76,50 @@ with app.app_context():
         User(userName="judy", email="judy@example.com", password=generate_password_hash("password123")),
     ]
     db.session.add_all(users)
+    rebuild_catalogue()
     db.session.commit()
 
     print(" Database seeded with  artists, artworks, users!")
+
+
+def seed_synthetic(artworks, users=None, purchases=None, seed=0):
+    """
+    Replace the database with a synthetic catalogue of `artworks` rows, with
+    one artist per ten artworks and, by default, one user and one purchase
+    per ten artworks. Every user's password is SYNTHETIC_PASSWORD and user
+    N's email is userN@example.com. The same arguments always produce the
+    same rows.
+    """
+    reset()
+    dataset = seeding.Dataset(artworks, users=users, purchases=purchases)
+    seeding.load(dataset, seed)
+    rebuild_summaries()
+    rebuild_catalogue()
+    db.session.commit()
+    print(f" Database seeded with {dataset}!")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the database.")
+    parser.add_argument("--scale", choices=sorted(SCALES), help="seed a synthetic dataset of this many artworks")
+    parser.add_argument("--artworks", type=int, help="seed a synthetic dataset of exactly this many artworks")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--purchases", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", metavar="PATH",
+                        help="write the synthetic dataset to a new SQLite file instead of DATABASE_URL")
+    args = parser.parse_args()
+    artworks = args.artworks or SCALES.get(args.scale)
+    if args.output:
+        if not artworks:
+            parser.error("--output needs --scale or --artworks")
+        dataset = seeding.Dataset(artworks, users=args.users, purchases=args.purchases)
+        started = time.perf_counter()
+        seeding.build_sqlite(args.output, dataset, args.seed)
+        print(f" Wrote {dataset} to {args.output} in {time.perf_counter() - started:.1f}s")
+    else:
+        with app.app_context():
+            if artworks:
+                seed_synthetic(artworks, args.users, args.purchases, args.seed)
+            else:
+                seed_sample()
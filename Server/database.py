@@ -0,0 +1,82 @@
+"""
+Engine configuration and read routing.
+
+`engine_options` turns DB_* settings into SQLAlchemy engine options: pool
+size, overflow, timeout, recycle and pre-ping. SQLite connections also get
+WAL journaling, a busy timeout, synchronous=NORMAL and a memory-mapped
+window on connect, so gunicorn workers read while one of them writes
+instead of failing with "database is locked".
+
+With a read replica configured as the "replica" bind, RoutingSession sends
+the statements of GET and HEAD requests there; writes, flushes and
+everything outside a request go to the primary. For SQLite, the replica
+can be the same file opened read-only.
+"""
+from flask import has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+READ_METHODS = ("GET", "HEAD")
+
+
+def engine_options(config):
+    options = {
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+    }
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() != "sqlite" or url.database not in (None, "", ":memory:"):
+        # In-memory SQLite needs a StaticPool, which takes no sizing.
+        options.update(pool_size=config["DB_POOL_SIZE"], max_overflow=config["DB_MAX_OVERFLOW"],
+                       pool_timeout=config["DB_POOL_TIMEOUT"])
+    return options
+
+
+def replica_url(primary, replica):
+    """
+    The replica bind URL. "readonly" means the primary SQLite file opened
+    read-only, a second connection pool on the same WAL database.
+    """
+    if replica != "readonly":
+        return replica
+    url = make_url(primary)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        raise ValueError("DATABASE_REPLICA_URL=readonly needs a file-backed SQLite DATABASE_URL")
+    database = url.database[5:] if url.query.get("uri") else url.database
+    return str(url.set(database=f"file:{database}", query={"mode": "ro", "uri": "true"}))
+
+
+def sqlite_pragmas(engine, config, readonly=False):
+    """
+    Set the SQLITE_* pragmas on every new connection of a SQLite `engine`;
+    for an AsyncEngine, pass its sync_engine.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = [
+        f"busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT'])}",
+        f"synchronous = {config['SQLITE_SYNCHRONOUS']}",
+        f"mmap_size = {int(config['SQLITE_MMAP_SIZE'])}",
+    ]
+    if not readonly:
+        # Persistent in the file; a read-only connection cannot change it.
+        pragmas.insert(0, f"journal_mode = {config['SQLITE_JOURNAL_MODE']}")
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(f"PRAGMA {pragma}")
+        finally:
+            cursor.close()
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and "replica" in self._db.engines
+                and has_request_context() and request.method in READ_METHODS
+                and not getattr(clause, "is_dml", False)):
+            return self._db.engines["replica"]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
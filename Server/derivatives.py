@@ -0,0 +1,116 @@
+"""
+Responsive image derivatives for content-addressed uploads.
+
+Every stored image gets a JPEG and a WebP rendition at each of WIDTHS
+(never upscaled), written next to the original as `<sha256>-<width>.<fmt>`.
+An upload queues a job that renders them on the background worker, so
+neither the upload request nor the web worker's CPU pays for it. URLs are
+derived from the upload hash alone and served by
+/images/<sha256>/<width>.<fmt>, which falls back to the original until the
+derivative exists, rendering it meanwhile in a process pool (`submit`).
+"""
+import logging
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+WIDTHS = (320, 640, 1280)
+FORMATS = {"jpg": ("JPEG", {"quality": 80, "optimize": True, "progressive": True}),
+           "webp": ("WEBP", {"quality": 75, "method": 4})}
+UPLOAD_URL_RE = re.compile(r"/(?:[0-9a-f]{2}/){2}([0-9a-f]{64})(?:\.[a-z0-9]+)?$")
+
+logger = logging.getLogger(__name__)
+_pool = None
+_pending = set()
+
+
+def upload_hash(url):
+    """The sha256 of a content-addressed upload URL, or None for any other URL."""
+    match = UPLOAD_URL_RE.search(url or "")
+    return match.group(1) if match else None
+
+
+def image_urls(url):
+    """Derivative URLs for an uploaded image, smallest first, or None if it has none."""
+    sha256 = upload_hash(url)
+    if sha256 is None:
+        return None
+    return [dict(width=w, **{fmt: f"/images/{sha256}/{w}.{fmt}" for fmt in FORMATS}) for w in WIDTHS]
+
+
+def derivative_path(root, sha256, width, fmt):
+    return os.path.join(root, sha256[:2], sha256[2:4], f"{sha256}-{width}.{fmt}")
+
+
+def original_path(root, sha256):
+    folder = os.path.join(root, sha256[:2], sha256[2:4])
+    try:
+        names = os.listdir(folder)
+    except FileNotFoundError:
+        return None
+    for name in names:
+        if name == sha256 or name.startswith(sha256 + "."):
+            return os.path.join(folder, name)
+    return None
+
+
+def render(source, root, sha256):
+    """Write every missing derivative of `source`. Runs in a pool process."""
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        # JPEG only: decode at a reduced scale that is still >= the largest width.
+        image.draft("RGB", (max(WIDTHS), max(WIDTHS)))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+        for width in sorted(WIDTHS, reverse=True):
+            if image.width > width:
+                resized = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+            else:
+                resized = image
+            for fmt, (kind, options) in FORMATS.items():
+                path = derivative_path(root, sha256, width, fmt)
+                if os.path.exists(path):
+                    continue
+                out = resized
+                if kind == "JPEG" and out.mode == "RGBA":
+                    out = Image.new("RGB", out.size, "white")
+                    out.paste(resized, mask=resized.getchannel("A"))
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        out.save(f, kind, **options)
+                    os.chmod(tmp, 0o644)
+                    os.replace(tmp, path)
+                except BaseException:
+                    os.unlink(tmp)
+                    raise
+            # Render each smaller width from the previous one.
+            image = resized
+
+
+def submit(root, sha256, workers=2):
+    """
+    Queue derivatives for the upload `sha256` on the process pool. Returns
+    immediately; failures, e.g. for files that are not images, are logged.
+    """
+    global _pool
+    if sha256 in _pending:
+        return
+    source = original_path(root, sha256)
+    if source is None:
+        return
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=workers)
+    _pending.add(sha256)
+    future = _pool.submit(render, source, root, sha256)
+
+    def done(f):
+        _pending.discard(sha256)
+        if f.exception() is not None:
+            logger.warning("Could not render derivatives of %s: %s", sha256, f.exception())
+
+    future.add_done_callback(done)
+    return future
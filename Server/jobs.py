@@ -0,0 +1,164 @@
+"""
+Durable background jobs in the `jobs` table.
+
+Functions decorated with `jobs.task(queue)` can be queued with
+`fn.enqueue(**kwargs)`. That only adds a Job row to db.session, so the job
+exists once the request commits and not at all if it rolls back. There is
+no broker: `worker.py` polls the table.
+
+A worker claims the oldest due job of a queue with one conditional UPDATE,
+which also checks that fewer than the queue's JOB_CONCURRENCY jobs are
+running, across every worker process (exactly on SQLite, which serializes
+writers; on PostgreSQL two racing claims can briefly exceed the limit by
+one). It runs the task and deletes the row in the same transaction as the
+task's own writes. A task that raises is rolled back and retried after an
+exponential backoff with jitter, until it has failed JOB_MAX_ATTEMPTS
+times; then the row stays "failed", with its last error, for inspection.
+A job locked for longer than JOB_LOCK_TIMEOUT, because its worker died,
+is queued again.
+
+Tasks must be idempotent: a worker that dies after a task's side effects
+outside the database will run it again. With JOBS_EAGER=1 enqueue runs
+the task at once, in a savepoint of the caller's transaction, for tests
+and for running without a worker.
+"""
+import json
+import logging
+import os
+import random
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import case, delete, func, select, update
+
+from models import db, Job
+from views import unbudgeted
+
+logger = logging.getLogger(__name__)
+
+
+def parse_concurrency(value):
+    """"images=2,catalogue=1" -> {"images": 2, "catalogue": 1}."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        queue, _, limit = item.partition("=")
+        limits[queue.strip()] = int(limit or 1)
+    return limits
+
+
+class Task:
+    def __init__(self, fn, name, queue, max_attempts):
+        self.fn = fn
+        self.name = name
+        self.queue = queue
+        self.max_attempts = max_attempts
+
+    def __call__(self, **kwargs):
+        return self.fn(**kwargs)
+
+    def enqueue(self, delay=0, session=None, **kwargs):
+        """Queue a run with `kwargs`, which must be JSON-serializable. The caller commits."""
+        config = current_app.config
+        session = session or db.session
+        if config["JOBS_EAGER"]:
+            # A savepoint, so a failing task is logged like a failed job instead of failing the
+            # caller, outside the caller's query budget, since the worker normally runs it.
+            try:
+                with unbudgeted(), session.begin_nested():
+                    self.fn(**json.loads(json.dumps(kwargs)))
+            except Exception as e:
+                logger.warning("Job %s failed: %r", self.name, e)
+            return
+        session.add(Job(
+            queue=self.queue, name=self.name, payload=json.dumps(kwargs),
+            run_at=datetime.utcnow() + timedelta(seconds=delay),
+            max_attempts=self.max_attempts or config["JOB_MAX_ATTEMPTS"],
+        ))
+
+
+class JobQueue:
+    def __init__(self, app=None):
+        self.tasks = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("JOBS_EAGER", os.environ.get("JOBS_EAGER", "0") == "1")
+        app.config.setdefault("JOB_CONCURRENCY", parse_concurrency(
+            os.environ.get("JOB_CONCURRENCY", "default=2,images=2,catalogue=1")))
+        app.config.setdefault("JOB_MAX_ATTEMPTS", int(os.environ.get("JOB_MAX_ATTEMPTS", 5)))
+        app.config.setdefault("JOB_BACKOFF_BASE", float(os.environ.get("JOB_BACKOFF_BASE", 2)))
+        app.config.setdefault("JOB_BACKOFF_MAX", float(os.environ.get("JOB_BACKOFF_MAX", 600)))
+        app.config.setdefault("JOB_LOCK_TIMEOUT", int(os.environ.get("JOB_LOCK_TIMEOUT", 600)))
+        app.config.setdefault("JOB_POLL_INTERVAL", float(os.environ.get("JOB_POLL_INTERVAL", 1)))
+        app.extensions["jobs"] = self
+
+    def task(self, queue="default", name=None, max_attempts=None):
+        """Register the decorated function as a task on `queue`."""
+        def decorator(fn):
+            task = Task(fn, name or f"{fn.__module__}.{fn.__name__}", queue, max_attempts)
+            self.tasks[task.name] = task
+            return task
+        return decorator
+
+    def claim(self, queue, worker_id, limit):
+        """Lock the oldest due job of `queue` for `worker_id` and commit; None if none is due or `limit` are running."""
+        jobs, now = Job.__table__, datetime.utcnow()
+        running = (select(func.count()).select_from(jobs)
+                   .where(jobs.c.queue == queue, jobs.c.status == "running").scalar_subquery())
+        oldest = (select(jobs.c.id)
+                  .where(jobs.c.queue == queue, jobs.c.status == "queued", jobs.c.run_at <= now)
+                  .order_by(jobs.c.run_at, jobs.c.id).limit(1)
+                  .with_for_update(skip_locked=True))  # PostgreSQL; SQLite serializes writers anyway
+        job = db.session.execute(
+            update(jobs)
+            .where(jobs.c.id == oldest.scalar_subquery(), jobs.c.status == "queued", running < limit)
+            .values(status="running", attempts=jobs.c.attempts + 1, locked_at=now, locked_by=worker_id)
+            .returning(jobs.c.id, jobs.c.name, jobs.c.payload, jobs.c.attempts, jobs.c.max_attempts)
+        ).first()
+        db.session.commit()
+        return job
+
+    def run(self, job):
+        """Run a claimed job. Returns True if it succeeded."""
+        task = self.tasks.get(job.name)
+        try:
+            if task is None:
+                raise LookupError(f"No task named {job.name!r}")
+            task.fn(**json.loads(job.payload))
+            db.session.execute(delete(Job).where(Job.id == job.id))
+            db.session.commit()
+            return True
+        except Exception as e:
+            db.session.rollback()
+            retry = task is not None and job.attempts < job.max_attempts
+            logger.warning("Job %s (%s) failed on attempt %s/%s%s: %r", job.id, job.name, job.attempts,
+                           job.max_attempts, ", retrying" if retry else "", e)
+            values = {"status": "failed", "last_error": repr(e), "locked_at": None, "locked_by": None}
+            if retry:
+                values.update(status="queued", run_at=datetime.utcnow() + timedelta(seconds=self.backoff(job.attempts)))
+            db.session.execute(update(Job).where(Job.id == job.id).values(**values))
+            db.session.commit()
+            return False
+
+    def backoff(self, attempts):
+        """Seconds before retry number `attempts`: exponential, capped, with jitter."""
+        config = current_app.config
+        delay = min(config["JOB_BACKOFF_MAX"], config["JOB_BACKOFF_BASE"] * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1)
+
+    def requeue_stale(self, queues):
+        """Queue again jobs in `queues` whose worker stopped; fails those out of attempts. Returns how many."""
+        jobs = Job.__table__
+        cutoff = datetime.utcnow() - timedelta(seconds=current_app.config["JOB_LOCK_TIMEOUT"])
+        result = db.session.execute(
+            update(jobs)
+            .where(jobs.c.queue.in_(queues), jobs.c.status == "running", jobs.c.locked_at < cutoff)
+            .values(status=case((jobs.c.attempts >= jobs.c.max_attempts, "failed"), else_="queued"),
+                    last_error="Worker stopped while running the job", locked_at=None, locked_by=None)
+        )
+        db.session.commit()
+        return result.rowcount
+
+
+jobs = JobQueue()
@@ -0,0 +1,80 @@
+"""
+Secondary-market listings.
+
+`sell_artwork` lists an artwork as a Sell row with status "listed".
+Listings are browsed per status, newest first or by price, keyset
+paginated over the (status, created_at, id) and (status, price, id)
+indexes, so any page is one index range scan.
+
+`buy` sells a listing in a fixed number of statements. The listing is
+claimed with a single conditional UPDATE (status "listed" -> "sold"), so
+of any number of concurrent buyers exactly one matches it. The artwork is
+then claimed the way checkout claims cart artworks: its version must be
+unchanged since it was read and it must have no purchase, so a listing
+buy and a cart checkout cannot both sell it. Then the purchase is
+inserted. The caller commits, or rolls back on ListingUnavailable.
+"""
+from sqlalchemy import exists, insert, select
+
+from models import db, Artwork, Purchase, Sell
+
+STATUSES = ("listed", "sold")
+
+LISTING_SORTS = {
+    "-created_at": ((Sell.created_at, Sell.id), True),
+    "created_at": ((Sell.created_at, Sell.id), False),
+    "price": ((Sell.price, Sell.id), False),
+    "-price": ((Sell.price, Sell.id), True),
+}
+
+
+class ListingUnavailable(Exception):
+    def __init__(self, listing_id):
+        super().__init__(f"Listing {listing_id} is no longer available")
+        self.listing_id = listing_id
+
+
+def buy(listing_id, buyer_id, now):
+    """
+    Buy a listing for `buyer_id`. Returns (purchase_id, artist_id,
+    artwork_id, price), or None if there is no such listing. Raises
+    ValueError for the seller's own listing.
+    """
+    sells, artworks, purchases = Sell.__table__, Artwork.__table__, Purchase.__table__
+
+    row = db.session.execute(
+        select(sells.c.seller_id, artworks.c.id, artworks.c.artist_id, artworks.c.version)
+        .join(artworks, artworks.c.id == sells.c.artwork_id)
+        .where(sells.c.id == listing_id)
+    ).first()
+    if row is None:
+        return None
+    seller_id, artwork_id, artist_id, version = row
+    if seller_id == buyer_id:
+        raise ValueError("Cannot buy your own listing")
+
+    price = db.session.execute(
+        sells.update()
+        .where(sells.c.id == listing_id, sells.c.status == "listed")
+        .values(status="sold")
+        .returning(sells.c.price)
+    ).scalar()
+    if price is None:
+        raise ListingUnavailable(listing_id)
+
+    claimed = db.session.execute(
+        artworks.update()
+        .where(artworks.c.id == artwork_id, artworks.c.version == version)
+        .where(~exists().where(purchases.c.artwork_id == artworks.c.id))
+        .values(version=artworks.c.version + 1)
+        .returning(artworks.c.id)
+    ).first()
+    if claimed is None:
+        raise ListingUnavailable(listing_id)
+
+    purchase_id = db.session.execute(
+        insert(purchases)
+        .values(user_id=buyer_id, artwork_id=artwork_id, price_paid=price, date=now)
+        .returning(purchases.c.id)
+    ).scalar_one()
+    return purchase_id, artist_id, artwork_id, price
@@ -0,0 +1,166 @@
+"""
+Per-route request instrumentation, exposed in Prometheus text format.
+
+For every request this records latency, the number of SQL statements and
+the time spent in them (from engine cursor events), and the time spent
+serializing (View.dump* plus JSON encoding), all labelled by the route's
+URL rule. Metrics live in process memory, so under gunicorn each worker
+reports its own numbers and Prometheus should scrape them per worker or
+sum them.
+"""
+import bisect
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from flask import g, has_app_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from profiler import SamplingProfiler
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.histograms = {
+            "http_request_duration_seconds": ("Request latency.", LATENCY_BUCKETS, {}),
+            "db_queries_per_request": ("SQL statements run per request.", QUERY_BUCKETS, {}),
+            "db_query_duration_seconds": ("Time per request spent in SQL statements.", LATENCY_BUCKETS, {}),
+            "serialization_duration_seconds": ("Time per request spent serializing responses.", LATENCY_BUCKETS, {}),
+        }
+        self.profiler = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("PROFILER_ENABLED", os.environ.get("PROFILER_ENABLED", "0") == "1")
+        app.config.setdefault("PROFILER_DIR", os.environ.get(
+            "PROFILER_DIR", os.path.join(tempfile.gettempdir(), "art-gallery-profiles")))
+        app.config.setdefault("PROFILER_INTERVAL", float(os.environ.get("PROFILER_INTERVAL", 0.005)))
+        app.config.setdefault("PROFILER_KEEP", int(os.environ.get("PROFILER_KEEP", 20)))
+        if app.config["PROFILER_ENABLED"]:
+            self.profiler = SamplingProfiler(
+                app.config["PROFILER_DIR"], app.config["PROFILER_INTERVAL"], app.config["PROFILER_KEEP"])
+
+        app.json = TimedJSONProvider(app)
+        app.before_request(self._before)
+        app.after_request(self._after)
+        app.teardown_request(self._teardown)
+        app.extensions["metrics"] = self
+
+    def _before(self):
+        g.request_start = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.start()
+
+    def _after(self, response):
+        self._record(response.status_code)
+        return response
+
+    def _teardown(self, exc):
+        if exc is not None:
+            self._record(500)
+
+    def _record(self, status):
+        if "request_start" not in g or g.get("request_recorded"):
+            return
+        g.request_recorded = True
+        elapsed = time.perf_counter() - g.request_start
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        with self._lock:
+            self.requests[(route, request.method, str(status))] += 1
+            for name, value in (
+                ("http_request_duration_seconds", elapsed),
+                ("db_queries_per_request", g.get("sql_count", 0)),
+                ("db_query_duration_seconds", g.get("sql_time", 0.0)),
+                ("serialization_duration_seconds", g.get("serialize_time", 0.0)),
+            ):
+                histograms = self.histograms[name][2]
+                key = (route, request.method)
+                if key not in histograms:
+                    histograms[key] = Histogram(self.histograms[name][1])
+                histograms[key].observe(value)
+        if self.profiler is not None:
+            self.profiler.stop(f"{request.method} {route}", elapsed)
+
+    def render(self, extra=()):
+        """Prometheus text exposition of everything recorded so far."""
+        lines = ["# HELP http_requests_total Requests handled.", "# TYPE http_requests_total counter"]
+        with self._lock:
+            for (route, method, status), value in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(route=route, method=method, status=status)} {value}")
+            for name, (help_text, buckets, histograms) in self.histograms.items():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (route, method), h in sorted(histograms.items()):
+                    cumulative = 0
+                    for bound, count in zip(list(buckets) + ["+Inf"], h.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(route=route, method=method, le=bound)} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(route=route, method=method)} {h.sum}")
+                    lines.append(f"{name}_count{_labels(route=route, method=method)} {h.count}")
+        for name, kind, help_text, samples in extra:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            lines += [f"{name}{_labels(**labels)} {value}" for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to the request's `name` total, e.g. "serialize_time"."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if has_app_context():
+            setattr(g, name, g.get(name, 0.0) + time.perf_counter() - start)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        with timed("serialize_time"):
+            return super().dumps(obj, **kwargs)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.metrics_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_query(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "metrics_start", None)
+    if start is not None and has_app_context():
+        g.sql_time = g.get("sql_time", 0.0) + time.perf_counter() - start
+        g.sql_count = g.get("sql_count", 0) + 1
+
+
+metrics = Metrics()
@@ -0,0 +1,28 @@
+"""Add artwork listing indexes
+
+Revision ID: 3a7c1e9d2b40
+Revises: ffe242ca7522
+Create Date: 2026-10-17 09:12:41.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a7c1e9d2b40'
+down_revision = 'ffe242ca7522'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('artworks', schema=None) as batch_op:
+        batch_op.create_index('ix_artworks_artist_id_price', ['artist_id', 'price'], unique=False)
+        batch_op.create_index('ix_artworks_price_id', ['price', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('artworks', schema=None) as batch_op:
+        batch_op.drop_index('ix_artworks_price_id')
+        batch_op.drop_index('ix_artworks_artist_id_price')
@@ -0,0 +1,30 @@
+"""Make cart items unique per user and artwork
+
+Revision ID: 5c81d3e7a9f2
+Revises: e3f9a6b2c517
+Create Date: 2026-10-17 19:31:08.402715
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c81d3e7a9f2'
+down_revision = 'e3f9a6b2c517'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the oldest row of any duplicates the old add_to_cart let through.
+    op.execute(
+        "DELETE FROM carts WHERE id NOT IN (SELECT min(id) FROM carts GROUP BY user_id, artwork_id)"
+    )
+    with op.batch_alter_table('carts', schema=None) as batch_op:
+        batch_op.create_index('ix_carts_user_id_artwork_id', ['user_id', 'artwork_id'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('carts', schema=None) as batch_op:
+        batch_op.drop_index('ix_carts_user_id_artwork_id')
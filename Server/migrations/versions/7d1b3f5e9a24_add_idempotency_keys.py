@@ -0,0 +1,31 @@
+"""Add idempotency keys
+
+Revision ID: 7d1b3f5e9a24
+Revises: c52e8f1a6d93
+Create Date: 2026-10-17 13:26:05.871330
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d1b3f5e9a24'
+down_revision = 'c52e8f1a6d93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('idempotency_keys',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('status_code', sa.Integer(), nullable=False),
+    sa.Column('response', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('user_id', 'key')
+    )
+
+
+def downgrade():
+    op.drop_table('idempotency_keys')
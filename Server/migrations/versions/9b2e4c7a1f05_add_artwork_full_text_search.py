@@ -0,0 +1,115 @@
+"""Add artwork full-text search
+
+Revision ID: 9b2e4c7a1f05
+Revises: 7d1b3f5e9a24
+Create Date: 2026-10-17 14:52:18.306417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b2e4c7a1f05'
+down_revision = '7d1b3f5e9a24'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS artwork_search USING fts5(
+        title, description, artist_name, tokenize = 'unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS artworks_search_ai AFTER INSERT ON artworks BEGIN
+        INSERT INTO artwork_search (rowid, title, description, artist_name)
+        VALUES (new.id, new.title, new.description, (SELECT name FROM artists WHERE id = new.artist_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS artworks_search_au AFTER UPDATE OF title, description, artist_id ON artworks BEGIN
+        DELETE FROM artwork_search WHERE rowid = old.id;
+        INSERT INTO artwork_search (rowid, title, description, artist_name)
+        VALUES (new.id, new.title, new.description, (SELECT name FROM artists WHERE id = new.artist_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS artworks_search_ad AFTER DELETE ON artworks BEGIN
+        DELETE FROM artwork_search WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS artists_search_au AFTER UPDATE OF name ON artists BEGIN
+        UPDATE artwork_search SET artist_name = new.name
+        WHERE rowid IN (SELECT id FROM artworks WHERE artist_id = new.id);
+    END""",
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS artists_search_au",
+    "DROP TABLE IF EXISTS artwork_search",
+]
+
+POSTGRES_DDL = [
+    """CREATE TABLE IF NOT EXISTS artwork_search (
+        artwork_id integer PRIMARY KEY REFERENCES artworks (id) ON DELETE CASCADE,
+        document tsvector NOT NULL)""",
+    "CREATE INDEX IF NOT EXISTS ix_artwork_search_document ON artwork_search USING gin (document)",
+    """CREATE OR REPLACE FUNCTION artworks_search_sync() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO artwork_search (artwork_id, document)
+        SELECT NEW.id, 
+    setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(artists.name, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C') FROM artists WHERE artists.id = NEW.artist_id
+        ON CONFLICT (artwork_id) DO UPDATE SET document = EXCLUDED.document;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""",
+    """CREATE OR REPLACE TRIGGER artworks_search_sync
+        AFTER INSERT OR UPDATE OF title, description, artist_id ON artworks
+        FOR EACH ROW EXECUTE FUNCTION artworks_search_sync()""",
+    """CREATE OR REPLACE FUNCTION artists_search_sync() RETURNS trigger AS $$
+    BEGIN
+        UPDATE artwork_search SET document = 
+    setweight(to_tsvector('english', coalesce(artworks.title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(NEW.name, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(artworks.description, '')), 'C')
+        FROM artworks WHERE artworks.id = artwork_search.artwork_id AND artworks.artist_id = NEW.id;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""",
+    """CREATE OR REPLACE TRIGGER artists_search_sync AFTER UPDATE OF name ON artists
+        FOR EACH ROW EXECUTE FUNCTION artists_search_sync()""",
+]
+
+POSTGRES_DROP = [
+    "DROP TABLE IF EXISTS artwork_search",
+    "DROP FUNCTION IF EXISTS artworks_search_sync() CASCADE",
+    "DROP FUNCTION IF EXISTS artists_search_sync() CASCADE",
+]
+
+SQLITE_BACKFILL = """INSERT INTO artwork_search (rowid, title, description, artist_name)
+    SELECT artworks.id, artworks.title, artworks.description, artists.name
+    FROM artworks JOIN artists ON artists.id = artworks.artist_id"""
+
+# Touching every row fires artworks_search_sync, which builds the document.
+POSTGRES_BACKFILL = "UPDATE artworks SET title = title"
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        statements = SQLITE_DDL + [SQLITE_BACKFILL]
+    elif dialect == 'postgresql':
+        statements = POSTGRES_DDL + [POSTGRES_BACKFILL]
+    else:
+        return
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        statements = SQLITE_DROP + [
+            'DROP TRIGGER IF EXISTS artworks_search_ai',
+            'DROP TRIGGER IF EXISTS artworks_search_au',
+            'DROP TRIGGER IF EXISTS artworks_search_ad',
+        ]
+    elif dialect == 'postgresql':
+        statements = POSTGRES_DROP
+    else:
+        return
+    for statement in statements:
+        op.execute(statement)
@@ -0,0 +1,30 @@
+"""Index sells for listing browse queries
+
+Revision ID: 9b4e2d7c1f63
+Revises: 5c81d3e7a9f2
+Create Date: 2026-10-17 20:12:44.918306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4e2d7c1f63'
+down_revision = '5c81d3e7a9f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('sells', schema=None) as batch_op:
+        batch_op.create_index('ix_sells_status_created_at', ['status', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_sells_status_price', ['status', 'price', 'id'], unique=False)
+        batch_op.create_index('ix_sells_artwork_id', ['artwork_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('sells', schema=None) as batch_op:
+        batch_op.drop_index('ix_sells_artwork_id')
+        batch_op.drop_index('ix_sells_status_price')
+        batch_op.drop_index('ix_sells_status_created_at')
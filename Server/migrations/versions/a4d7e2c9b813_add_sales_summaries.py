@@ -0,0 +1,63 @@
+"""Add sales summary tables
+
+Revision ID: a4d7e2c9b813
+Revises: 9b2e4c7a1f05
+Create Date: 2026-10-17 18:40:12.504117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d7e2c9b813'
+down_revision = '9b2e4c7a1f05'
+branch_labels = None
+depends_on = None
+
+# Frozen copy of analytics.REBUILD at this revision.
+BACKFILL = [
+    """INSERT INTO artist_sales (artist_id, sales, revenue)
+    SELECT artworks.artist_id, count(*), sum(purchases.price_paid)
+    FROM purchases JOIN artworks ON artworks.id = purchases.artwork_id
+    GROUP BY artworks.artist_id""",
+    """INSERT INTO artwork_sales (artwork_id, sales, revenue)
+    SELECT purchases.artwork_id, count(*), sum(purchases.price_paid)
+    FROM purchases GROUP BY purchases.artwork_id""",
+    """INSERT INTO daily_sales (day, sales, revenue)
+    SELECT date(purchases.date), count(*), sum(purchases.price_paid)
+    FROM purchases WHERE purchases.date IS NOT NULL GROUP BY date(purchases.date)""",
+]
+
+
+def upgrade():
+    op.create_table('artist_sales',
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('sales', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('artist_id')
+    )
+    op.create_index('ix_artist_sales_revenue', 'artist_sales', ['revenue', 'artist_id'], unique=False)
+    op.create_table('artwork_sales',
+    sa.Column('artwork_id', sa.Integer(), nullable=False),
+    sa.Column('sales', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('artwork_id')
+    )
+    op.create_index('ix_artwork_sales_sales', 'artwork_sales', ['sales', 'artwork_id'], unique=False)
+    op.create_table('daily_sales',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('sales', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+    for statement in BACKFILL:
+        op.execute(statement)
+
+
+def downgrade():
+    op.drop_table('daily_sales')
+    op.drop_index('ix_artwork_sales_sales', table_name='artwork_sales')
+    op.drop_table('artwork_sales')
+    op.drop_index('ix_artist_sales_revenue', table_name='artist_sales')
+    op.drop_table('artist_sales')
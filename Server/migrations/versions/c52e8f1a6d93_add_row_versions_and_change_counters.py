@@ -0,0 +1,44 @@
+"""Add row versions and change counters
+
+Revision ID: c52e8f1a6d93
+Revises: 3a7c1e9d2b40
+Create Date: 2026-10-17 11:03:27.540912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c52e8f1a6d93'
+down_revision = '3a7c1e9d2b40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('artists', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+    with op.batch_alter_table('artworks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+    change_counters = op.create_table('change_counters',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(change_counters, [
+        {'name': 'artists', 'value': 0},
+        {'name': 'artworks', 'value': 0},
+    ])
+
+
+def downgrade():
+    op.drop_table('change_counters')
+
+    with op.batch_alter_table('artworks', schema=None) as batch_op:
+        batch_op.drop_column('version')
+
+    with op.batch_alter_table('artists', schema=None) as batch_op:
+        batch_op.drop_column('version')
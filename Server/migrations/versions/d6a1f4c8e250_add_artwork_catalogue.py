@@ -0,0 +1,59 @@
+"""Add the artwork catalogue read table
+
+Revision ID: d6a1f4c8e250
+Revises: 9b4e2d7c1f63
+Create Date: 2026-10-17 20:48:31.227540
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6a1f4c8e250'
+down_revision = '9b4e2d7c1f63'
+branch_labels = None
+depends_on = None
+
+# Frozen copy of catalogue.REBUILD at this revision.
+BACKFILL = """INSERT INTO artwork_catalogue (artwork_id, artist_id, title, price, image_url, artist_name, sales,
+    last_sale_price, last_sold_at, available)
+SELECT artworks.id, artworks.artist_id, artworks.title, artworks.price, artworks.image_url, artists.name,
+    (SELECT count(*) FROM purchases WHERE purchases.artwork_id = artworks.id),
+    (SELECT purchases.price_paid FROM purchases WHERE purchases.artwork_id = artworks.id
+     ORDER BY purchases.date DESC NULLS LAST, purchases.id DESC LIMIT 1),
+    (SELECT purchases.date FROM purchases WHERE purchases.artwork_id = artworks.id
+     ORDER BY purchases.date DESC NULLS LAST, purchases.id DESC LIMIT 1),
+    NOT (EXISTS (SELECT * FROM purchases WHERE purchases.artwork_id = artworks.id))
+FROM artworks LEFT OUTER JOIN artists ON artists.id = artworks.artist_id"""
+
+
+def upgrade():
+    with op.batch_alter_table('purchases', schema=None) as batch_op:
+        batch_op.create_index('ix_purchases_artwork_id_date', ['artwork_id', 'date', 'id'], unique=False)
+
+    op.create_table('artwork_catalogue',
+    sa.Column('artwork_id', sa.Integer(), nullable=False),
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(), nullable=False),
+    sa.Column('price', sa.Integer(), nullable=False),
+    sa.Column('image_url', sa.String(), nullable=True),
+    sa.Column('artist_name', sa.String(), nullable=True),
+    sa.Column('sales', sa.Integer(), nullable=False),
+    sa.Column('last_sale_price', sa.Integer(), nullable=True),
+    sa.Column('last_sold_at', sa.DateTime(), nullable=True),
+    sa.Column('available', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('artwork_id')
+    )
+    op.create_index('ix_artwork_catalogue_price', 'artwork_catalogue', ['price', 'artwork_id'], unique=False)
+    op.create_index('ix_artwork_catalogue_artist_id_price', 'artwork_catalogue',
+                    ['artist_id', 'price', 'artwork_id'], unique=False)
+    op.execute(BACKFILL)
+
+
+def downgrade():
+    op.drop_index('ix_artwork_catalogue_artist_id_price', table_name='artwork_catalogue')
+    op.drop_index('ix_artwork_catalogue_price', table_name='artwork_catalogue')
+    op.drop_table('artwork_catalogue')
+    with op.batch_alter_table('purchases', schema=None) as batch_op:
+        batch_op.drop_index('ix_purchases_artwork_id_date')
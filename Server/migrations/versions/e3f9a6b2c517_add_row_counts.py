@@ -0,0 +1,91 @@
+"""Add trigger-maintained row counts
+
+Revision ID: e3f9a6b2c517
+Revises: a4d7e2c9b813
+Create Date: 2026-10-17 19:02:47.118350
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3f9a6b2c517'
+down_revision = 'a4d7e2c9b813'
+branch_labels = None
+depends_on = None
+
+# Frozen copy of the DDL in rowcounts.py at this revision.
+COUNTED = ("artists", "artworks", "users", "purchases", "sells", "carts")
+
+RECOUNT = [
+    f"""INSERT INTO row_counts (table_name, count) SELECT '{t}', count(*) FROM {t} WHERE true
+    ON CONFLICT (table_name) DO UPDATE SET count = excluded.count""" for t in COUNTED
+]
+
+SQLITE_DDL = [
+    statement
+    for t in COUNTED
+    for statement in (
+        f"""CREATE TRIGGER IF NOT EXISTS row_counts_{t}_ai AFTER INSERT ON {t} BEGIN
+            UPDATE row_counts SET count = count + 1 WHERE table_name = '{t}';
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS row_counts_{t}_ad AFTER DELETE ON {t} BEGIN
+            UPDATE row_counts SET count = count - 1 WHERE table_name = '{t}';
+        END""",
+    )
+]
+
+POSTGRES_DDL = [
+    """CREATE OR REPLACE FUNCTION row_counts_sync() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE row_counts SET count = count + (SELECT count(*) FROM new_rows) WHERE table_name = TG_TABLE_NAME;
+        ELSE
+            UPDATE row_counts SET count = count - (SELECT count(*) FROM old_rows) WHERE table_name = TG_TABLE_NAME;
+        END IF;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""",
+] + [
+    statement
+    for t in COUNTED
+    for statement in (
+        f"""CREATE OR REPLACE TRIGGER row_counts_{t}_ai AFTER INSERT ON {t}
+            REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION row_counts_sync()""",
+        f"""CREATE OR REPLACE TRIGGER row_counts_{t}_ad AFTER DELETE ON {t}
+            REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION row_counts_sync()""",
+    )
+]
+
+SQLITE_DROP = [f"DROP TRIGGER IF EXISTS row_counts_{t}_{suffix}" for t in COUNTED for suffix in ("ai", "ad")]
+POSTGRES_DROP = ["DROP FUNCTION IF EXISTS row_counts_sync() CASCADE"]
+
+
+def upgrade():
+    op.create_table('row_counts',
+    sa.Column('table_name', sa.String(), nullable=False),
+    sa.Column('count', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        statements = SQLITE_DDL + RECOUNT
+    elif dialect == 'postgresql':
+        statements = POSTGRES_DDL + RECOUNT
+    else:
+        return
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        statements = SQLITE_DROP
+    elif dialect == 'postgresql':
+        statements = POSTGRES_DROP
+    else:
+        statements = []
+    for statement in statements:
+        op.execute(statement)
+    op.drop_table('row_counts')
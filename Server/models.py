@@ -2,7 +2,10 @@ from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy_serializer import SerializerMixin
 from datetime import datetime
 
-db = SQLAlchemy()
+from database import RoutingSession
+from derivatives import image_urls
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 
 class Artist(db.Model, SerializerMixin):
@@ -13,10 +16,12 @@ class Artist(db.Model, SerializerMixin):
     name = db.Column(db.String, nullable=False)
     bio = db.Column(db.String)
     email = db.Column(db.String, nullable=True, unique=True, index=True)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
 
     __table_args__ = (
         db.UniqueConstraint("email", name="uq_artists_email"),
     )
+    __mapper_args__ = {"version_id_col": version}
 
     artworks = db.relationship(
         "Artwork",
@@ -26,6 +31,7 @@ class Artist(db.Model, SerializerMixin):
     )
 
     serialize_rules = (
+        "-version",
         "-artworks.artist",
         "-artworks.cart",
         "-artworks.purchases",
@@ -45,6 +51,13 @@ class Artwork(db.Model, SerializerMixin):
     description = db.Column(db.Text, nullable=True)
     artist_id = db.Column(db.Integer, db.ForeignKey("artists.id"), nullable=False)
     image_url = db.Column(db.String, nullable=True)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+
+    __table_args__ = (
+        db.Index("ix_artworks_artist_id_price", "artist_id", "price"),
+        db.Index("ix_artworks_price_id", "price", "id"),
+    )
+    __mapper_args__ = {"version_id_col": version}
 
     artist = db.relationship("Artist", back_populates="artworks", lazy="joined")
     purchases = db.relationship(
@@ -67,6 +80,8 @@ class Artwork(db.Model, SerializerMixin):
     )
 
     serialize_rules = (
+        "images",
+        "-version",
         "-artist.artworks",
         "-cart.artwork",
         "-cart.user",
@@ -76,6 +91,11 @@ class Artwork(db.Model, SerializerMixin):
         "-sells.seller",
     )
 
+    @property
+    def images(self):
+        """Responsive derivatives of an uploaded image_url; None for external URLs."""
+        return image_urls(self.image_url)
+
     def __repr__(self):
         return f"<Artwork {self.id} {self.title} ${self.price}>"
 
@@ -129,6 +149,10 @@ class Purchase(db.Model, SerializerMixin):
     price_paid = db.Column(db.Integer, nullable=False)
     date = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_purchases_artwork_id_date", "artwork_id", "date", "id"),
+    )
+
     user = db.relationship("User", back_populates="purchases", lazy="joined")
     artwork = db.relationship("Artwork", back_populates="purchases", lazy="joined")
 
@@ -156,6 +180,12 @@ class Sell(db.Model, SerializerMixin):
     seller_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     artwork_id = db.Column(db.Integer, db.ForeignKey("artworks.id"), nullable=False)
 
+    __table_args__ = (
+        db.Index("ix_sells_status_created_at", "status", "created_at", "id"),
+        db.Index("ix_sells_status_price", "status", "price", "id"),
+        db.Index("ix_sells_artwork_id", "artwork_id"),
+    )
+
     seller = db.relationship("User", back_populates="sells", lazy="joined")
     artwork = db.relationship("Artwork", back_populates="sells", lazy="joined")
 
@@ -181,6 +211,10 @@ class Cart(db.Model, SerializerMixin):
     artwork_id = db.Column(db.Integer, db.ForeignKey("artworks.id"), nullable=False)
     added_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_carts_user_id_artwork_id", "user_id", "artwork_id", unique=True),
+    )
+
     user = db.relationship("User", back_populates="cart_items", lazy="joined")
     artwork = db.relationship("Artwork", back_populates="cart", lazy="joined")
 
@@ -196,3 +230,126 @@ class Cart(db.Model, SerializerMixin):
 
     def __repr__(self):
         return f"<Cart {self.id} User:{self.user_id} Artwork:{self.artwork_id}>"
+
+
+class ChangeCounter(db.Model):
+    __tablename__ = "change_counters"
+
+    name = db.Column(db.String, primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ChangeCounter {self.name}={self.value}>"
+
+
+class RowCount(db.Model):
+    """Rows per table, kept exact by the triggers in rowcounts.py."""
+    __tablename__ = "row_counts"
+
+    table_name = db.Column(db.String, primary_key=True)
+    count = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<RowCount {self.table_name}={self.count}>"
+
+
+class IdempotencyKey(db.Model):
+    __tablename__ = "idempotency_keys"
+
+    user_id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String, primary_key=True)
+    status_code = db.Column(db.Integer, nullable=False)
+    response = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<IdempotencyKey {self.key} User:{self.user_id} {self.status_code}>"
+
+
+# Sales summaries, maintained incrementally by analytics.py. They carry no
+# foreign keys: rows are adjusted and removed alongside the purchases they
+# summarize, and `flask rebuild-analytics` recomputes them from scratch.
+class ArtistSales(db.Model):
+    __tablename__ = "artist_sales"
+
+    artist_id = db.Column(db.Integer, primary_key=True)
+    sales = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index("ix_artist_sales_revenue", "revenue", "artist_id"),
+    )
+
+
+class ArtworkSales(db.Model):
+    __tablename__ = "artwork_sales"
+
+    artwork_id = db.Column(db.Integer, primary_key=True)
+    sales = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index("ix_artwork_sales_sales", "sales", "artwork_id"),
+    )
+
+
+class DailySales(db.Model):
+    __tablename__ = "daily_sales"
+
+    day = db.Column(db.Date, primary_key=True)
+    sales = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+# Read model for GET /catalogue, maintained by catalogue.py. Like the sales
+# summaries it has no foreign keys; `flask rebuild-catalogue` recomputes it.
+class ArtworkCatalogue(db.Model, SerializerMixin):
+    __tablename__ = "artwork_catalogue"
+
+    artwork_id = db.Column(db.Integer, primary_key=True)
+    artist_id = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String, nullable=False)
+    price = db.Column(db.Integer, nullable=False)
+    image_url = db.Column(db.String)
+    artist_name = db.Column(db.String)
+    sales = db.Column(db.Integer, nullable=False, default=0)
+    last_sale_price = db.Column(db.Integer)
+    last_sold_at = db.Column(db.DateTime)
+    available = db.Column(db.Boolean, nullable=False, default=True)
+
+    __table_args__ = (
+        db.Index("ix_artwork_catalogue_price", "price", "artwork_id"),
+        db.Index("ix_artwork_catalogue_artist_id_price", "artist_id", "price", "artwork_id"),
+    )
+
+    serialize_rules = ("images",)
+
+    @property
+    def images(self):
+        return image_urls(self.image_url)
+
+
+# Background jobs; see jobs.py. A row exists while the job is queued,
+# running or failed, and is deleted when the job succeeds.
+class Job(db.Model):
+    __tablename__ = "jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    queue = db.Column(db.String, nullable=False)
+    name = db.Column(db.String, nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String, nullable=False, default="queued")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime)
+    locked_by = db.Column(db.String)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_jobs_queue_status_run_at", "queue", "status", "run_at", "id"),
+    )
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.name} on {self.queue} {self.status}>"
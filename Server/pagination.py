@@ -0,0 +1,87 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(",", ":"), default=_encode_value).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot put {type(value).__name__} in a cursor")
+
+
+def _decode_value(column, value):
+    """Undo _encode_value for `column`, which the JSON round trip turned into a string."""
+    if isinstance(value, str) and column.type.python_type is datetime:
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError("Invalid cursor")
+    return value
+
+
+def decode_cursor(token, size):
+    padded = token + "=" * (-len(token) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    if not all(isinstance(v, (int, float, str)) and not isinstance(v, bool) for v in values):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def parse_int(args, name, default=None, minimum=None, maximum=None):
+    raw = args.get(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an integer")
+    if minimum is not None and value < minimum:
+        raise ValueError(f"'{name}' must be >= {minimum}")
+    if maximum is not None and value > maximum:
+        raise ValueError(f"'{name}' must be <= {maximum}")
+    return value
+
+
+def keyset_page(query, columns, limit, after=None, descending=False):
+    """
+    Apply keyset pagination over `columns` (the last one must be unique).
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    rows = keyset_query(query, columns, limit, after, descending).all()
+    return keyset_rows(rows, columns, limit)
+
+
+def keyset_query(query, columns, limit, after=None, descending=False):
+    """
+    The filtered, ordered and limited query (or select()) behind keyset_page.
+    With limit=None, every row after the cursor.
+    """
+    if after is not None:
+        values = [_decode_value(c, v) for c, v in zip(columns, decode_cursor(after, len(columns)))]
+        key = tuple_(*columns)
+        query = query.filter(key < tuple_(*values) if descending else key > tuple_(*values))
+    order = [c.desc() for c in columns] if descending else list(columns)
+    query = query.order_by(*order)
+    return query if limit is None else query.limit(limit + 1)
+
+
+def keyset_rows(rows, columns, limit):
+    """Trim the extra row keyset_query fetched; returns (rows, next_cursor)."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, c.key) for c in columns)
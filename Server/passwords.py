@@ -0,0 +1,106 @@
+"""
+Password hashing off the request thread.
+
+Hashing is deliberately slow, so signup and login hand it to a small
+process pool instead of burning a web worker's CPU. The pool is bounded:
+at most PASSWORD_HASH_WORKERS hashes run and PASSWORD_HASH_QUEUE more
+wait, and anything beyond that is refused with HashingBusy, which the app
+answers with a 503 and Retry-After rather than queueing without limit.
+
+PASSWORD_HASH_METHOD and PASSWORD_SALT_LENGTH are passed to werkzeug. A
+successful verify of a hash made with other parameters also returns a
+fresh hash, so stored hashes upgrade as users log in.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from functools import lru_cache
+
+from flask import jsonify
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HashingBusy(Exception):
+    pass
+
+
+@lru_cache(maxsize=None)
+def _method_prefix(method, salt_length):
+    """The "method$" part werkzeug writes for `method`, defaults filled in, e.g. "scrypt:32768:8:1"."""
+    return generate_password_hash("", method, salt_length).split("$", 1)[0]
+
+
+def _hash(password, method, salt_length):
+    return generate_password_hash(password, method, salt_length)
+
+
+def _verify(pwhash, password, method, salt_length):
+    """(matches, upgraded hash or None). Runs in a pool process."""
+    if not check_password_hash(pwhash, password):
+        return False, None
+    stored_method, _, rest = pwhash.partition("$")
+    salt = rest.split("$", 1)[0]
+    if stored_method == _method_prefix(method, salt_length) and len(salt) == salt_length:
+        return True, None
+    return True, generate_password_hash(password, method, salt_length)
+
+
+class PasswordHasher:
+    def __init__(self, app=None):
+        self._pool = None
+        self._slots = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("PASSWORD_HASH_METHOD", os.environ.get("PASSWORD_HASH_METHOD", "scrypt"))
+        app.config.setdefault("PASSWORD_SALT_LENGTH", int(os.environ.get("PASSWORD_SALT_LENGTH", 16)))
+        app.config.setdefault("PASSWORD_HASH_WORKERS", int(os.environ.get("PASSWORD_HASH_WORKERS", 2)))
+        app.config.setdefault("PASSWORD_HASH_QUEUE", int(os.environ.get("PASSWORD_HASH_QUEUE", 8)))
+        app.config.setdefault("PASSWORD_HASH_TIMEOUT", float(os.environ.get("PASSWORD_HASH_TIMEOUT", 10)))
+        app.config.setdefault("PASSWORD_HASH_RETRY_AFTER", int(os.environ.get("PASSWORD_HASH_RETRY_AFTER", 1)))
+        self.config = app.config
+        app.register_error_handler(HashingBusy, self._busy)
+        app.extensions["passwords"] = self
+
+    def _busy(self, e):
+        response = jsonify({"error": "Too many sign-ins in progress, try again shortly"})
+        response.headers["Retry-After"] = str(self.config["PASSWORD_HASH_RETRY_AFTER"])
+        return response, 503
+
+    def _run(self, fn, *args):
+        workers = self.config["PASSWORD_HASH_WORKERS"]
+        args += (self.config["PASSWORD_HASH_METHOD"], self.config["PASSWORD_SALT_LENGTH"])
+        if workers <= 0:
+            return fn(*args)
+        with self._lock:
+            if self._pool is None:
+                # Created on first use, so each gunicorn worker gets its own pool after forking.
+                self._pool = ProcessPoolExecutor(max_workers=workers)
+                self._slots = threading.BoundedSemaphore(workers + self.config["PASSWORD_HASH_QUEUE"])
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._pool.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._slots.release())
+        try:
+            return future.result(timeout=self.config["PASSWORD_HASH_TIMEOUT"])
+        except TimeoutError:
+            raise HashingBusy()
+
+    def hash(self, password):
+        return self._run(_hash, password)
+
+    def verify(self, pwhash, password):
+        """
+        Check `password` against `pwhash`. Returns (matches, new_hash), where
+        new_hash is set when the hash should be replaced with current parameters.
+        """
+        return self._run(_verify, pwhash, password)
+
+
+hasher = PasswordHasher()
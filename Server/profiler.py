@@ -0,0 +1,78 @@
+"""
+Opt-in sampling profiler for the slowest requests.
+
+While enabled, a daemon thread samples the stack of every thread that is
+serving a request every `interval` seconds. When a request finishes among
+the `keep` slowest seen so far, its samples are written to `directory` in
+folded-stack format (`outer;inner;leaf count` per line), which
+flamegraph.pl and speedscope read directly. Files that fall out of the
+slowest set are deleted.
+"""
+import heapq
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+
+class SamplingProfiler:
+    def __init__(self, directory, interval=0.005, keep=20):
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+        self._active = {}
+        self._slowest = []
+        self._lock = threading.Lock()
+        self._thread = None
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        """Begin sampling the calling thread."""
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+
+    def stop(self, label, elapsed):
+        """Stop sampling the calling thread; keep its stacks if it was among the slowest."""
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+            if not samples or (len(self._slowest) >= self.keep and elapsed <= self._slowest[0][0]):
+                return None
+            slug = re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_")
+            path = os.path.join(self.directory, f"{elapsed * 1000:010.1f}ms-{slug}-{uuid.uuid4().hex[:8]}.folded")
+            evicted = heapq.heappushpop(self._slowest, (elapsed, path)) if len(self._slowest) >= self.keep \
+                else heapq.heappush(self._slowest, (elapsed, path))
+        with open(path, "w") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        if evicted is not None:
+            try:
+                os.unlink(evicted[1])
+            except FileNotFoundError:
+                pass
+        return path
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, samples in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None and ident != own:
+                        samples[_fold(frame)] += 1
+
+
+def _fold(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":"))
+        frame = frame.f_back
+    return ";".join(reversed(names))
@@ -0,0 +1,207 @@
+"""
+Token-bucket rate limits for expensive or abusable endpoints.
+
+A limit such as "10/minute" is a bucket of 10 tokens per key that refills
+at 10 per minute; each request takes a token, and a request finding the
+bucket empty is refused with 429 and Retry-After before the view runs, so
+a flood of logins never reaches the password hasher. Keys are built per
+request, e.g. from the client IP or the account being logged into.
+
+Stores:
+    memory  in-process buckets (per gunicorn worker)
+    sqlite  buckets in a local SQLite file, shared by all workers on a host
+    null    rate limiting disabled
+"""
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+
+from flask import jsonify, request, session
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+PRUNE_EVERY = 1000
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+def parse_limit(value):
+    """"10/minute" -> (10, 60.0): bucket capacity and seconds to refill it."""
+    count, _, period = value.partition("/")
+    try:
+        return int(count), float(PERIODS.get(period.strip(), period))
+    except ValueError:
+        raise ValueError(f"Invalid rate limit {value!r}; expected e.g. '10/minute'")
+
+
+def _refill(tokens, updated, now, capacity, period):
+    """Take one token from a bucket last seen at `updated`; returns (tokens left, retry after or 0)."""
+    rate = capacity / period
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0
+    return tokens, (1 - tokens) / rate
+
+
+class MemoryStore:
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._takes = 0
+
+    def take(self, key, capacity, period, now):
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (capacity, now, 0))
+            tokens, retry_after = _refill(tokens, updated, now, capacity, period)
+            # Once full again, a bucket is indistinguishable from a missing one.
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) * period / capacity)
+            self._takes += 1
+            if self._takes % PRUNE_EVERY == 0:
+                self._buckets = {k: v for k, v in self._buckets.items() if v[2] > now}
+            return retry_after
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteStore:
+    """
+    Buckets in one table of a SQLite file. Each take is a single IMMEDIATE
+    transaction, so concurrent workers serialize on the file lock and never
+    both spend the last token.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets ("
+                         "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, capacity, period, now):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens, retry_after = _refill(tokens, updated, now, capacity, period)
+            conn.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)",
+                         (key, tokens, now, now + (capacity - tokens) * period / capacity))
+            self._takes += 1
+            if self._takes % PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM buckets WHERE full_at < ?", (now,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return retry_after
+
+    def clear(self):
+        self._connect().execute("DELETE FROM buckets")
+
+
+class NullStore:
+    def take(self, key, capacity, period, now):
+        return 0
+
+    def clear(self):
+        pass
+
+
+def by_ip():
+    """The client's address; behind a proxy this needs TRUSTED_PROXIES set (see app.py)."""
+    return request.remote_addr or "unknown"
+
+
+def by_account():
+    """The email being signed into, so one account is limited however many IPs try it."""
+    data = request.get_json(silent=True) or {}
+    email = data.get("email")
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+def by_user_or_ip():
+    user_id = session.get("user_id")
+    return f"user:{user_id}" if user_id else by_ip()
+
+
+class RateLimiter:
+    DEFAULTS = {
+        "RATELIMIT_LOGIN_IP": "30/minute",
+        "RATELIMIT_LOGIN_ACCOUNT": "10/minute",
+        "RATELIMIT_SIGNUP_IP": "10/hour",
+        "RATELIMIT_UPLOAD": "60/minute",
+    }
+
+    def __init__(self, app=None):
+        self.store = NullStore()
+        self.rejected = defaultdict(int)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("RATELIMIT_STORAGE", os.environ.get("RATELIMIT_STORAGE", "memory"))
+        app.config.setdefault("RATELIMIT_DB", os.environ.get(
+            "RATELIMIT_DB", os.path.join(tempfile.gettempdir(), "art-gallery-ratelimit.db")))
+        for name, default in self.DEFAULTS.items():
+            app.config.setdefault(name, os.environ.get(name, default))
+            parse_limit(app.config[name])
+
+        kind = app.config["RATELIMIT_STORAGE"]
+        if kind == "memory":
+            self.store = MemoryStore()
+        elif kind == "sqlite":
+            self.store = SQLiteStore(app.config["RATELIMIT_DB"])
+        elif kind == "null":
+            self.store = NullStore()
+        else:
+            raise ValueError(f"Unknown RATELIMIT_STORAGE {kind!r}")
+        self.config = app.config
+        app.register_error_handler(RateLimited, self._limited)
+        app.extensions["ratelimit"] = self
+
+    def _limited(self, e):
+        response = jsonify({"error": "Too many requests, try again later"})
+        response.headers["Retry-After"] = str(math.ceil(e.retry_after))
+        return response, 429
+
+    def limit(self, setting, key):
+        """
+        Apply the limit in config `setting` (e.g. "10/minute") per value of
+        `key()`; requests for which `key()` returns None are not limited.
+        """
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                value = key()
+                if value is not None:
+                    capacity, period = parse_limit(self.config[setting])
+                    retry_after = self.store.take(f"{setting}:{value}", capacity, period, time.time())
+                    if retry_after:
+                        self.rejected[setting] += 1
+                        raise RateLimited(retry_after)
+                return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+
+limiter = RateLimiter()
@@ -0,0 +1,111 @@
+"""
+Table row counts without COUNT(*) scans.
+
+`row_counts` holds one row per counted table, adjusted by database
+triggers on every INSERT and DELETE, so counts stay exact through Core,
+bulk and raw SQL writes as well as the ORM. On SQLite the triggers are
+per row; on PostgreSQL they are per statement and count the transition
+table, so a bulk insert updates the counter once. TRUNCATE is not
+tracked; `flask recount` recounts every table.
+
+`approximate_counts` reads the planner's statistics instead (sqlite_stat1
+after ANALYZE, pg_class.reltuples after VACUUM/ANALYZE), falling back to
+the counters for tables that have no statistics yet.
+"""
+from sqlalchemy import DDL, bindparam, event, select, text
+
+from models import db, RowCount
+
+COUNTED = ("artists", "artworks", "users", "purchases", "sells", "carts")
+
+# Recounts every table; run after create_all, in the migration, and after
+# loads that bypass the triggers.
+RECOUNT = [
+    f"""INSERT INTO row_counts (table_name, count) SELECT '{t}', count(*) FROM {t} WHERE true
+    ON CONFLICT (table_name) DO UPDATE SET count = excluded.count""" for t in COUNTED
+]
+
+SQLITE_DDL = [
+    statement
+    for t in COUNTED
+    for statement in (
+        f"""CREATE TRIGGER IF NOT EXISTS row_counts_{t}_ai AFTER INSERT ON {t} BEGIN
+            UPDATE row_counts SET count = count + 1 WHERE table_name = '{t}';
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS row_counts_{t}_ad AFTER DELETE ON {t} BEGIN
+            UPDATE row_counts SET count = count - 1 WHERE table_name = '{t}';
+        END""",
+    )
+]
+
+POSTGRES_DDL = [
+    """CREATE OR REPLACE FUNCTION row_counts_sync() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE row_counts SET count = count + (SELECT count(*) FROM new_rows) WHERE table_name = TG_TABLE_NAME;
+        ELSE
+            UPDATE row_counts SET count = count - (SELECT count(*) FROM old_rows) WHERE table_name = TG_TABLE_NAME;
+        END IF;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""",
+] + [
+    statement
+    for t in COUNTED
+    for statement in (
+        f"""CREATE OR REPLACE TRIGGER row_counts_{t}_ai AFTER INSERT ON {t}
+            REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION row_counts_sync()""",
+        f"""CREATE OR REPLACE TRIGGER row_counts_{t}_ad AFTER DELETE ON {t}
+            REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION row_counts_sync()""",
+    )
+]
+
+# The triggers go with their tables; only the function outlives them.
+POSTGRES_DROP = ["DROP FUNCTION IF EXISTS row_counts_sync() CASCADE"]
+
+
+# After the whole metadata, so row_counts and every counted table exist.
+for dialect, create in (("sqlite", SQLITE_DDL), ("postgresql", POSTGRES_DDL)):
+    for statement in create + RECOUNT:
+        event.listen(db.metadata, "after_create", DDL(statement).execute_if(dialect=dialect))
+for statement in POSTGRES_DROP:
+    event.listen(db.metadata, "after_drop", DDL(statement).execute_if(dialect="postgresql"))
+
+
+def row_counts(tables=COUNTED):
+    """Exact {table: rows} from the counters, in one indexed query."""
+    counts = dict(db.session.execute(
+        select(RowCount.table_name, RowCount.count).where(RowCount.table_name.in_(tables))
+    ).all())
+    return {t: counts.get(t, 0) for t in tables}
+
+
+def approximate_counts(tables=COUNTED):
+    """Estimated {table: rows} from planner statistics; exact counters where there are none."""
+    dialect = db.session.get_bind().dialect.name
+    estimates = {}
+    if dialect == "sqlite":
+        if db.session.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")).first():
+            # The first number of each stat row is the table's row count.
+            for table, stat in db.session.execute(
+                text("SELECT tbl, stat FROM sqlite_stat1 WHERE tbl IN :tables")
+                .bindparams(bindparam("tables", expanding=True)),
+                {"tables": list(tables)},
+            ):
+                estimates[table] = max(estimates.get(table, 0), int(stat.split()[0]))
+    elif dialect == "postgresql":
+        for table, reltuples in db.session.execute(
+            text("SELECT relname, reltuples FROM pg_class WHERE relkind = 'r' AND relname = ANY(:tables)"),
+            {"tables": list(tables)},
+        ):
+            if reltuples >= 0:  # -1: never analyzed
+                estimates[table] = int(reltuples)
+    missing = [t for t in tables if t not in estimates]
+    if missing:
+        estimates.update(row_counts(missing))
+    return {t: estimates[t] for t in tables}
+
+
+def recount():
+    """Recount every table from scratch. The caller commits."""
+    for statement in RECOUNT:
+        db.session.execute(text(statement))
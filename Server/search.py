@@ -0,0 +1,173 @@
+"""
+Full-text search over artwork titles, descriptions and artist names.
+
+SQLite uses an FTS5 table, `artwork_search`, whose rowid is the artwork id.
+PostgreSQL uses a table of weighted tsvectors with a GIN index. On both,
+triggers on artworks and artists keep the index in step with every write,
+including Core and bulk statements that bypass the ORM. The DDL runs with
+`create_all` and in migration 9b2e4c7a1f05.
+"""
+import html
+import re
+
+from sqlalchemy import DDL, event, text
+
+from models import db, Artwork
+from pagination import decode_cursor, encode_cursor
+
+# Highlight markers: control characters cannot occur in escaped text, so
+# they survive html.escape and are then swapped for tags.
+OPEN, CLOSE = "\x02", "\x03"
+
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS artwork_search USING fts5(
+        title, description, artist_name, tokenize = 'unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS artworks_search_ai AFTER INSERT ON artworks BEGIN
+        INSERT INTO artwork_search (rowid, title, description, artist_name)
+        VALUES (new.id, new.title, new.description, (SELECT name FROM artists WHERE id = new.artist_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS artworks_search_au AFTER UPDATE OF title, description, artist_id ON artworks BEGIN
+        DELETE FROM artwork_search WHERE rowid = old.id;
+        INSERT INTO artwork_search (rowid, title, description, artist_name)
+        VALUES (new.id, new.title, new.description, (SELECT name FROM artists WHERE id = new.artist_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS artworks_search_ad AFTER DELETE ON artworks BEGIN
+        DELETE FROM artwork_search WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS artists_search_au AFTER UPDATE OF name ON artists BEGIN
+        UPDATE artwork_search SET artist_name = new.name
+        WHERE rowid IN (SELECT id FROM artworks WHERE artist_id = new.id);
+    END""",
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS artists_search_au",
+    "DROP TABLE IF EXISTS artwork_search",
+]
+
+# Indexes rows loaded while the sync triggers were absent, e.g. by seeding.build_sqlite.
+SQLITE_BACKFILL = """INSERT INTO artwork_search (rowid, title, description, artist_name)
+    SELECT artworks.id, artworks.title, artworks.description, artists.name
+    FROM artworks JOIN artists ON artists.id = artworks.artist_id"""
+
+POSTGRES_DOCUMENT = """
+    setweight(to_tsvector('english', coalesce({title}, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({artist_name}, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce({description}, '')), 'C')"""
+
+POSTGRES_DDL = [
+    """CREATE TABLE IF NOT EXISTS artwork_search (
+        artwork_id integer PRIMARY KEY REFERENCES artworks (id) ON DELETE CASCADE,
+        document tsvector NOT NULL)""",
+    "CREATE INDEX IF NOT EXISTS ix_artwork_search_document ON artwork_search USING gin (document)",
+    """CREATE OR REPLACE FUNCTION artworks_search_sync() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO artwork_search (artwork_id, document)
+        SELECT NEW.id, %s FROM artists WHERE artists.id = NEW.artist_id
+        ON CONFLICT (artwork_id) DO UPDATE SET document = EXCLUDED.document;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""" % POSTGRES_DOCUMENT.format(
+        title="NEW.title", artist_name="artists.name", description="NEW.description"),
+    """CREATE OR REPLACE TRIGGER artworks_search_sync
+        AFTER INSERT OR UPDATE OF title, description, artist_id ON artworks
+        FOR EACH ROW EXECUTE FUNCTION artworks_search_sync()""",
+    """CREATE OR REPLACE FUNCTION artists_search_sync() RETURNS trigger AS $$
+    BEGIN
+        UPDATE artwork_search SET document = %s
+        FROM artworks WHERE artworks.id = artwork_search.artwork_id AND artworks.artist_id = NEW.id;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""" % POSTGRES_DOCUMENT.format(
+        title="artworks.title", artist_name="NEW.name", description="artworks.description"),
+    """CREATE OR REPLACE TRIGGER artists_search_sync AFTER UPDATE OF name ON artists
+        FOR EACH ROW EXECUTE FUNCTION artists_search_sync()""",
+]
+
+POSTGRES_DROP = [
+    "DROP TABLE IF EXISTS artwork_search",
+    "DROP FUNCTION IF EXISTS artworks_search_sync() CASCADE",
+    "DROP FUNCTION IF EXISTS artists_search_sync() CASCADE",
+]
+
+SQLITE_SEARCH = """
+    SELECT rowid AS id, bm25(artwork_search, 10.0, 1.0, 5.0) AS score,
+           highlight(artwork_search, 0, :open, :close) AS title,
+           snippet(artwork_search, -1, :open, :close, '…', 16) AS snippet
+    FROM artwork_search
+    WHERE artwork_search MATCH :query {after}
+    ORDER BY score, rowid
+    LIMIT :limit"""
+
+SQLITE_AFTER = "AND (bm25(artwork_search, 10.0, 1.0, 5.0), rowid) > (:after_score, :after_id)"
+
+POSTGRES_SEARCH = """
+    WITH hits AS (
+        SELECT s.artwork_id AS id, -ts_rank_cd(s.document, q) AS score, q
+        FROM artwork_search s, to_tsquery('english', :query) q
+        WHERE s.document @@ q
+    ), page AS (
+        SELECT id, score, q FROM hits WHERE true {after} ORDER BY score, id LIMIT :limit
+    )
+    SELECT page.id, page.score,
+           ts_headline('english', a.title, page.q, :options) AS title,
+           ts_headline('english', coalesce(a.description, ''), page.q, :options) AS snippet
+    FROM page JOIN artworks a ON a.id = page.id
+    ORDER BY page.score, page.id"""
+
+POSTGRES_AFTER = "AND (score, id) > (:after_score, :after_id)"
+POSTGRES_OPTIONS = f"StartSel={OPEN}, StopSel={CLOSE}, MaxWords=16, MinWords=6"
+
+
+for dialect, create, drop in (("sqlite", SQLITE_DDL, SQLITE_DROP), ("postgresql", POSTGRES_DDL, POSTGRES_DROP)):
+    for statement in create:
+        event.listen(Artwork.__table__, "after_create", DDL(statement).execute_if(dialect=dialect))
+    for statement in drop:
+        event.listen(Artwork.__table__, "before_drop", DDL(statement).execute_if(dialect=dialect))
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """Keep autogenerate from dropping the search tables, which are not in the metadata."""
+    return not (type_ == "table" and reflected and compare_to is None and name.startswith("artwork_search"))
+
+
+def _terms(q):
+    terms = re.findall(r"\w+", q or "")
+    if not terms:
+        raise ValueError("Missing search terms in 'q'")
+    return terms
+
+
+def _markup(value):
+    if value is None:
+        return None
+    return html.escape(value).replace(OPEN, "<mark>").replace(CLOSE, "</mark>")
+
+
+def search_artworks(q, limit, after=None):
+    """
+    Rank artworks matching every term of `q` (the last term as a prefix).
+    Returns (hits, next_cursor); each hit is (artwork_id, title, snippet)
+    with matches wrapped in <mark> and the rest HTML-escaped.
+    """
+    terms = _terms(q)
+    params = {"limit": limit + 1}
+    if after is not None:
+        params["after_score"], params["after_id"] = decode_cursor(after, 2)
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "sqlite":
+        params.update(open=OPEN, close=CLOSE,
+                      query=" ".join(f'"{t}"' for t in terms) + "*")
+        sql = SQLITE_SEARCH.format(after=SQLITE_AFTER if after is not None else "")
+    elif dialect == "postgresql":
+        params.update(options=POSTGRES_OPTIONS,
+                      query=" & ".join(terms) + ":*")
+        sql = POSTGRES_SEARCH.format(after=POSTGRES_AFTER if after is not None else "")
+    else:
+        raise NotImplementedError(f"Full-text search is not supported on {dialect}")
+
+    rows = db.session.execute(text(sql), params).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor((rows[-1].score, rows[-1].id))
+    return [(r.id, _markup(r.title), _markup(r.snippet)) for r in rows], next_cursor
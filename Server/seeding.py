@@ -0,0 +1,221 @@
+"""
+Fast, deterministic synthetic datasets.
+
+Rows are generated a batch at a time, column by column, from a random
+generator seeded with (seed, table, batch), so the same arguments always
+produce the same database regardless of where it is written. Batches are
+written as tuples with executemany: through the app's connection for
+`load`, or straight into a new SQLite file for `build_sqlite`, which loads
+with journaling off, creates indexes, triggers, the search index, the
+sales summaries, the catalogue and the row counts after the data, and
+stamps the Alembic head so the file is ready to use.
+"""
+import os
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, create_engine
+from sqlalchemy.dialects import sqlite
+from werkzeug.security import generate_password_hash
+
+from models import db
+import analytics
+import catalogue
+import rowcounts
+import search
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+SYNTHETIC_PASSWORD = "password123"
+BATCH_SIZE = 50_000
+MIGRATIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+ADJECTIVES = ("Crimson", "Silent", "Golden", "Hidden", "Azure", "Broken", "Distant", "Velvet", "Burning", "Quiet",
+              "Scarlet", "Frozen", "Wandering", "Luminous", "Shattered", "Ancient", "Restless", "Pale", "Electric",
+              "Gentle")
+NOUNS = ("Harbor", "Garden", "Portrait", "River", "Cathedral", "Orchard", "Lighthouse", "Meadow", "Storm", "Dancer",
+         "Window", "Forest", "Bridge", "Market", "Mountain", "Study", "Nocturne", "Shore", "Still Life", "Horizon")
+MEDIA = ("Oil on canvas", "Watercolour", "Charcoal on paper", "Acrylic on board", "Ink wash", "Gouache",
+         "Mixed media", "Tempera on panel")
+FIRST = ("Ada", "Bruno", "Chiara", "Dmitri", "Elena", "Farah", "Goran", "Hana", "Ivo", "Jonas", "Kemi", "Lucia",
+         "Mateo", "Nadia", "Oskar", "Priya", "Rafael", "Sofia", "Tomas", "Yara")
+LAST = ("Okafor", "Lindqvist", "Moreau", "Tanaka", "Novak", "Haddad", "Costa", "Weber", "Kowalski", "Mensah",
+        "Ferreira", "Ivanova", "Rossi", "Nakamura", "Byrne", "Alvarez", "Sato", "Dubois", "Kaur", "Petrov")
+
+
+class Dataset:
+    """Row counts for a synthetic dataset; by default one artist, user and purchase per ten artworks."""
+
+    def __init__(self, artworks, artists=None, users=None, purchases=None):
+        self.artworks = artworks
+        self.artists = max(1, artworks // 10) if artists is None else artists
+        self.users = max(1, artworks // 10) if users is None else users
+        self.purchases = min(artworks, artworks // 10 if purchases is None else purchases)
+        self.sells = min(artworks - self.purchases, self.purchases // 10)
+        self.carts = min(artworks - self.purchases - self.sells, self.purchases // 2 + 1)
+
+    @classmethod
+    def from_scale(cls, scale, **counts):
+        return cls(SCALES.get(str(scale).lower()) or int(scale), **counts)
+
+    def __repr__(self):
+        return (f"{self.artists} artists, {self.artworks} artworks, {self.users} users, "
+                f"{self.purchases} purchases, {self.carts} cart items, {self.sells} sells")
+
+
+def _batches(count, batch_size):
+    for start in range(0, count, batch_size):
+        yield start, min(batch_size, count - start)
+
+
+def _rng(seed, table, start):
+    return random.Random(f"{seed}:{table}:{start}")
+
+
+def tables(dataset, seed=0, batch_size=BATCH_SIZE):
+    """
+    Yield (table name, column names, batches) in foreign-key order, where
+    batches is an iterator of lists of row tuples.
+    """
+    d = dataset
+    password = generate_password_hash(SYNTHETIC_PASSWORD)  # one hash for every user
+    epoch = datetime(2024, 1, 1)
+
+    def artists():
+        for start, n in _batches(d.artists, batch_size):
+            rng = _rng(seed, "artists", start)
+            first, last = rng.choices(FIRST, k=n), rng.choices(LAST, k=n)
+            yield [(i, f"{a} {b}", f"Synthetic artist {i}.", 1)
+                   for i, a, b in zip(range(start + 1, start + n + 1), first, last)]
+
+    def artworks():
+        for start, n in _batches(d.artworks, batch_size):
+            rng = _rng(seed, "artworks", start)
+            adjectives, nouns, media = rng.choices(ADJECTIVES, k=n), rng.choices(NOUNS, k=n), rng.choices(MEDIA, k=n)
+            prices = [rng.randrange(100, 5_000_000) for _ in range(n)]
+            artist_ids = [rng.randrange(1, d.artists + 1) for _ in range(n)]
+            yield [(i, f"{a} {b}", f"{m}, number {i}.", p, artist, 1)
+                   for i, a, b, m, p, artist in zip(range(start + 1, start + n + 1), adjectives, nouns, media,
+                                                    prices, artist_ids)]
+
+    def users():
+        for start, n in _batches(d.users, batch_size):
+            yield [(i, f"user{i}", f"user{i}@example.com", password, "user") for i in range(start + 1, start + n + 1)]
+
+    # Distinct artworks: each sold artwork is sold once, listed ones have no owner (sell_artwork
+    # deletes the seller's purchase), and carts only hold artworks that are neither.
+    picked = random.Random(f"{seed}:picked").sample(range(1, d.artworks + 1), d.purchases + d.sells + d.carts)
+    sold, listed, carted = (picked[:d.purchases], picked[d.purchases:d.purchases + d.sells],
+                            picked[d.purchases + d.sells:])
+
+    def purchases():
+        for start, n in _batches(d.purchases, batch_size):
+            rng = _rng(seed, "purchases", start)
+            yield [(start + k + 1, rng.randrange(1, d.users + 1), artwork, rng.randrange(100, 5_000_000),
+                    epoch + timedelta(minutes=start + k))
+                   for k, artwork in enumerate(sold[start:start + n])]
+
+    def carts():
+        for start, n in _batches(d.carts, batch_size):
+            rng = _rng(seed, "carts", start)
+            yield [(start + k + 1, rng.randrange(1, d.users + 1), artwork, epoch)
+                   for k, artwork in enumerate(carted[start:start + n])]
+
+    def sells():
+        for start, n in _batches(d.sells, batch_size):
+            rng = _rng(seed, "sells", start)
+            yield [(start + k + 1, rng.randrange(100, 5_000_000), "listed", epoch + timedelta(minutes=start + k),
+                    rng.randrange(1, d.users + 1), artwork) for k, artwork in enumerate(listed[start:start + n])]
+
+    yield "artists", ("id", "name", "bio", "version"), artists()
+    yield "artworks", ("id", "title", "description", "price", "artist_id", "version"), artworks()
+    yield "users", ("id", "userName", "email", "password", "role"), users()
+    yield "purchases", ("id", "user_id", "artwork_id", "price_paid", "date"), purchases()
+    yield "carts", ("id", "user_id", "artwork_id", "added_at"), carts()
+    yield "sells", ("id", "price", "status", "created_at", "seller_id", "artwork_id"), sells()
+
+
+def load(dataset, seed=0, batch_size=BATCH_SIZE):
+    """Insert `dataset` through the app's session into empty tables. The caller commits."""
+    for name, columns, batches in tables(dataset, seed, batch_size):
+        table = db.metadata.tables[name]
+        for batch in batches:
+            db.session.execute(table.insert(), [dict(zip(columns, row)) for row in batch])
+
+
+def build_sqlite(path, dataset, seed=0, batch_size=BATCH_SIZE, migrations=MIGRATIONS):
+    """Write `dataset` into a new SQLite database at `path`, replacing any existing file."""
+    if os.path.exists(path):
+        os.unlink(path)
+    engine = create_engine(f"sqlite:///{path}")
+    db.metadata.create_all(engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        for pragma in ("journal_mode = OFF", "synchronous = OFF", "temp_store = MEMORY",
+                       "cache_size = -262144", "locking_mode = EXCLUSIVE"):
+            conn.execute(f"PRAGMA {pragma}")
+        conn.execute("BEGIN")
+        # Building indexes and firing triggers once over the loaded data is far
+        # cheaper than maintaining them row by row.
+        deferred = conn.execute(
+            "SELECT type, name, sql FROM sqlite_master WHERE type IN ('index', 'trigger') AND sql IS NOT NULL"
+        ).fetchall()
+        for kind, name, _ in deferred:
+            conn.execute(f'DROP {kind.upper()} "{name}"')
+
+        for name, columns, batches in tables(dataset, seed, batch_size):
+            sql = f'INSERT INTO {name} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})'
+            stamps = _datetime_columns(name, columns)
+            for batch in batches:
+                conn.executemany(sql, _stored(batch, stamps) if stamps else batch)
+
+        for _, _, sql in deferred:
+            conn.execute(sql)
+        conn.execute(search.SQLITE_BACKFILL)
+        for stmt in analytics.REBUILD + catalogue.REBUILD:
+            conn.execute(str(stmt.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True})))
+        for statement in rowcounts.RECOUNT:
+            conn.execute(statement)
+        head = _alembic_head(migrations)
+        if head:
+            conn.execute("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL PRIMARY KEY)")
+            conn.execute("INSERT INTO alembic_version VALUES (?)", (head,))
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+_format_datetime = sqlite.DATETIME().bind_processor(sqlite.dialect())
+
+
+def _datetime_columns(table, columns):
+    """Positions of the DateTime columns in `columns` of `table`."""
+    return [i for i, name in enumerate(columns) if isinstance(db.metadata.tables[table].c[name].type, DateTime)]
+
+
+def _stored(batch, positions):
+    """
+    `batch` with datetimes at `positions` in SQLAlchemy's SQLite format.
+    sqlite3 would drop zero microseconds, and those strings compare
+    differently from the ones the app binds in range and cursor filters.
+    """
+    rows = []
+    for row in batch:
+        row = list(row)
+        for i in positions:
+            row[i] = _format_datetime(row[i])
+        rows.append(row)
+    return rows
+
+
+def _alembic_head(directory):
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    if not os.path.isdir(directory):
+        return None
+    config = Config()
+    config.set_main_option("script_location", directory)
+    return ScriptDirectory.from_config(config).get_current_head()
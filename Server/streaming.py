@@ -0,0 +1,49 @@
+"""
+Streamed JSON arrays for large collections.
+
+`json_array` runs a View's select() with yield_per, so rows come off the
+cursor (server-side on PostgreSQL) and are serialized and encoded one
+batch at a time. The response is the same JSON array the buffered route
+returns, but memory stays flat as the result grows and the first bytes
+go out after the first batch instead of the last row. Routes opt in with
+?stream=1; streamed responses are never stored in the response cache.
+
+Batches are encoded with orjson when it is installed (sorted keys, like
+the app's provider) and with the app's JSON provider otherwise.
+"""
+from flask import Response, current_app, request, stream_with_context
+
+from metrics import timed
+from models import db
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def wants_stream():
+    return request.args.get("stream") not in (None, "", "0", "false")
+
+
+def encode(rows):
+    with timed("serialize_time"):
+        if orjson is not None:
+            return orjson.dumps(rows, option=orjson.OPT_SORT_KEYS)
+        return current_app.json.dumps(rows).encode()
+
+
+def json_array(view, statement, yield_per=None):
+    """Yield the JSON array of `view`-dumped rows of `statement`, `yield_per` rows at a time."""
+    yield_per = yield_per or current_app.config["STREAM_BATCH_SIZE"]
+    rows = db.session.scalars(statement.execution_options(yield_per=yield_per))
+    separator = b"["
+    for batch in rows.partitions():
+        # Each batch encodes as "[...]"; splice it into the outer array.
+        yield separator + encode(view.dump_many(batch))[1:-1]
+        separator = b","
+    yield b"[]\n" if separator == b"[" else b"]\n"
+
+
+def streamed(view, statement, yield_per=None):
+    return Response(stream_with_context(json_array(view, statement, yield_per)), mimetype="application/json")
@@ -0,0 +1,78 @@
+"""
+Fixtures for the test suite.
+
+    cd Server && python -m pytest
+
+The app reads DATABASE_URL when it is imported, so the `app` fixture
+builds a small synthetic database (seeding.build_sqlite) and points the
+app at it before importing it. The app runs with TESTING set, which makes
+query budgets raise (see views.query_budget). Tests that write take
+`fresh_db`, which puts the database back as it was built when they
+finish.
+"""
+import os
+import shutil
+import sys
+
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+
+@pytest.fixture(scope="session")
+def database(tmp_path_factory):
+    """(path, pristine copy) of the test database."""
+    import seeding
+
+    workdir = tmp_path_factory.mktemp("app")
+    path, pristine = str(workdir / "test.db"), str(workdir / "pristine.db")
+    seeding.build_sqlite(path, seeding.Dataset(200))
+    shutil.copyfile(path, pristine)
+    return path, pristine
+
+
+@pytest.fixture(scope="session")
+def app(database):
+    os.environ["DATABASE_URL"] = "sqlite:///" + database[0]
+    # Cached responses skip the view, and with it the budget check.
+    os.environ["RESPONSE_CACHE_BACKEND"] = "null"
+    os.environ["RATELIMIT_STORAGE"] = "null"
+    os.environ["USER_CACHE_TTL"] = "0"
+
+    from app import app
+    app.config["TESTING"] = True
+    return app
+
+
+@pytest.fixture
+def fresh_db(app, database):
+    """The models' db; the database is put back as it was built afterwards."""
+    from models import db
+
+    yield db
+    path, pristine = database
+    with app.app_context():
+        db.engine.dispose()
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
+    shutil.copyfile(pristine, path)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(app):
+    """Log a test client in as a seeded user."""
+    import seeding
+
+    def login(client, user_id):
+        response = client.post("/login", json={"email": f"user{user_id}@example.com",
+                                               "password": seeding.SYNTHETIC_PASSWORD})
+        assert response.status_code == 200
+        return client
+    return login
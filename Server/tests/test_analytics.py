@@ -0,0 +1,65 @@
+from sqlalchemy import select
+
+from models import Artist, Artwork, ArtistSales, ArtworkSales, Cart, DailySales, Purchase, Sell
+from analytics import rebuild_summaries
+
+
+def summaries(db):
+    return [sorted(db.session.execute(select(*t.__table__.c)).all()) for t in (ArtistSales, ArtworkSales, DailySales)]
+
+
+def assert_summaries_match_rebuild(app, db):
+    with app.app_context():
+        incremental = summaries(db)
+        rebuild_summaries()
+        rebuilt = summaries(db)
+        db.session.rollback()
+    assert incremental == rebuilt
+
+
+def sold_artwork(app, db):
+    with app.app_context():
+        artwork = db.session.get(Artwork, db.session.scalar(select(Purchase.artwork_id).limit(1)))
+        other = db.session.scalar(select(Artist.id).where(Artist.id != artwork.artist_id).limit(1))
+        return artwork.id, artwork.artist_id, other
+
+
+def test_moving_a_sold_artwork_stays_within_budget(app, fresh_db, client):
+    artwork_id, _, other_artist = sold_artwork(app, fresh_db)
+    response = client.patch(f"/artworks/{artwork_id}", json={"artist_id": other_artist, "price": 9, "title": "Moved"})
+    assert response.status_code == 200
+    assert response.json["artist_id"] == other_artist
+    assert_summaries_match_rebuild(app, fresh_db)
+
+
+def test_moving_to_a_missing_artist_changes_nothing(app, fresh_db, client):
+    artwork_id, artist_id, _ = sold_artwork(app, fresh_db)
+    assert client.patch(f"/artworks/{artwork_id}", json={"artist_id": 999999, "price": 9}).status_code == 404
+    assert client.get(f"/artworks/{artwork_id}").json["artist_id"] == artist_id
+
+
+def test_summaries_match_rebuild_after_mixed_writes(app, fresh_db, client, login):
+    assert_summaries_match_rebuild(app, fresh_db)
+    with app.app_context():
+        session = fresh_db.session
+        taken = select(Purchase.artwork_id).union(select(Sell.artwork_id), select(Cart.artwork_id))
+        free = session.scalars(select(Artwork.id).where(Artwork.id.not_in(taken)).order_by(Artwork.id).limit(3)).all()
+        purchases = session.execute(select(Purchase.id, Purchase.artwork_id, Purchase.user_id)
+                                    .order_by(Purchase.id).limit(4)).all()
+        listing_id, seller_id = session.execute(select(Sell.id, Sell.seller_id).where(Sell.status == "listed")).first()
+        cart_user = session.scalar(select(Cart.user_id).limit(1))
+        artists = session.scalars(select(Artist.id).order_by(Artist.id.desc()).limit(2)).all()
+
+    login(client, 5)
+    assert client.post("/purchases", json={"user_id": 5, "artwork_id": free[0], "price_paid": 77,
+                                           "date": "2023-12-31T23:30:00"}).status_code == 201
+    assert client.post(f"/cart/checkout/{cart_user}").status_code == 201
+    login(client, seller_id % 20 + 1)
+    assert client.post(f"/listings/{listing_id}/buy").status_code == 201
+    assert client.delete(f"/purchases/{purchases[0].id}").status_code == 200
+    assert client.patch(f"/artworks/{purchases[1].artwork_id}", json={"artist_id": artists[0]}).status_code == 200
+    assert client.delete(f"/artworks/{purchases[2].artwork_id}").status_code == 200
+    assert client.delete(f"/users/{purchases[3].user_id}").status_code == 200
+    assert client.delete(f"/artists/{artists[1]}").status_code == 200
+
+    assert_summaries_match_rebuild(app, fresh_db)
@@ -0,0 +1,60 @@
+import threading
+
+from sqlalchemy import func, select
+
+from models import Artwork, Cart, Purchase, Sell
+
+
+def free_artworks(app, db, n):
+    taken = select(Purchase.artwork_id).union(select(Sell.artwork_id), select(Cart.artwork_id))
+    with app.app_context():
+        return db.session.scalars(select(Artwork.id).where(Artwork.id.not_in(taken)).order_by(Artwork.id).limit(n)).all()
+
+
+def purchases_of(app, db, artwork_ids):
+    with app.app_context():
+        return db.session.scalar(select(func.count()).where(Purchase.artwork_id.in_(artwork_ids)))
+
+
+def test_concurrent_checkouts_sell_an_artwork_once(app, fresh_db):
+    contested, *own = free_artworks(app, fresh_db, 3)
+    users = [1, 2]
+    client = app.test_client()
+    for user_id, artwork_id in zip(users, own):
+        response = client.post("/cart/batch", json={"user_id": user_id, "artwork_ids": [contested, artwork_id]})
+        assert response.status_code == 201
+
+    barrier, statuses = threading.Barrier(len(users)), {}
+
+    def checkout(user_id):
+        barrier.wait()
+        statuses[user_id] = app.test_client().post(f"/cart/checkout/{user_id}").status_code
+
+    threads = [threading.Thread(target=checkout, args=(user_id,)) for user_id in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(statuses.values()) == [201, 409]
+    assert purchases_of(app, fresh_db, [contested]) == 1
+    # The loser's checkout rolled back as a whole, so its other artwork is still unsold.
+    loser = next(user_id for user_id, status in statuses.items() if status == 409)
+    assert purchases_of(app, fresh_db, [own[users.index(loser)]]) == 0
+
+
+def test_idempotency_key_replays_the_checkout(app, fresh_db, client):
+    artwork_ids = free_artworks(app, fresh_db, 2)
+    assert client.post("/cart/batch", json={"user_id": 3, "artwork_ids": artwork_ids}).status_code == 201
+
+    first = client.post("/cart/checkout/3", headers={"Idempotency-Key": "order-1"})
+    assert first.status_code == 201
+    assert purchases_of(app, fresh_db, artwork_ids) == 2
+
+    # The cart is empty now; the retry gets the original response, not "Cart is empty".
+    again = client.post("/cart/checkout/3", headers={"Idempotency-Key": "order-1"})
+    assert again.status_code == 201
+    assert again.json == first.json
+    assert purchases_of(app, fresh_db, artwork_ids) == 2
+
+    assert client.post("/cart/checkout/3", headers={"Idempotency-Key": "order-2"}).status_code == 400
@@ -0,0 +1,43 @@
+from sqlalchemy import select
+
+from models import Purchase, Sell
+
+
+def relist(app, db, client):
+    """List a sold artwork for resale; returns (listing_id, artwork_id, seller_id)."""
+    with app.app_context():
+        purchase_id, artwork_id, seller_id = db.session.execute(
+            select(Purchase.id, Purchase.artwork_id, Purchase.user_id).limit(1)).one()
+    listing_id = client.delete(f"/purchases/{purchase_id}").json["sell"]["id"]
+    return listing_id, artwork_id, seller_id
+
+
+def other_user(seller_id):
+    return seller_id % 20 + 1
+
+
+def test_checkout_cannot_sell_a_listed_artwork(app, fresh_db, client, login):
+    listing_id, artwork_id, seller_id = relist(app, fresh_db, client)
+    buyer = other_user(seller_id)
+    assert client.post("/cart", json={"user_id": buyer, "artwork_id": artwork_id}).status_code == 201
+
+    response = client.post(f"/cart/checkout/{buyer}")
+    assert response.status_code == 409
+    assert response.json["artwork_ids"] == [artwork_id]
+
+    login(client, buyer)
+    response = client.post(f"/listings/{listing_id}/buy")
+    assert response.status_code == 201
+    assert response.json["artwork_id"] == artwork_id
+    with app.app_context():
+        assert fresh_db.session.get(Sell, listing_id).status == "sold"
+
+
+def test_post_purchases_cannot_sell_a_listed_artwork(app, fresh_db, client, login):
+    listing_id, artwork_id, seller_id = relist(app, fresh_db, client)
+    buyer = other_user(seller_id)
+    login(client, buyer)
+    response = client.post("/purchases", json={"user_id": buyer, "artwork_id": artwork_id, "price_paid": 1,
+                                               "date": "2024-05-01T00:00:00"})
+    assert response.status_code == 409
+    assert client.get("/listings").json[0]["id"] == listing_id
@@ -0,0 +1,56 @@
+import pytest
+
+from models import Artist
+from views import QueryBudgetExceeded, query_budget
+
+READ_ROUTES = [
+    "/artists",
+    "/artists/1",
+    "/artworks",
+    "/artworks?sort=-price&limit=5",
+    "/artworks/1",
+    "/artworks/search?q=Harbor",
+    "/users",
+    "/users/1",
+    "/purchases/1",
+    "/purchases/user/1",
+    "/cart/1",
+    "/catalogue",
+    "/catalogue?sort=-price&available=1",
+    "/listings",
+    "/analytics/artists",
+    "/analytics/artworks",
+    "/analytics/daily",
+]
+
+
+@pytest.mark.parametrize("url", READ_ROUTES)
+def test_read_routes_stay_within_budget(client, url):
+    # Under TESTING an exceeded budget raises QueryBudgetExceeded out of the client.
+    assert client.get(url).status_code == 200
+
+
+def test_every_route_declares_a_budget(app):
+    unbudgeted = sorted(
+        rule.rule for rule in app.url_map.iter_rules()
+        if rule.endpoint != "static" and not hasattr(app.view_functions[rule.endpoint], "query_budget")
+    )
+    assert unbudgeted == []
+
+
+@query_budget(1)
+def artists_with_artworks():
+    # Artist.artworks is lazy="select": one more query per artist.
+    return [len(artist.artworks) for artist in Artist.query.limit(3)]
+
+
+def test_n_plus_one_raises(app):
+    with app.test_request_context(), pytest.raises(QueryBudgetExceeded, match="ran 4 queries, budget is 1"):
+        artists_with_artworks()
+
+
+def test_over_budget_is_logged_when_not_enforced(app, monkeypatch, caplog):
+    monkeypatch.setitem(app.config, "QUERY_BUDGET_ENFORCE", False)
+    with app.test_request_context():
+        assert len(artists_with_artworks()) == 3
+    assert "artists_with_artworks ran 4 queries, budget is 1" in caplog.text
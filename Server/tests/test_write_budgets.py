@@ -0,0 +1,112 @@
+"""
+Every write route run with query budgets enforced, on the most expensive
+path the seeded data offers: an artist and a user with purchases, listings
+and cart items to cascade, an artwork with sales, the fullest cart.
+"""
+import base64
+
+import pytest
+from sqlalchemy import exists, func, select
+
+from models import Artist, Artwork, Cart, Purchase, Sell, User
+from seeding import SYNTHETIC_PASSWORD
+
+# A 1x1 PNG.
+PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=="
+)
+
+
+def with_all(db, key, *columns):
+    """The first `key` that has rows in every one of `columns` (foreign keys to it)."""
+    return db.session.scalar(
+        select(key).where(*(exists().where(c == key) for c in columns)).order_by(key).limit(1))
+
+
+def busiest(db, column):
+    return db.session.scalar(select(column).group_by(column).order_by(func.count().desc(), column).limit(1))
+
+
+class Seeded:
+    """Ids of rows in the seeded database that the scenarios write to."""
+
+    def __init__(self, db):
+        self.artist_id = db.session.scalar(
+            select(Artist.id).where(*(exists().where(c == Artwork.id, Artwork.artist_id == Artist.id)
+                                      for c in (Purchase.artwork_id, Sell.artwork_id, Cart.artwork_id)))
+            .order_by(Artist.id).limit(1))
+        self.purchase_id, self.sold_artwork_id, self.buyer_id = db.session.execute(
+            select(Purchase.id, Purchase.artwork_id, Purchase.user_id).order_by(Purchase.id).limit(1)).one()
+        self.other_artist_id = db.session.scalar(
+            select(Artist.id).where(Artist.id != db.session.get(Artwork, self.sold_artwork_id).artist_id).limit(1))
+        self.cart_user_id = busiest(db, Cart.user_id)
+        self.cart_id = db.session.scalar(select(Cart.id).limit(1))
+        self.listing_id, self.seller_id = db.session.execute(
+            select(Sell.id, Sell.seller_id).where(Sell.status == "listed").limit(1)).one()
+        self.user_id = with_all(db, User.id, Purchase.user_id, Sell.seller_id, Cart.user_id)
+        taken = select(Purchase.artwork_id).union(select(Sell.artwork_id), select(Cart.artwork_id))
+        self.free_artwork_ids = db.session.scalars(
+            select(Artwork.id).where(Artwork.id.not_in(taken)).order_by(Artwork.id).limit(3)).all()
+
+    def someone_else(self, *user_ids):
+        return next(i for i in range(1, 21) if i not in user_ids)
+
+
+def purchase(s):
+    return {"user_id": s.buyer_id, "artwork_id": s.free_artwork_ids[0], "price_paid": 10,
+            "date": "2024-05-01T00:00:00"}
+
+
+# (method, rule, status, request) where request(client, login, seeded) returns the response.
+SCENARIOS = [
+    ("POST", "/artists", 201, lambda c, login, s: c.post("/artists", json={"name": "New", "bio": "b"})),
+    ("PATCH", "/artists/<int:artist_id>", 200,
+     lambda c, login, s: c.patch(f"/artists/{s.artist_id}", json={"name": "Renamed", "bio": "b"})),
+    ("DELETE", "/artists/<int:artist_id>", 200, lambda c, login, s: c.delete(f"/artists/{s.artist_id}")),
+    ("POST", "/artworks", 201,
+     lambda c, login, s: c.post("/artworks", json={"title": "New", "price": 5, "artist_id": s.artist_id})),
+    ("PATCH", "/artworks/<int:artwork_id>", 200,
+     lambda c, login, s: c.patch(f"/artworks/{s.sold_artwork_id}",
+                                 json={"artist_id": s.other_artist_id, "price": 9, "title": "Moved"})),
+    ("DELETE", "/artworks/<int:artwork_id>", 200, lambda c, login, s: c.delete(f"/artworks/{s.sold_artwork_id}")),
+    ("POST", "/cart", 201,
+     lambda c, login, s: c.post("/cart", json={"user_id": s.cart_user_id, "artwork_id": s.free_artwork_ids[0]})),
+    ("POST", "/cart/batch", 201,
+     lambda c, login, s: c.post("/cart/batch", json={"user_id": s.cart_user_id, "artwork_ids": s.free_artwork_ids})),
+    ("DELETE", "/cart/<int:cart_id>", 200, lambda c, login, s: c.delete(f"/cart/{s.cart_id}")),
+    ("POST", "/cart/checkout/<int:user_id>", 201,
+     lambda c, login, s: c.post(f"/cart/checkout/{s.cart_user_id}", headers={"Idempotency-Key": "k"})),
+    ("POST", "/listings/<int:listing_id>/buy", 201,
+     lambda c, login, s: login(c, s.someone_else(s.seller_id)).post(f"/listings/{s.listing_id}/buy")),
+    ("POST", "/purchases", 201, lambda c, login, s: login(c, s.buyer_id).post("/purchases", json=purchase(s))),
+    ("DELETE", "/purchases/<int:purchase_id>", 200, lambda c, login, s: c.delete(f"/purchases/{s.purchase_id}")),
+    ("POST", "/signup", 201,
+     lambda c, login, s: c.post("/signup", json={"userName": "new", "email": "new@example.com", "password": "pw"})),
+    ("POST", "/login", 200,
+     lambda c, login, s: c.post("/login", json={"email": f"user{s.buyer_id}@example.com", "password": SYNTHETIC_PASSWORD})),
+    ("POST", "/logout", 200, lambda c, login, s: login(c, s.buyer_id).post("/logout")),
+    ("POST", "/upload", 201,
+     lambda c, login, s: login(c, s.buyer_id).post("/upload", data=PNG, headers={"Content-Type": "image/png"})),
+    ("PATCH", "/users/<int:user_id>", 200,
+     lambda c, login, s: c.patch(f"/users/{s.user_id}", json={"userName": "renamed", "email": "renamed@example.com"})),
+    ("DELETE", "/users/<int:user_id>", 200, lambda c, login, s: c.delete(f"/users/{s.user_id}")),
+]
+
+
+@pytest.mark.parametrize("method, rule, status, send", SCENARIOS, ids=[f"{m} {r}" for m, r, _, _ in SCENARIOS])
+def test_write_route_stays_within_budget(app, fresh_db, client, login, monkeypatch, tmp_path, method, rule, status, send):
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(tmp_path))
+    with app.app_context():
+        seeded = Seeded(fresh_db)
+    # Under TESTING an exceeded budget raises QueryBudgetExceeded out of the client.
+    assert send(client, login, seeded).status_code == status
+
+
+def test_every_budgeted_write_route_has_a_scenario(app):
+    covered = {(rule, method) for method, rule, _, _ in SCENARIOS}
+    missing = sorted(
+        f"{method} {rule.rule}" for rule in app.url_map.iter_rules()
+        if getattr(app.view_functions[rule.endpoint], "query_budget", None) is not None
+        for method in rule.methods - {"GET", "HEAD", "OPTIONS"} if (rule.rule, method) not in covered
+    )
+    assert missing == []
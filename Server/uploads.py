@@ -0,0 +1,152 @@
+"""
+Content-addressed upload storage.
+
+Uploads are copied to a temp file in fixed-size chunks, hashed as they
+stream, and then moved to `<root>/<h[:2]>/<h[2:4]>/<sha256><ext>`. The same
+bytes always land on the same path, so a duplicate upload costs nothing
+but the read, and the URL never changes once issued. Files that no artwork
+or artist references any more are removed by `collect_garbage`.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import time
+
+from sqlalchemy import select
+
+from models import db, Artist, Artwork
+
+CHUNK_SIZE = 64 * 1024
+TMP_DIR = ".tmp"
+HASH_RE = re.compile(r"[0-9a-f]{64}")
+
+# Leading bytes of the image formats we recognise; anything else keeps the
+# extension of the client's filename.
+SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+)
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class StoredFile:
+    def __init__(self, sha256, size, relpath, created):
+        self.sha256 = sha256
+        self.size = size
+        self.relpath = relpath
+        self.created = created
+
+
+def _extension(head, filename):
+    for magic, ext in SIGNATURES:
+        if head.startswith(magic):
+            return ext
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if re.fullmatch(r"\.[a-z0-9]{1,8}", ext) else ""
+
+
+def store(stream, root, max_size, filename=None):
+    """
+    Copy `stream` into content-addressed storage under `root`. Raises
+    UploadTooLarge, leaving nothing behind, once more than `max_size`
+    bytes have been read, and ValueError for an empty stream.
+    """
+    tmp_dir = os.path.join(root, TMP_DIR)
+    os.makedirs(tmp_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    fd, tmp = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge(f"Upload exceeds {max_size} bytes")
+                if len(head) < 16:
+                    head += chunk[:16]
+                digest.update(chunk)
+                out.write(chunk)
+        if size == 0:
+            raise ValueError("Empty upload")
+
+        sha256 = digest.hexdigest()
+        relpath = os.path.join(sha256[:2], sha256[2:4], sha256 + _extension(head, filename))
+        path = os.path.join(root, relpath)
+        if os.path.exists(path):
+            os.unlink(tmp)
+            # Restart the GC grace period for a file that is being reused.
+            os.utime(path)
+            return StoredFile(sha256, size, relpath, created=False)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+        return StoredFile(sha256, size, relpath, created=True)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def referenced_hashes():
+    """Hashes of every stored file an artwork image or artist profile picture points at."""
+    hashes = set()
+    for column in (Artwork.image_url, Artist.profile_pic):
+        urls = db.session.scalars(
+            select(column).where(column.is_not(None)).execution_options(yield_per=1000)
+        )
+        for url in urls:
+            hashes.update(HASH_RE.findall(url))
+    return hashes
+
+
+def collect_garbage(root, min_age, dry_run=False):
+    """
+    Delete stored files no row references, and abandoned temp files, that
+    are older than `min_age` seconds; the grace period covers uploads whose
+    artwork has not been saved yet. Returns the deleted paths.
+    """
+    keep = referenced_hashes()
+    cutoff = time.time() - min_age
+    deleted = []
+    if not os.path.isdir(root):
+        return deleted
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel = os.path.relpath(dirpath, root)
+        if rel == ".":
+            # Only descend into the fan-out directories; files stored
+            # before content addressing sit directly in root.
+            dirnames[:] = [d for d in dirnames if len(d) == 2 or d == TMP_DIR]
+            continue
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            is_tmp = rel == TMP_DIR
+            if not is_tmp and name[:64] in keep:
+                continue
+            if os.path.getmtime(path) > cutoff:
+                continue
+            if not dry_run:
+                os.unlink(path)
+                _prune(os.path.dirname(path), root)
+            deleted.append(path)
+    return deleted
+
+
+def _prune(directory, root):
+    while directory != root and os.path.basename(directory) != TMP_DIR:
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return
+        directory = os.path.dirname(directory)
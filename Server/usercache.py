@@ -0,0 +1,117 @@
+"""
+User lookups without a SELECT per request.
+
+`user_cache.get(user_id)` returns the User attached to db.session. Within
+a request the same instance is returned every time. Across requests the
+user's columns are kept in a per-process LRU for USER_CACHE_TTL seconds
+and re-attached with session.merge(load=False), which issues no SQL.
+The password hash is not cached; reading it loads it.
+
+Writes to a user call `invalidate_on_commit`, which drops the entry once
+the session commits. Other gunicorn workers keep their copy until the TTL
+runs out, so the TTL bounds how stale a cached user can be.
+USER_CACHE_TTL=0 disables the cross-request cache.
+"""
+import os
+import threading
+from collections import defaultdict
+from functools import cached_property
+
+from flask import abort, g, session
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from cache import MemoryBackend, NullBackend
+from models import db, User
+
+
+class UserCache:
+    def __init__(self, app=None):
+        self.backend = NullBackend()
+        self.ttl = 0
+        self.lookups = defaultdict(int)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("USER_CACHE_TTL", int(os.environ.get("USER_CACHE_TTL", 30)))
+        app.config.setdefault("USER_CACHE_SIZE", int(os.environ.get("USER_CACHE_SIZE", 4096)))
+        self.ttl = app.config["USER_CACHE_TTL"]
+        self.backend = MemoryBackend(app.config["USER_CACHE_SIZE"]) if self.ttl > 0 else NullBackend()
+        app.extensions["user_cache"] = self
+
+    @cached_property
+    def columns(self):
+        return [a.key for a in sa_inspect(User).column_attrs if a.key != "password"]
+
+    def get(self, user_id):
+        """The User with `user_id` in the current session, or None."""
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        users = g.setdefault("users", {})
+        if user_id not in users:
+            users[user_id] = self._load(user_id)
+        else:
+            self._count("request")
+        return users[user_id]
+
+    def _load(self, user_id):
+        user = db.session.identity_map.get(db.session.identity_key(User, user_id))
+        if user is not None:
+            self._count("session")
+            return user
+        values = self.backend.get(user_id)
+        if values is not None:
+            self._count("process")
+            user = User(**values)
+            make_transient_to_detached(user)
+            return db.session.merge(user, load=False)
+        self._count("miss")
+        user = db.session.get(User, user_id)
+        if user is not None:
+            self.backend.set(user_id, {c: getattr(user, c) for c in self.columns}, self.ttl)
+        return user
+
+    def get_or_404(self, user_id):
+        user = self.get(user_id)
+        if user is None:
+            abort(404)
+        return user
+
+    def current(self):
+        """The logged-in user, or None."""
+        return self.get(session.get("user_id"))
+
+    def invalidate(self, *user_ids):
+        for user_id in user_ids:
+            self.backend.delete(user_id)
+
+    def invalidate_on_commit(self, db_session, *user_ids):
+        """Invalidate `user_ids` once `db_session` commits; dropped on rollback."""
+        db_session.info.setdefault("user_cache_ids", set()).update(user_ids)
+        users = g.get("users")
+        if users:
+            for user_id in user_ids:
+                users.pop(user_id, None)
+
+    def _count(self, outcome):
+        with self._lock:
+            self.lookups[outcome] += 1
+
+
+user_cache = UserCache()
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(db_session):
+    user_ids = db_session.info.pop("user_cache_ids", None)
+    if user_ids:
+        user_cache.invalidate(*user_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(db_session):
+    db_session.info.pop("user_cache_ids", None)
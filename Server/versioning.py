@@ -0,0 +1,63 @@
+"""
+Row versions and change counters behind the catalogue ETags.
+
+Artist and Artwork carry a `version` column that the ORM bumps on every
+UPDATE (version_id_col). `touch` bumps it for rows whose serialized form
+changed through another table, e.g. an artwork gaining a cart item, and
+`bump_counters` advances the per-table counters used for collection
+ETags. Both run inside the caller's transaction.
+"""
+from functools import wraps
+
+from flask import current_app, g, make_response, request
+
+from models import db, ChangeCounter
+from sqlutil import dialect_insert
+
+
+def touch(model, ids):
+    ids = set(ids)
+    if ids:
+        db.session.execute(
+            model.__table__.update().where(model.__table__.c.id.in_(ids))
+            .values(version=model.__table__.c.version + 1)
+        )
+
+
+def bump_counters(*names):
+    table = ChangeCounter.__table__
+    stmt = dialect_insert(table).values([{"name": n, "value": 1} for n in names])
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.name], set_={"value": table.c.value + 1}
+    ))
+
+
+def read_counters(*names):
+    values = dict(db.session.query(ChangeCounter.name, ChangeCounter.value)
+                  .filter(ChangeCounter.name.in_(names)))
+    return tuple(values.get(n, 0) for n in names)
+
+
+def conditional(etag_for):
+    """
+    Set a strong ETag on 200 responses and answer If-None-Match with 304
+    without running the view. `etag_for` gets the view's URL arguments
+    and returns the (unquoted) tag, or None if the resource doesn't exist.
+    The tag is kept in g.etag, where ResponseCache.cached checks it.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            etag = g.etag = etag_for(**kwargs)
+            if etag is None:
+                return fn(*args, **kwargs)
+            if request.if_none_match.contains(etag) or request.if_none_match.star_tag:
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(fn(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            return response
+        return wrapper
+    return decorator
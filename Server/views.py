@@ -0,0 +1,145 @@
+"""
+Declarative read shapes for endpoints.
+
+A View names the model and serializer rules an endpoint returns. The
+relationships those rules reach are eager-loaded (joinedload for
+many-to-one, selectinload for collections) and every other relationship
+is set to raise, so an endpoint runs a fixed number of queries no matter
+how many rows it returns.
+"""
+from contextlib import contextmanager
+from functools import cached_property, wraps
+
+from flask import current_app, g, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+
+from metrics import timed
+from serializers import compile_serializer
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class View:
+    def __init__(self, model, rules=(), load=()):
+        """
+        :param model: mapped class the endpoint returns
+        :param rules: serializer rules, as passed to to_dict
+        :param load: extra dotted relationship paths to eager-load, e.g. for delete cascades
+        """
+        self.model = model
+        self.rules = tuple(rules)
+        self.load = tuple(load)
+
+    @cached_property
+    def serializer(self):
+        return compile_serializer(self.model, self.rules)
+
+    @cached_property
+    def _tree(self):
+        tree = {}
+        _serializer_paths(self.serializer, tree)
+        for path in self.load:
+            _dotted_path(self.model, path, tree)
+        return tree
+
+    @cached_property
+    def options(self):
+        return tuple(_loader_options(self.model, self._tree, None)) + (raiseload("*"),)
+
+    @cached_property
+    def queries(self):
+        """Statements needed to load up to 500 rows: the base query plus one per collection."""
+        return 1 + _collections(self._tree)
+
+    def query(self):
+        return self.model.query.options(*self.options)
+
+    def select(self):
+        """The same load as query(), as a select() for sessions other than db.session."""
+        return select(self.model).options(*self.options)
+
+    def dump(self, obj):
+        with timed("serialize_time"):
+            return self.serializer.one(obj)
+
+    def dump_many(self, objs):
+        with timed("serialize_time"):
+            return self.serializer.many(objs)
+
+
+def _serializer_paths(serializer, tree):
+    for key, nested in serializer.ones:
+        _serializer_paths(nested, tree.setdefault((key, False), {}))
+    for key, nested in serializer.manys:
+        _serializer_paths(nested, tree.setdefault((key, True), {}))
+
+
+def _dotted_path(model, path, tree):
+    for key in path.split("."):
+        prop = getattr(model, key).property
+        tree = tree.setdefault((key, prop.uselist), {})
+        model = prop.mapper.class_
+
+
+def _loader_options(model, tree, parent):
+    for (key, uselist), children in tree.items():
+        attr = getattr(model, key)
+        if parent is None:
+            loader = selectinload(attr) if uselist else joinedload(attr)
+        else:
+            loader = parent.selectinload(attr) if uselist else parent.joinedload(attr)
+        yield loader.raiseload("*")
+        yield from _loader_options(attr.property.mapper.class_, children, loader)
+
+
+def _collections(tree):
+    return sum(uselist + _collections(children) for (key, uselist), children in tree.items())
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context():
+        g.query_count = g.get("query_count", 0) + 1
+
+
+def query_count():
+    return g.get("query_count", 0)
+
+
+@contextmanager
+def unbudgeted():
+    """Leave the statements run inside out of the view's query budget."""
+    start = query_count()
+    try:
+        yield
+    finally:
+        g.query_count = start
+
+
+def query_budget(limit):
+    """
+    Declare the most statements a view function may run. When
+    QUERY_BUDGET_ENFORCE is set (the default under app.testing) going over
+    the budget raises QueryBudgetExceeded; otherwise it is logged. A limit
+    of None marks a view whose statement count grows with its input, such
+    as bulk import, and is not checked.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = query_count()
+            response = fn(*args, **kwargs)
+            used = query_count() - start
+            if limit is not None and used > limit:
+                message = f"{fn.__name__} ran {used} queries, budget is {limit}"
+                if current_app.config.get("QUERY_BUDGET_ENFORCE", current_app.testing):
+                    raise QueryBudgetExceeded(message)
+                current_app.logger.warning(message)
+            return response
+        wrapper.query_budget = limit
+        return wrapper
+    return decorator
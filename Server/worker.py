@@ -0,0 +1,84 @@
+"""
+Background job worker; see jobs.py.
+
+    cd Server && python worker.py [--queues images,catalogue] [--burst]
+
+Runs JOB_CONCURRENCY[queue] threads for each queue, each claiming and
+running one job at a time, and periodically queues again the jobs of
+workers that died. SIGTERM or SIGINT stops it once the running jobs have
+finished. With --burst it exits as soon as no job is due, e.g. to drain
+the queues in tests or from cron.
+"""
+import argparse
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+
+from app import app, db
+from jobs import jobs
+
+logger = logging.getLogger("worker")
+
+
+def work(queue, limit, worker_id, stop, burst):
+    interval = app.config["JOB_POLL_INTERVAL"]
+    with app.app_context():
+        while not stop.is_set():
+            try:
+                job = jobs.claim(queue, worker_id, limit)
+            except Exception:
+                logger.exception("Could not claim a job from %s", queue)
+                db.session.rollback()
+                job = None
+            if job is not None:
+                jobs.run(job)
+            elif burst:
+                return
+            else:
+                stop.wait(interval * random.uniform(0.5, 1.5))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queues", help="comma-separated queues to work (default: every queue in JOB_CONCURRENCY)")
+    parser.add_argument("--burst", action="store_true", help="exit once no job is due")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    limits = app.config["JOB_CONCURRENCY"]
+    queues = args.queues.split(",") if args.queues else list(limits)
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+
+    threads = []
+    for queue in queues:
+        limit = limits.get(queue, 1)
+        for n in range(limit):
+            worker_id = f"{socket.gethostname()}:{os.getpid()}:{queue}:{n}"
+            threads.append(threading.Thread(target=work, args=(queue, limit, worker_id, stop, args.burst),
+                                            name=worker_id, daemon=True))
+    for thread in threads:
+        thread.start()
+    logger.info("Working %s with %d threads", ", ".join(queues), len(threads))
+
+    with app.app_context():
+        while any(t.is_alive() for t in threads):
+            try:
+                requeued = jobs.requeue_stale(queues)
+                if requeued:
+                    logger.warning("Queued %d jobs of stopped workers again", requeued)
+            except Exception:
+                logger.exception("Could not queue the jobs of stopped workers")
+                db.session.rollback()
+            if args.burst or stop.wait(60):
+                break
+    for thread in threads:
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()